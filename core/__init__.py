@@ -2,6 +2,7 @@ from core.core import Core
 from core.flows import Flows
 from core.logger import Logger
 from core.project import Project
+from core.registry import CommandRegistry
 from core.release import Release
 from core.tools import Tools
 from core.logo import print_logo
@@ -0,0 +1,135 @@
+"""Shell completion core module
+
+Generates static completion scripts with all commands, params and flags baked in, so the shell never has to start
+Odin on TAB.
+"""
+
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+SHELLS = ["bash", "zsh"]
+PROGRAM_NAMES = ["odin.py", "odin"]
+
+_HEADER = "# Generated by \"odin.py completion --emit {}\". Don't edit: it's regenerated when commands are changed.\n"
+
+
+def _get_options(command) -> list:
+    """Returns list of (option, help) for command's params and flags"""
+    ret = []
+    if command["params"] is not None:
+        for param in command["params"]:
+            ret.append(("--" + param["name"], param.get("help") or ""))
+    if command["flags"] is not None:
+        for flag in command["flags"]:
+            ret.append(("-" + flag["name"], flag.get("help") or ""))
+    return ret
+
+
+def _zsh_quote(string) -> str:
+    return "'" + str(string).replace("'", "'\\''") + "'"
+
+
+def generate_bash(registry) -> str:
+    lines = [_HEADER.format("bash"),
+             "_odin_py()",
+             "{",
+             "    local cur",
+             "    COMPREPLY=()",
+             "    cur=\"${COMP_WORDS[COMP_CWORD]}\"",
+             "",
+             "    if [[ ${COMP_CWORD} == 1 ]] ; then",
+             "        COMPREPLY=( $(compgen -W \"{}\" -- ${{cur}}) )".format(
+                 " ".join(command["name"] for command in registry.get_commands())),
+             "        return 0",
+             "    fi",
+             "",
+             "    case \"${COMP_WORDS[1]}\" in"]
+    for command in registry.get_commands():
+        options = _get_options(command)
+        if not options:
+            continue
+        lines += ["    {})".format(command["name"]),
+                  "        COMPREPLY=( $(compgen -W \"{}\" -- ${{cur}}) )".format(
+                      " ".join(option for option, _ in options)),
+                  "        ;;"]
+    lines += ["    esac",
+              "    return 0",
+              "}",
+              "",
+              "complete -F _odin_py {}".format(" ".join(PROGRAM_NAMES)),
+              ""]
+    return "\n".join(lines)
+
+
+def generate_zsh(registry) -> str:
+    lines = [_HEADER.format("zsh"),
+             "_odin_py()",
+             "{",
+             "    local -a items",
+             "    if (( CURRENT == 2 )); then",
+             "        items=("]
+    for command in registry.get_commands():
+        lines.append("            {}".format(_zsh_quote("{}:{} ({})".format(command["name"], command["help"],
+                                                                             command["flow"]))))
+    lines += ["        )",
+              "        _describe -t commands 'odin.py command' items",
+              "        return",
+              "    fi",
+              "",
+              "    case \"${words[2]}\" in"]
+    for command in registry.get_commands():
+        options = _get_options(command)
+        if not options:
+            continue
+        lines.append("    {})".format(command["name"]))
+        lines.append("        items=(")
+        for option, option_help in options:
+            lines.append("            {}".format(_zsh_quote("{}:{}".format(option, option_help))))
+        lines += ["        )",
+                  "        _describe -t options 'option' items",
+                  "        ;;"]
+    lines += ["    esac",
+              "}",
+              "",
+              "compdef _odin_py {}".format(" ".join(PROGRAM_NAMES)),
+              ""]
+    return "\n".join(lines)
+
+
+def write_completion_script(registry, shell, path) -> bool:
+    """Writes completion script for the shell
+
+    Parameters
+    ----------
+    registry : CommandRegistry
+        Registry with all commands
+    shell : str
+        "bash" or "zsh"
+    path : str
+        Path of the script
+
+    Returns
+    -------
+    result : bool
+        True if the script was written
+    """
+    if shell == "bash":
+        script = generate_bash(registry)
+    elif shell == "zsh":
+        script = generate_zsh(registry)
+    else:
+        logger.error("Unsupported shell \"{}\"! Use one of: {}".format(shell, ", ".join(SHELLS)))
+        return False
+
+    tmp_path = "{}.{}".format(path, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "w") as script_file:
+            script_file.write(script)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.error("Can't write completion script \"{}\": {}".format(path, e))
+        return False
+    return True
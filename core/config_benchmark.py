@@ -0,0 +1,86 @@
+"""Config I/O benchmark
+
+Compares parse time of YAML files by PyYAML loaders and by core.config_io.load_yaml() with a warm cache:
+    python -m core.config_benchmark [file.yaml ...]
+Without arguments project, release and tools files of the repository are used.
+"""
+
+import argparse
+import glob
+import logging
+import os
+import sys
+import time
+
+import yaml
+
+from core.config_io import YamlLoader, load_yaml
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_LOADERS = {"FullLoader": yaml.FullLoader, "SafeLoader": yaml.SafeLoader}
+if YamlLoader is not yaml.SafeLoader:
+    BENCHMARK_LOADERS["CSafeLoader"] = YamlLoader
+
+
+def _get_default_benchmark_paths() -> list:
+    odin_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    patterns = [os.path.join(odin_path, "flows", "*", "configs", "tools.yaml"),
+                os.path.join(odin_path, "flows", "*", "projects", "*", "project.yaml"),
+                os.path.join(odin_path, "flows", "*", "projects", "*", "releases", "*.yaml")]
+    return sorted(path for pattern in patterns for path in glob.glob(pattern))
+
+
+def _measure(function, repeat) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def benchmark(paths, repeat=5) -> list:
+    """Measures parse time of files by every loader and by load_yaml() with a warm cache
+    :return:
+    List of (path, {loader: best time in seconds})
+    """
+    ret = []
+    for path in paths:
+        with open(path, "r") as yaml_file:
+            text = yaml_file.read()
+        times = {}
+        for name, loader in BENCHMARK_LOADERS.items():
+            times[name] = _measure(lambda: yaml.load(text, Loader=loader), repeat)
+        load_yaml(path)
+        times["load_yaml (cached)"] = _measure(lambda: load_yaml(path), repeat)
+        ret.append((path, times))
+    return ret
+
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(prog="python -m core.config_benchmark", description="YAML loaders benchmark")
+    parser.add_argument("paths", nargs="*", help="YAML files (project, release and tools files by default)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    paths = args.paths or _get_default_benchmark_paths()
+    if not paths:
+        logger.error("No YAML files to benchmark")
+        return 1
+    results = benchmark(paths, args.repeat)
+    names = list(results[0][1])
+    width = max(len(os.path.relpath(path)) for path, _ in results)
+    print("libyaml: {}".format(YamlLoader is not yaml.SafeLoader))
+    print("{}  {}".format("File, ms".ljust(width), "  ".join(name.rjust(18) for name in names)))
+    for path, times in results:
+        print("{}  {}".format(os.path.relpath(path).ljust(width),
+                              "  ".join("{:18.3f}".format(times[name] * 1000) for name in names)))
+    totals = {name: sum(times[name] for _, times in results) for name in names}
+    print("{}  {}".format("Total".ljust(width), "  ".join("{:18.3f}".format(totals[name] * 1000) for name in names)))
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main(sys.argv[1:]))
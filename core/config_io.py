@@ -0,0 +1,97 @@
+"""Config I/O core module
+
+All YAML files of Odin (project, release, tools, scoreboard) are read and written here:
+    * libyaml based CSafeLoader/CSafeDumper are used if PyYAML is built with libyaml (pure Python SafeLoader and
+      SafeDumper otherwise)
+    * files which can contain Python tags (scoreboard.yaml: it was written by the default yaml.dump()) are read and
+      written with python_tags=True: CLoader/CDumper (Loader/Dumper without libyaml)
+    * parsed files are cached in the process by (path, mtime, size). Every call returns a new copy of the data, so
+      callers can change it.
+
+Benchmark: see core.config_benchmark
+"""
+
+import logging
+import os
+import pickle
+import threading
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+try:
+    YamlLoader = yaml.CSafeLoader
+    YamlDumper = yaml.CSafeDumper
+except AttributeError:
+    YamlLoader = yaml.SafeLoader
+    YamlDumper = yaml.SafeDumper
+
+try:
+    PythonYamlLoader = yaml.CLoader
+    PythonYamlDumper = yaml.CDumper
+except AttributeError:
+    PythonYamlLoader = yaml.Loader
+    PythonYamlDumper = yaml.Dumper
+
+_cache = {}  # (absolute path, python_tags) -> ((mtime, size), pickled data)
+_cache_lock = threading.Lock()
+
+
+def _get_stamp(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _store(key, stamp, data) -> None:
+    try:
+        blob = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return
+    with _cache_lock:
+        _cache[key] = (stamp, blob)
+
+
+def load_yaml(path, use_cache=True, python_tags=False):
+    """Parses YAML file
+
+    Parameters
+    ----------
+    path : str
+        File path
+    use_cache : bool
+        Use parsed data of not changed file
+    python_tags : bool
+        Allow Python tags (!!python/tuple, objects, ...). Use it only for files written by Odin itself.
+
+    Returns
+    -------
+    result
+        Parsed data (a new copy on every call)
+    """
+    key = (os.path.abspath(path), python_tags)
+    stamp = _get_stamp(key[0])
+    if use_cache:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] == stamp:
+            return pickle.loads(entry[1])
+    with open(key[0], "r") as yaml_file:
+        data = yaml.load(yaml_file, Loader=PythonYamlLoader if python_tags else YamlLoader)
+    if use_cache:
+        _store(key, stamp, data)
+    return data
+
+
+def dump_yaml(data, path, python_tags=False) -> None:
+    """Writes data to YAML file (and keeps it in the cache). Python objects are allowed if python_tags is set."""
+    key = (os.path.abspath(path), python_tags)
+    with open(key[0], "w") as yaml_file:
+        yaml.dump(data, yaml_file, Dumper=PythonYamlDumper if python_tags else YamlDumper)
+    with _cache_lock:
+        _cache.pop((key[0], not python_tags), None)
+    _store(key, _get_stamp(key[0]), data)
+
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
@@ -9,12 +9,32 @@ class Core:
             cls.instance = super(Core, cls).__new__(cls)
         return cls.instance
 
-    def set(self, project=None, release=None, flows=None, args=None, glob_vars=None) -> None:
+    def set(self, project=None, release=None, flows=None, args=None, glob_vars=None, tools=None) -> None:
         self.project = project
         self.release = release
         self.flows = flows
         self.args = args
         self.glob_vars = glob_vars
+        self.tools = tools
+        self.filelist_expander = None
+
+    def get_tools(self):
+        """
+        Preloaded tools (server mode) or core.flows.get_tools() (loaded once per command)
+        :return:
+        Tools class instance
+        """
+        if getattr(self, "tools", None) is None:
+            self.tools = self.flows.get_tools()
+        return self.tools
+
+    def get_command_registry(self):
+        """
+        Faster way to call core.flows.get_registry()
+        :return:
+        CommandRegistry class instance
+        """
+        return self.flows.get_registry()
 
     def get_tool(self, tool_name, tool_group=None):
         """
@@ -22,7 +42,7 @@ class Core:
         :return:
         Tool class instance
         """
-        return self.flows.get_tools().get_tool(tool_name, tool_group)
+        return self.get_tools().get_tool(tool_name, tool_group)
 
     def get_tools_from_group(self, tool_group):
         """
@@ -30,7 +50,7 @@ class Core:
         :return:
         Tool class instance
         """
-        return self.flows.get_tools().get_tools_from_group(tool_group)
+        return self.get_tools().get_tools_from_group(tool_group)
 
     def check_tool(self, tool_name, tool_group) -> bool:
         """
@@ -38,4 +58,26 @@ class Core:
         :return:
         Bool value
         """
-        return self.flows.get_tools().check_tool(tool_name, tool_group)
+        return self.get_tools().check_tool(tool_name, tool_group)
+
+    def get_env(self, tools):
+        """
+        Environment for running tools (with project variables). It's cached per tools combination.
+        :param tools:
+        List of Tool class instances (in setup order)
+        :return:
+        core.environment.Environment (pass to_dict() as env to subprocesses)
+        """
+        from core.environment import build_environment
+        return build_environment(tools, getattr(self, "project", None))
+
+    def get_filelist(self, module_name, filelist_name):
+        """
+        Expanded filelist of the module (variables, globs, nested filelists, checked files). Results are reused.
+        :return:
+        FilelistResult class instance
+        """
+        if getattr(self, "filelist_expander", None) is None:
+            from core.filelist import FilelistExpander
+            self.filelist_expander = FilelistExpander(self.project)
+        return self.filelist_expander.expand_module_filelist(module_name, filelist_name)
@@ -0,0 +1,158 @@
+"""Environment core module
+
+Builds environments for tools instead of changing os.environ:
+    * base environment (os.environ by default) < project variables < tools' env vars
+    * PATH, LD_LIBRARY_PATH and LM_LICENSE_FILE are composed from tools' paths and the base value, duplicates are
+      removed. Tools which are set up later have higher priority (like consecutive Tool.setup() calls).
+
+Environments are immutable mappings of variables set by odin over the base environment. They're cached per (tools,
+project variables, base environment object, base values of PATH_VARS): the cache key doesn't depend on the size of the
+base environment, so a cache hit doesn't copy or hash all of os.environ. Other variables are read from the base
+environment as they're accessed. Pass environments to subprocesses explicitly: Popen(..., env=environment.to_dict()).
+"""
+
+import os
+import threading
+from collections.abc import Mapping
+
+PATH_VARS = ("PATH", "LD_LIBRARY_PATH", "LM_LICENSE_FILE")
+CACHE_SIZE = 256
+
+
+def is_set(field) -> bool:
+    """Tool fields from tools.yaml are unset when missing or equal to the string None"""
+    return field is not None and field != "None"
+
+
+def compose_path_list(*path_lists) -> str:
+    """Joins ":"-separated path lists. Empty items and duplicates are removed, the first occurrence wins."""
+    items = []
+    for path_list in path_lists:
+        if path_list:
+            items.extend(item for item in path_list.split(os.pathsep) if item)
+    return os.pathsep.join(dict.fromkeys(items))
+
+
+class Environment(Mapping):
+    """Immutable environment (name -> str): variables over the base environment (optional)"""
+
+    def __init__(self, variables, base=None) -> None:
+        self._variables = dict(variables)
+        self._base = base
+        self._hash = None
+
+    def __getitem__(self, name) -> str:
+        try:
+            return self._variables[name]
+        except KeyError:
+            if self._base is None:
+                raise
+            return self._base[name]
+
+    def __iter__(self):
+        return iter(self.to_dict())
+
+    def __len__(self) -> int:
+        return len(self.to_dict())
+
+    def __hash__(self) -> int:
+        if self._base is not None:
+            return hash(frozenset(self.to_dict().items()))
+        if self._hash is None:
+            self._hash = hash(frozenset(self._variables.items()))
+        return self._hash
+
+    def __repr__(self) -> str:
+        return "Environment({} vars)".format(len(self._variables))
+
+    def to_dict(self) -> dict:
+        """Returns a mutable copy (e.g. for subprocess' env argument)"""
+        if self._base is None:
+            return dict(self._variables)
+        ret = dict(self._base)
+        ret.update(self._variables)
+        return ret
+
+    def updated(self, variables) -> "Environment":
+        """Returns a new environment with changed variables"""
+        return Environment(dict(self._variables, **variables), self._base)
+
+
+def _get_tool_key(tool) -> tuple:
+    env = tuple(sorted((tool.env or {}).items())) if type(tool.env) is dict else ()
+    return tool.group, tool.name, tool.bin_path, tool.path, tool.lib, tool.license, env
+
+
+def _get_project_vars(project) -> dict:
+    if project is None:
+        return {}
+    return {name: value for name, value in (project.get_all_vars() or {}).items() if type(value) is str}
+
+
+class EnvironmentBuilder(object):
+    """Builds and caches environments of tool combinations"""
+
+    def __init__(self) -> None:
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def build(self, tools, project=None, base_env=None) -> Environment:
+        """
+        :param tools:
+        Tools (in setup order)
+        :param project:
+        Project (its str variables are added)
+        :param base_env:
+        Base environment (os.environ by default)
+        :return:
+        Environment
+        """
+        if base_env is None:
+            base_env = os.environ
+        project_vars = _get_project_vars(project)
+        key = (tuple(_get_tool_key(tool) for tool in tools), frozenset(project_vars.items()), id(base_env),
+               tuple(base_env.get(name) for name in PATH_VARS))
+        environment = self._cache.get(key)
+        if environment is None:
+            # The environment keeps a reference to base_env, so its id isn't reused while it's cached
+            environment = Environment(self._compose(tools, project_vars, base_env), base_env)
+            with self._lock:
+                if len(self._cache) >= CACHE_SIZE:
+                    self._cache.clear()
+                self._cache[key] = environment
+        return environment
+
+    @staticmethod
+    def _compose(tools, project_vars, base_env) -> dict:
+        """Variables set over base_env (only PATH_VARS are read from it)"""
+        ret = dict(project_vars)
+        prepended = {name: [] for name in PATH_VARS}
+        for tool in reversed(tools):  # The last tool is the first in the lists
+            if is_set(tool.path):
+                prepended["PATH"].append(tool.path)
+            if is_set(tool.bin_path):
+                prepended["PATH"].append(tool.bin_path)
+            if is_set(tool.lib):
+                prepended["LD_LIBRARY_PATH"].append(tool.lib)
+            if is_set(tool.license):
+                prepended["LM_LICENSE_FILE"].append(tool.license)
+        for name, path_lists in prepended.items():
+            if path_lists:
+                ret[name] = compose_path_list(*path_lists, ret.get(name, base_env.get(name, "")))
+        for tool in tools:
+            if is_set(tool.env) and type(tool.env) is dict:
+                for name, value in tool.env.items():
+                    ret[name] = str(value)
+        return ret
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+builder = EnvironmentBuilder()
+
+
+def build_environment(tools, project=None, base_env=None) -> Environment:
+    """Environment of the tools (see EnvironmentBuilder.build()), cached"""
+    return builder.build(tools, project, base_env)
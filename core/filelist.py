@@ -0,0 +1,204 @@
+"""Filelist core module
+
+Expands module filelists of the project:
+    * "$VAR" references are replaced by the project resolver (postponed "$$VAR" are kept)
+    * glob patterns ("rtl/*.sv", "rtl/**/*.sv")
+    * nested filelists: "-f path" (relative paths inside keep the base dir of the including list) and "-F path"
+      (relative paths inside are relative to the nested filelist)
+    * other options ("+incdir+...", "-v lib.v", ...) are collected separately
+    * files are deduplicated, the first occurrence wins
+
+Existence and mtime of files are checked in parallel threads and kept in a shared StatCache, so every file is
+stat()ed once per process (it's the slowest part on NFS).
+"""
+
+import glob
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 32
+COMMENT_PREFIXES = ("#", "//")
+GLOB_CHARS = ("*", "?", "[")
+
+
+class StatCache(object):
+    """Thread-safe cache of os.stat() results (None for missing files)"""
+
+    def __init__(self) -> None:
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def stat(self, path):
+        try:
+            return self._stats[path]
+        except KeyError:
+            pass
+        try:
+            result = os.stat(path)
+        except OSError:
+            result = None
+        with self._lock:
+            self._stats[path] = result
+        return result
+
+    def stat_many(self, paths, max_workers=DEFAULT_MAX_WORKERS) -> list:
+        """Returns stat results of paths (in the same order). Uncached paths are stat()ed in parallel."""
+        uncached = [path for path in dict.fromkeys(paths) if path not in self._stats]
+        if len(uncached) > 1 and max_workers > 1:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(uncached))) as executor:
+                for _ in executor.map(self.stat, uncached):
+                    pass
+        return [self.stat(path) for path in paths]
+
+    def invalidate(self, paths=None) -> None:
+        """Forgets all cached results or results of the paths"""
+        with self._lock:
+            if paths is None:
+                self._stats.clear()
+            else:
+                for path in paths:
+                    self._stats.pop(path, None)
+
+
+stat_cache = StatCache()
+
+
+class FilelistResult(object):
+    """Expanded filelist
+
+    Attributes
+    ----------
+    files : tuple of str
+        Existing files (deduplicated, in filelist order)
+    mtimes : tuple of int
+        mtime (ns) of files
+    missing : tuple of str
+        Files, nested filelists and glob patterns which weren't found
+    options : tuple of str
+        Other filelist entries (options)
+    includes : tuple of str
+        Nested filelists which were read
+    """
+
+    def __init__(self, files, mtimes, missing, options, includes) -> None:
+        self.files = tuple(files)
+        self.mtimes = tuple(mtimes)
+        self.missing = tuple(missing)
+        self.options = tuple(options)
+        self.includes = tuple(includes)
+
+    def __iter__(self):
+        return iter(self.files)
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def is_ok(self) -> bool:
+        return not self.missing
+
+    def get_latest_mtime(self) -> int or None:
+        return max(self.mtimes) if self.mtimes else None
+
+    def get_newer_than(self, mtime) -> list:
+        """Returns files modified after mtime (ns), e.g. after the last compilation"""
+        return [path for path, file_mtime in zip(self.files, self.mtimes) if file_mtime > mtime]
+
+
+class FilelistExpander(object):
+    """Filelist expansion service
+
+    Parameters
+    ----------
+    project : Project
+        Variables are replaced by project.replace_vars()
+    base_dir_path : str
+        Relative paths are relative to it (default is the project's dir)
+    cache : StatCache
+        Shared stat cache by default
+    """
+
+    def __init__(self, project, base_dir_path=None, cache=None, max_workers=DEFAULT_MAX_WORKERS) -> None:
+        self._project = project
+        if base_dir_path is None:
+            base_dir_path = os.path.dirname(os.path.abspath(project.get_project_file_path()))
+        self._base_dir_path = base_dir_path
+        self._cache = stat_cache if cache is None else cache
+        self._max_workers = max_workers
+        self._results = {}  # (module name, filelist name) -> FilelistResult
+
+    def expand_module_filelist(self, module_name, filelist_name) -> FilelistResult:
+        """Expands filelist of the module. The result is reused by next calls."""
+        key = (module_name, filelist_name)
+        if key not in self._results:
+            entries = self._project.get_filelist(module_name, filelist_name)
+            if entries is None:
+                logger.error("No filelist \"{}\" in module \"{}\"!".format(filelist_name, module_name))
+                entries = []
+            self._results[key] = self.expand(entries)
+        return self._results[key]
+
+    def expand(self, entries, base_dir_path=None) -> FilelistResult:
+        """Expands list of filelist entries
+        :return:
+        FilelistResult
+        """
+        paths = []
+        missing = []
+        options = []
+        includes = []
+        self._collect(entries, self._base_dir_path if base_dir_path is None else base_dir_path, paths, missing,
+                      options, includes, [])
+        paths = list(dict.fromkeys(paths))
+        files = []
+        mtimes = []
+        for path, stat in zip(paths, self._cache.stat_many(paths, self._max_workers)):
+            if stat is None:
+                missing.append(path)
+            else:
+                files.append(path)
+                mtimes.append(stat.st_mtime_ns)
+        return FilelistResult(files, mtimes, missing, options, includes)
+
+    def _get_path(self, path, base_dir_path) -> str:
+        return os.path.normpath(os.path.join(base_dir_path, os.path.expanduser(path)))
+
+    def _collect(self, entries, base_dir_path, paths, missing, options, includes, stack) -> None:
+        for entry in entries:
+            if entry is None:
+                continue
+            entry = self._project.replace_vars(str(entry)).strip()
+            if not entry or entry.startswith(COMMENT_PREFIXES):
+                continue
+            option, _, argument = entry.partition(" ")
+            if option in ("-f", "-F"):
+                self._include(argument.strip(), base_dir_path, option == "-F", paths, missing, options, includes,
+                              stack)
+            elif entry.startswith(("-", "+")):
+                options.append(entry)
+            elif any(char in entry for char in GLOB_CHARS):
+                matches = sorted(glob.glob(self._get_path(entry, base_dir_path), recursive=True))
+                if matches:
+                    paths.extend(matches)
+                else:
+                    missing.append(entry)
+            else:
+                paths.append(self._get_path(entry, base_dir_path))
+
+    def _include(self, path, base_dir_path, relative_to_filelist, paths, missing, options, includes, stack) -> None:
+        path = self._get_path(path, base_dir_path)
+        if path in stack:
+            logger.warning("Filelist \"{}\" includes itself: {}".format(path, " -> ".join(stack + [path])))
+            return
+        try:
+            with open(path, "r") as filelist_file:
+                lines = filelist_file.read().splitlines()
+        except OSError:
+            missing.append(path)
+            return
+        includes.append(path)
+        nested_base_dir_path = os.path.dirname(path) if relative_to_filelist else base_dir_path
+        self._collect(lines, nested_base_dir_path, paths, missing, options, includes, stack + [path])
@@ -23,41 +23,41 @@ class Logger:
         self._silent_mode = on_off
 
     @staticmethod
-    def fatal(str_fatal):
-        print(bcolors.BOLD + bcolors.FAIL + "FATAL:" + bcolors.ENDC, bcolors.FAIL + str_fatal + bcolors.ENDC)
+    def fatal(str_fatal, file=None):
+        print(bcolors.BOLD + bcolors.FAIL + "FATAL:" + bcolors.ENDC, bcolors.FAIL + str_fatal + bcolors.ENDC, file=file)
         exit(1)
 
     @staticmethod
-    def error(str_error):
-        print(bcolors.BOLD + bcolors.FAIL + "ERROR:" + bcolors.ENDC, bcolors.FAIL + str_error + bcolors.ENDC)
+    def error(str_error, file=None):
+        print(bcolors.BOLD + bcolors.FAIL + "ERROR:" + bcolors.ENDC, bcolors.FAIL + str_error + bcolors.ENDC, file=file)
 
     @staticmethod
-    def warning(str_warning):
-        print(bcolors.BOLD + bcolors.WARNING + "WARNING:", str_warning, bcolors.ENDC)
+    def warning(str_warning, file=None):
+        print(bcolors.BOLD + bcolors.WARNING + "WARNING:", str_warning, bcolors.ENDC, file=file)
 
     @staticmethod
-    def info(str_info):
-        print("INFO: " + str_info)
+    def info(str_info, file=None):
+        print("INFO: " + str_info, file=file)
 
     def debug(self, str_debug):
         if self._debug_level > 0:
             print(bcolors.OKBLUE + "DEBUG: " + str_debug + bcolors.ENDC)
 
     @staticmethod
-    def red(string):
-        print(bcolors.FAIL + string + bcolors.ENDC)
+    def red(string, file=None):
+        print(bcolors.FAIL + string + bcolors.ENDC, file=file)
 
     @staticmethod
-    def boldred(string):
-        print(bcolors.BOLD + bcolors.FAIL + string + bcolors.ENDC)
+    def boldred(string, file=None):
+        print(bcolors.BOLD + bcolors.FAIL + string + bcolors.ENDC, file=file)
 
     @staticmethod
-    def cmd(string):
-        print(bcolors.BOLD + bcolors.OKBLUE + string + bcolors.ENDC)
+    def cmd(string, file=None):
+        print(bcolors.BOLD + bcolors.OKBLUE + string + bcolors.ENDC, file=file)
 
     @staticmethod
-    def green(string):
-        print(bcolors.BOLD + bcolors.OKGREEN + string + bcolors.ENDC)
+    def green(string, file=None):
+        print(bcolors.BOLD + bcolors.OKGREEN + string + bcolors.ENDC, file=file)
 
     def bypass(self, string, **options): # TODO: make sure that it's right way
         if not self._silent_mode:
@@ -0,0 +1,296 @@
+"""Process core module
+
+Runs external programs (tools) without a shell:
+    * argv list is executed directly, so there is no quoting or shell expansion
+    * stdout and stderr are streamed line by line to callbacks and/or written to log files as they come. Output is
+      kept in memory only if capture is requested, so gigabytes of simulation logs don't sit in the Python process.
+      A stream without any consumer isn't redirected at all (it goes to the terminal).
+    * timeout kills the whole process group: SIGTERM first, SIGKILL after a grace period
+    * the real exit status is returned (negative for processes killed by a signal, 127 if the program can't be
+      started)
+    * ProcessRunner runs many processes concurrently in asyncio under a limit
+    * start_process() starts a program in background and returns at once (like "&" in a shell)
+
+Example:
+    result = run_process(["xrun", "-f", "files.f"], timeout=3600, stdout_path="xrun.log",
+                         on_stderr=lambda line: print(line, end=""))
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import subprocess
+import time
+from asyncio.subprocess import PIPE
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+KILL_GRACE_PERIOD = 5.0
+NOT_FOUND_EXIT_CODE = 127
+
+
+class ProcessResult(object):
+    """Result of the process
+
+    Attributes
+    ----------
+    exit_code : int
+        Exit status (negative if the process is killed by a signal)
+    timed_out : bool
+        The process was killed by timeout
+    stdout, stderr : str
+        Captured output (None if it isn't captured)
+    stdout_lines, stderr_lines : int
+        Number of lines in the output streams (0 if a stream isn't redirected)
+    """
+
+    __slots__ = ("argv", "exit_code", "timed_out", "duration", "stdout", "stderr", "stdout_lines", "stderr_lines",
+                 "error")
+
+    def __init__(self, argv, exit_code=None, timed_out=False, duration=0.0, stdout=None, stderr=None,
+                 stdout_lines=0, stderr_lines=0, error=None) -> None:
+        self.argv = argv
+        self.exit_code = exit_code
+        self.timed_out = timed_out
+        self.duration = duration
+        self.stdout = stdout
+        self.stderr = stderr
+        self.stdout_lines = stdout_lines
+        self.stderr_lines = stderr_lines
+        self.error = error
+
+    def __repr__(self) -> str:
+        return "ProcessResult({!r}, exit_code={}, timed_out={})".format(self.argv, self.exit_code, self.timed_out)
+
+    def is_ok(self) -> bool:
+        return self.exit_code == 0 and not self.timed_out
+
+
+class _Sink(object):
+    """Consumers of one output stream: callback (decoded lines), log file (raw bytes) and capture buffer"""
+
+    def __init__(self, callback=None, path=None, capture=False, encoding=None) -> None:
+        self.callback = callback
+        self.path = path
+        self.capture = capture
+        self.encoding = encoding or "utf-8"
+        self.lines = 0
+        self._file = None
+        self._captured = [] if capture else None
+        self._partial = b""
+        self._open_line = False  # The last line isn't finished (lines are only counted)
+
+    def is_used(self) -> bool:
+        return self.callback is not None or self.path is not None or self.capture
+
+    def open(self) -> None:
+        if self.path is not None:
+            self._file = open(self.path, "wb")
+
+    def close(self) -> None:
+        if self._partial:
+            self._emit_line(self._partial)
+            self._partial = b""
+        if self._open_line:
+            self.lines += 1
+            self._open_line = False
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def feed(self, chunk) -> None:
+        if self._file is not None:
+            self._file.write(chunk)
+        if self.callback is None and self._captured is None:  # Lines are only counted
+            self.lines += chunk.count(b"\n")
+            self._open_line = not chunk.endswith(b"\n")
+            return
+        lines = (self._partial + chunk).split(b"\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._emit_line(line + b"\n")
+
+    def _emit_line(self, line) -> None:
+        self.lines += 1
+        text = line.decode(self.encoding, errors="replace")
+        if self._captured is not None:
+            self._captured.append(text)
+        if self.callback is not None:
+            self.callback(text)
+
+    def get_captured(self):
+        return "".join(self._captured) if self._captured is not None else None
+
+
+async def _pump(stream, sink) -> None:
+    while True:
+        chunk = await stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        try:
+            sink.feed(chunk)
+        except Exception:  # The stream must be drained anyway, otherwise the process is blocked on a full pipe
+            logger.exception("Output callback failed, it's disabled")
+            sink.callback = None
+
+
+def _signal_group(process, sig, group) -> None:
+    try:
+        if group:
+            os.killpg(process.pid, sig)
+        else:
+            process.send_signal(sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def _terminate(process, grace_period, group) -> None:
+    _signal_group(process, signal.SIGTERM, group)
+    try:
+        await asyncio.wait_for(process.wait(), grace_period)
+    except asyncio.TimeoutError:
+        _signal_group(process, getattr(signal, "SIGKILL", signal.SIGTERM), group)
+        await process.wait()
+
+
+async def run_process_async(argv, env=None, cwd=None, timeout=None, on_stdout=None, on_stderr=None,
+                            stdout_path=None, stderr_path=None, capture=False, kill_grace_period=KILL_GRACE_PERIOD,
+                            encoding=None, new_session=True) -> ProcessResult:
+    """Runs the program (see the module description)
+
+    Parameters
+    ----------
+    argv : list
+        Program and its arguments
+    env : dict, optional
+        Environment of the process (odin's environment by default)
+    cwd : str, optional
+        Working directory
+    timeout : float, optional
+        Seconds before the process group is killed
+    on_stdout, on_stderr : callable, optional
+        Called with every decoded line (with "\\n"), in the event loop thread
+    stdout_path, stderr_path : str, optional
+        Log files for raw output (the same path can't be used for both streams)
+    capture : bool
+        Keep the output in memory and return it in the result
+    kill_grace_period : float
+        Seconds between SIGTERM and SIGKILL
+    encoding : str, optional
+        Encoding of the output (UTF-8 by default, undecodable bytes are replaced)
+    new_session : bool
+        Start the process in a new session (POSIX), so the whole process group is killed on timeout. Interactive
+        programs which need the terminal (e.g. bsub -Is) should be started with False.
+
+    Returns
+    -------
+    ProcessResult
+        Exit status, timeout flag, duration and captured output
+    """
+    argv = [str(arg) for arg in argv]
+    sinks = (_Sink(on_stdout, stdout_path, capture, encoding), _Sink(on_stderr, stderr_path, capture, encoding))
+    group = new_session and os.name == "posix"
+    timer = time.perf_counter()
+    try:
+        for sink in sinks:
+            sink.open()
+        process = await asyncio.create_subprocess_exec(
+            *argv, env=None if env is None else dict(env), cwd=cwd,
+            stdout=PIPE if sinks[0].is_used() else None, stderr=PIPE if sinks[1].is_used() else None,
+            start_new_session=group)
+    except OSError as e:
+        for sink in sinks:
+            sink.close()
+        logger.debug("Can't start {}: {}".format(argv, e))
+        return ProcessResult(argv, NOT_FOUND_EXIT_CODE, duration=time.perf_counter() - timer,
+                             stdout="" if capture else None, stderr=str(e) if capture else None, error=e)
+
+    pumps = [asyncio.ensure_future(_pump(stream, sink))
+             for stream, sink in ((process.stdout, sinks[0]), (process.stderr, sinks[1])) if stream is not None]
+    timed_out = False
+    try:
+        await asyncio.wait_for(process.wait(), timeout)
+    except asyncio.TimeoutError:
+        timed_out = True
+        logger.warning("Timeout ({}s) of {}, killing it".format(timeout, argv[0]))
+        await _terminate(process, kill_grace_period, group)
+    except asyncio.CancelledError:
+        await _terminate(process, kill_grace_period, group)
+        raise
+    finally:
+        if pumps:
+            await asyncio.gather(*pumps, return_exceptions=True)
+        for sink in sinks:
+            sink.close()
+
+    return ProcessResult(argv, process.returncode, timed_out, time.perf_counter() - timer,
+                         sinks[0].get_captured(), sinks[1].get_captured(), sinks[0].lines, sinks[1].lines)
+
+
+def run_coroutine(coroutine):
+    """Runs the coroutine and returns its result. The caller's thread is blocked: if it runs an event loop (odin
+    server, notebook), the coroutine is run in a helper thread with its own loop, because asyncio.run() can't be
+    nested and waiting for a task of the own loop would deadlock. Await the coroutine to use the running loop.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coroutine).result()
+
+
+def run_process(argv, **kwargs) -> ProcessResult:
+    """Synchronous version of run_process_async()"""
+    return run_coroutine(run_process_async(argv, **kwargs))
+
+
+def start_process(argv, env=None, cwd=None, new_session=True):
+    """Starts the program in background and returns without waiting for its exit (output goes to the terminal)
+
+    Returns
+    -------
+    subprocess.Popen
+        Handle of the process (None if the program can't be started)
+    """
+    argv = [str(arg) for arg in argv]
+    try:
+        return subprocess.Popen(argv, env=None if env is None else dict(env), cwd=cwd,
+                                start_new_session=new_session and os.name == "posix")
+    except OSError as e:
+        logger.debug("Can't start {}: {}".format(argv, e))
+        return None
+
+
+class ProcessRunner(object):
+    """Runs processes concurrently in asyncio, not more than limit processes at a time
+
+    Parameters
+    ----------
+    limit : int, optional
+        Maximum number of running processes (number of CPUs by default)
+    """
+
+    def __init__(self, limit=None) -> None:
+        self.limit = max(1, limit or os.cpu_count() or 1)
+        self._semaphore = None
+
+    async def run(self, argv, **kwargs) -> ProcessResult:
+        """run_process_async() under the limit"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        async with self._semaphore:
+            return await run_process_async(argv, **kwargs)
+
+    async def run_all(self, commands) -> list:
+        """Runs commands: [(argv, kwargs), ...]. Returns ProcessResult list in the same order."""
+        return await asyncio.gather(*[self.run(argv, **kwargs) for argv, kwargs in commands])
+
+    def run_all_sync(self, commands) -> list:
+        """Synchronous version of run_all()"""
+        self._semaphore = None  # Semaphore is bound to the event loop
+        return run_coroutine(self.run_all(commands))
+
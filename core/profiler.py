@@ -0,0 +1,101 @@
+"""Startup profiler core module
+
+Collects wall and CPU time of startup phases. Phases are recorded always (it costs a couple of clock reads), the
+report is printed only if "odin.py --profile-startup" is used.
+"""
+
+import json
+import re
+import sys
+import time
+from contextlib import contextmanager
+
+IMPORT_TIME_PATTERN = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s(\s*)(\S+)$")
+IMPORT_TIME_PACKAGES = ["core", "flows"]
+
+
+def get_times() -> tuple:
+    """Returns (wall, cpu) clocks"""
+    return time.perf_counter(), time.process_time()
+
+
+class StartupProfiler(object):
+    def __init__(self) -> None:
+        self._phases = []
+
+    def reset(self) -> None:
+        self._phases = []
+
+    def add(self, name, start_times) -> None:
+        """Adds phase which was started at start_times (see get_times()) and ends now"""
+        wall, cpu = get_times()
+        self._phases.append({"name": name, "wall": wall - start_times[0], "cpu": cpu - start_times[1]})
+
+    @contextmanager
+    def phase(self, name):
+        start_times = get_times()
+        try:
+            yield
+        finally:
+            self.add(name, start_times)
+
+    def get_phases(self) -> list:
+        return list(self._phases)
+
+    def print_table(self, file=sys.stderr) -> None:
+        """Prints phases sorted by wall time"""
+        phases = sorted(self._phases, key=lambda phase: phase["wall"], reverse=True)
+        width = max([len(phase["name"]) for phase in phases] + [len("Phase")])
+        print(" Startup profile ".center(width + 24, "-"), file=file)
+        print("{}  {:>10}  {:>10}".format("Phase".ljust(width), "Wall, ms", "CPU, ms"), file=file)
+        for phase in phases:
+            print("{}  {:>10.2f}  {:>10.2f}".format(phase["name"].ljust(width), phase["wall"] * 1000,
+                                                    phase["cpu"] * 1000), file=file)
+        print("-" * (width + 24), file=file)
+
+    def write_json(self, path) -> None:
+        with open(path, "w") as json_file:
+            json.dump({"phases": self._phases}, json_file, indent=2)
+
+
+def parse_import_times(lines, packages=None) -> list:
+    """Parses "python -X importtime" output.
+
+    Parameters
+    ----------
+    lines : iterable of str
+        stderr lines
+    packages : list of str
+        Only modules of these packages are returned (core and flows by default)
+
+    Returns
+    -------
+    result : list of dict
+        {"module", "self", "cumulative", "depth"} (times in seconds), sorted by cumulative time
+    """
+    if packages is None:
+        packages = IMPORT_TIME_PACKAGES
+    ret = []
+    for line in lines:
+        m = IMPORT_TIME_PATTERN.match(line.rstrip())
+        if m is None:
+            continue
+        module = m.group(4)
+        if module.split(".")[0] not in packages:
+            continue
+        ret.append({"module": module, "self": int(m.group(1)) / 1000000, "cumulative": int(m.group(2)) / 1000000,
+                    "depth": len(m.group(3)) // 2})
+    return sorted(ret, key=lambda item: item["cumulative"], reverse=True)
+
+
+def print_import_times(import_times, file=sys.stderr) -> None:
+    width = max([len(item["module"]) for item in import_times] + [len("Module")])
+    print(" Import time ".center(width + 24, "-"), file=file)
+    print("{}  {:>10}  {:>10}".format("Module".ljust(width), "Self, ms", "Cumul., ms"), file=file)
+    for item in import_times:
+        print("{}  {:>10.2f}  {:>10.2f}".format(item["module"].ljust(width), item["self"] * 1000,
+                                                item["cumulative"] * 1000), file=file)
+    print("-" * (width + 24), file=file)
+
+
+profiler = StartupProfiler()
@@ -1,14 +1,23 @@
 import getpass
+import glob
 import logging
 import os
 import re
 import yaml
 
+from core.config_io import load_yaml
 from core.logger import Logger
+from core.profiler import get_times, profiler
+from core.resolver import Substitution, Template, VariableResolver, compile_template, format_errors
 
 logger = logging.getLogger(__name__)
 
 
+def glob_fragments(pattern) -> list:
+    """Returns sorted paths of include fragments which match the glob pattern"""
+    return sorted(glob.glob(pattern))
+
+
 class Step:
     """A class that used to represent a Step object
 
@@ -86,9 +95,29 @@ class Project:
         self._name = "Unknown"
         self._variables = {}
         self._modules = []
+        self._modules_by_name = {}
+        self._modules_by_type = {}  # Type -> list of modules (in project order)
+        self._filelists = {}  # (module name, filelist name) -> list of files
+        self._steps = {}  # (module name, step name) -> Step
+        self._fragments = {}  # Module name -> path of include fragment which wasn't parsed yet
+        self._fragment_file_paths = []
+        self._include_patterns = {}  # Absolute glob pattern of include fragments -> matched paths
+        self._fragment_stats = {"loaded": 0, "wall": 0.0}
         self._user_name = getpass.getuser()
+        self._consulted_env = {}  # Env vars read during loading and resolution (name -> value or None)
+        self._consulted_global_vars = {}
+        self._resolver = None  # Keeps raw values and dependencies of variables after resolve_vars()
+        self._is_resolved = False
+        self._substitution = None
+        self._subscribers = []
         self.load()
 
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_substitution"] = None  # Rebuilt on demand
+        state["_subscribers"] = []
+        return state
+
     def get_user_name(self) -> str:
         """To get username you can use $USER variable, but often this can be overwritten by human. Use this method if
         you want to get "real" username.
@@ -121,6 +150,10 @@ class Project:
         """
         if global_variables is not None:
             self._global_variables = global_variables
+        self._on_variables_changed()
+        self._fragments = {}
+        self._fragment_file_paths = []
+        self._include_patterns = {}
 
         if custom_project_file_path is not None and os.path.isfile(custom_project_file_path):
             self._project_file_path = custom_project_file_path
@@ -144,17 +177,112 @@ class Project:
         logger.debug("Project file path: {}".format(self._project_file_path))
 
         if project_file_ext == ".xml":
-            return self.load_xml()
+            result = self.load_xml()
         elif project_file_ext == ".yaml" or project_file_ext == ".yml":
-            return self.load_yaml()
+            result = self.load_yaml()
         else:
             Logger.fatal("Project file with unsupported extension '{}'!".format(project_file_ext))
             return False
 
+        self._index_modules()
+        return result
+
+    def _index_modules(self):
+        """Builds lookup tables of modules, their filelists and steps"""
+        self._modules_by_name = {}
+        self._modules_by_type = {}
+        self._filelists = {}
+        self._steps = {}
+        for module in self._modules or []:
+            self._index_module(module)
+
+    def _index_module(self, module):
+        name = module.get("name")
+        self._modules_by_name.setdefault(name, module)
+        self._modules_by_type.setdefault(module.get("type"), []).append(module)
+        filelists = module.get("filelists")
+        if type(filelists) is dict:
+            for filelist_name, files in filelists.items():
+                self._filelists.setdefault((name, filelist_name), files)
+        for step in module.get("steps") or []:
+            step_name = step.get("name") if type(step) is dict else step.name
+            self._steps.setdefault((name, step_name), step)
+
+    def _add_fragments(self, includes):
+        """Registers include fragments (one module per file). They are parsed on the first access to the module.
+
+        Parameters
+        ----------
+        includes : dict or list
+            Module name -> fragment path, or list of fragment paths/glob patterns (module name is the file name w/o
+            extension). Relative paths are relative to the project file.
+        """
+        project_dir_path = os.path.dirname(os.path.abspath(self._project_file_path))
+        if type(includes) is dict:
+            fragments = [(name, os.path.join(project_dir_path, path)) for name, path in includes.items()]
+        else:
+            fragments = []
+            for pattern in includes:
+                pattern = os.path.join(project_dir_path, pattern)
+                self._include_patterns[pattern] = glob_fragments(pattern)
+                for path in self._include_patterns[pattern]:
+                    fragments.append((os.path.splitext(os.path.basename(path))[0], path))
+        for name, path in fragments:
+            if name in self._fragments or name in self._modules_by_name:
+                logger.warning("Module \"{}\" is defined twice, fragment {} is ignored".format(name, path))
+                continue
+            self._fragments[name] = path
+            self._fragment_file_paths.append(path)
+
+    def _load_fragment(self, name):
+        path = self._fragments.pop(name, None)
+        if path is None:
+            return
+        start_times = get_times()
+        module = load_yaml(path) or {}
+        if type(module) is dict:
+            module = module.get("module", module)
+        if type(module) is not dict:
+            logger.error("Fragment {} of module \"{}\" isn't a mapping, it's ignored".format(path, name))
+            return
+        module.setdefault("name", name)
+        self._modules.append(module)
+        self._index_module(module)
+        profiler.add("Project fragment \"{}\"".format(name), start_times)
+        self._fragment_stats["loaded"] += 1
+        self._fragment_stats["wall"] += get_times()[0] - start_times[0]
+
+    def _load_all_fragments(self):
+        for name in list(self._fragments):
+            self._load_fragment(name)
+
+    def get_fragment_stats(self) -> dict:
+        """Returns statistics of include fragments: "loaded" and "deferred" (count), "wall" (parse time of loaded
+        ones, seconds), "deferred_size" (bytes which weren't parsed)
+        """
+        deferred_size = 0
+        for path in self._fragments.values():
+            try:
+                deferred_size += os.path.getsize(path)
+            except OSError:
+                pass
+        return dict(self._fragment_stats, deferred=len(self._fragments), deferred_size=deferred_size)
+
+    def get_source_file_paths(self) -> list:
+        """Returns paths of project file and its include fragments"""
+        return [self._project_file_path] + self._fragment_file_paths
+
+    def get_include_patterns(self) -> dict:
+        """Returns glob patterns of include fragments (absolute) and paths which they matched"""
+        return {pattern: list(paths) for pattern, paths in self._include_patterns.items()}
+
+    def is_includes_unchanged(self) -> bool:
+        """Checks that glob patterns of include fragments match the same files (e.g. no fragments were added)"""
+        return all(glob_fragments(pattern) == paths for pattern, paths in self._include_patterns.items())
+
     def load_yaml(self):
         project_data = {}
-        with open(self._project_file_path, 'r') as project_file:
-            project_data.update(yaml.load(project_file, Loader=yaml.FullLoader))
+        project_data.update(load_yaml(self._project_file_path))
 
         if project_data.get("project") is None:
             Logger.fatal("Yaml file has wrong format!")
@@ -164,96 +292,78 @@ class Project:
         self._variables = project_data.get("project", {}).get("variables")
         self._modules = project_data.get("project", {}).get("modules")
 
+        includes = project_data.get("project", {}).get("include")
+        if includes:
+            if self._modules is None:
+                self._modules = []
+            self._index_modules()
+            self._add_fragments(includes)
+
         return True
 
     def load_xml(self):
-        project_xml = etree.parse(self._project_file_path)
-        project_xml_top = project_xml.getroot()
-
-        self._name = project_xml_top.findtext("name")
-
-        variables = project_xml_top.find("variables")
-        for var in variables:
-            self._variables[var.findtext("name")] = var.findtext("value")
-            if var.findtext("auto") is not None and self._global_variables[var.findtext("auto")] is not None:
-                self._variables[var.findtext("name")] = self._global_variables[var.findtext("auto")]
-                Logger.info("Variable " + var.findtext("name") + " replaced by " + var.findtext("auto"))
-
-        modules = project_xml_top.find("modules")
-        if modules is not None:
-            for module in modules:
-                module_vars = {}
-                module_filelists = {}
-                module_steps = []
-                variables = module.find("variables")
-                if variables is not None:
-                    for var in variables:
-                        var_name = var.findtext("name")
-                        var_value = var.findtext("value")
-                        module_vars[var_name] = var_value
-                filelists = module.find("filelists")
-                if filelists is not None:
-                    for filelist in filelists:
-                        module_filelist = []
-                        module_filelist_name = filelist.findtext("name")
-                        files = filelist.findall("file")
-                        for file in files:
-                            module_filelist.append(file.text)
-                    module_filelists[module_filelist_name] = module_filelist
-                steps = module.find("steps")
-                if steps is not None:
-                    for step in steps:
-                        list_tools = []
-                        module_step_name = step.findtext("name")
-                        module_step_parameter = step.findtext("parameter")
-                        tools = step.find("tools")
-                        if tools is not None:
-                            for tool in tools:
-                                tools_name = tool.findtext("name")
-                                tools_parameter = tool.findtext("parameter")
-                                list_tools.append(Tool(tools_name, tools_parameter))
-                        module_steps.append(Step(module_step_name, module_step_parameter, list_tools))
-                self._modules.append(
-                    {'name': module.findtext("name"), 'type': module.findtext("type"), 'vars': module_vars,
-                     'filelists': module_filelists, 'steps': module_steps})
+        from core.xml_loader import iterparse_project_xml  # lxml is needed for xml projects only
+
+        project_data = iterparse_project_xml(self._project_file_path)
+
+        self._name = project_data["name"]
+
+        for var_name, var_value, var_auto in project_data["variables"]:
+            self._variables[var_name] = var_value
+            if var_auto is not None:
+                self._consulted_global_vars[var_auto] = self._global_variables.get(var_auto)
+            if var_auto is not None and self._global_variables.get(var_auto) is not None:
+                self._variables[var_name] = self._global_variables[var_auto]
+                Logger.info("Variable " + var_name + " replaced by " + var_auto)
+
+        self._modules.extend(project_data["modules"])
         return True
 
-    def recursive_replace(self, text, env={}):
+    def recursive_replace(self, text, env={}, owner=None):
         """Recursively replace environment variables by values
 
         Parameters
         ----------
         env : dictionary of strings
             dictionary of used environment variables
+        owner : str, optional
+            Name of the value in reports of undefined variables and cycles (the text itself by default)
         """
 
         if text is not None:
-            m = re.search('(\$)(\w+)', text)
-            if m is not None:
-                text = text.replace(m.group(0), self.get_global_var(m.group(2), env))
-                text = self.recursive_replace(text, env)
+            resolver = self._get_resolver(env)
+            text = resolver.expand(text, owner=text if owner is None else owner)
+            self._report_resolver_errors(resolver)
         return text
 
     def resolve_module_vars(self, env=None):
         """Replace variables in modules by values environment varibales
 
+        Module vars (like tools' paths, see Tools.replace_pathes_vars()) are leaves of the project variables graph:
+        they can refer to project and environment variables, but nothing refers to them (they aren't visible to
+        other module vars). So they can't be a part of a cycle; their undefined references and cycles of project
+        variables they use are reported with "<module>.<var>" owners.
+
         Parameters
         ----------
         env : dictionary of string
             dictionary of environment variables used in the project
         """
+        self._load_all_fragments()
         if self._modules is not None:
+            resolver = self._get_resolver(env)
             for module in self._modules:
                 if module['vars'] is not None:
                     for name in module['vars']:
-                        module['vars'][name] = self.recursive_replace(module['vars'][name], env)
+                        module['vars'][name] = resolver.expand(module['vars'][name],
+                                                               owner="{}.{}".format(module.get("name"), name))
+            self._report_resolver_errors(resolver)
 
     def get_module_vars_dict(self, type):
-        if self._modules is not None:
-            for module in self._modules:
-                if module["type"] == type:
-                    if module['vars'] is not None:
-                        return module['vars']
+        self._load_all_fragments()
+        for module in self._modules_by_type.get(type, []):
+            if module.get('vars') is not None:
+                return module['vars']
         return None
 
     def is_var(self, name) -> bool:
@@ -278,7 +388,7 @@ class Project:
     def set_var(self, name, value):
         ret = self._variables.get(name)
         if ret is None:
-            self._variables[name] = value
+            self._change_var(name, value)
 
     def update_var(self, name, value):
         ret = self._variables.get(name)
@@ -286,19 +396,54 @@ class Project:
             logger.error("Can't update project var! No such variable \"{}\" in the project! Try to add this to project config file.".format(name))
             os.abort()
         else:
+            self._change_var(name, value)
+
+    def _change_var(self, name, value):
+        """Sets raw value of variable. If the project is resolved already, only the variable and variables which
+        depend on it are resolved again, subscribers get changed values.
+        """
+        if not self._is_resolved:
             self._variables[name] = value
+            self._on_variables_changed()
+            return
+        resolver = self._get_resolver()
+        changed = resolver.set_variable(name, value)
+        self._report_resolver_errors(resolver)
+        self._variables.update(changed)
+        self._substitution = None
+        if changed:
+            for callback in list(self._subscribers):
+                callback(changed)
+
+    def subscribe(self, callback):
+        """Subscribes to changes of resolved variables (made by set_var() and update_var())
+
+        Usage example:
+        core.project.subscribe(lambda changed: print(changed))  # {"BUILD_DIR": "/new/path/build", ...}
+
+        :param callback:
+        callback(changed), where changed is dict name -> new resolved value
+        """
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self._subscribers.remove(callback)
+
+    def get_var_dependents(self, name) -> set:
+        """Returns names of project variables which depend on the variable (directly or transitively)"""
+        return self._get_resolver().get_dependents(name)
 
     def print_vars(self):
         for var in self._variables:
             print(var + ": " + self._variables[var])
 
     def replace_variables(self, expression):
-        for var in self._variables:
-            try:
-                expression = expression.replace("$" + var, self._variables[var])
-            except TypeError:
-                return expression  # TODO: VAL-113
-        return expression
+        """Replaces "$VAR" by values of project variables (one pass, environment isn't used). Fast: substitution is
+        compiled once per set of variables and results are cached.
+        """
+        if self._substitution is None:
+            self._substitution = Substitution(self._variables)
+        return self._substitution.substitute(expression)
 
     def replace_variables_in_parameters(self, env):
         """Replaces environment vars in parameter and name of tool in step by value of environment var
@@ -308,33 +453,85 @@ class Project:
         env : dictionary of strings
             dictionary of used environment variables
         """
+        self._load_all_fragments()
         if self._modules is not None:
+            resolver = self._get_resolver(env)
             for module in self._modules:
                 if module['steps'] is not None:
                     for step in module['steps']:
                         if step.tools is not None:
                             for tool in step.tools:
-                                # print("START", tool.parameter)
-                                tool.parameter = self.recursive_replace(tool.parameter, env)
-                                tool._name = self.recursive_replace(tool._name, env)
-                                # print("END", tool.parameter)
+                                tool.parameter = resolver.expand(tool.parameter, owner=tool.name)
+                                tool.name = resolver.expand(tool.name, owner=tool.name)
+            self._report_resolver_errors(resolver)
 
     def set_vars_to_env(self):
+        """Writes variables into the process environment. Prefer core.environment.build_environment(tools, project):
+        it doesn't change os.environ.
+        """
         for var in self._variables:
             os.environ[var] = self._variables[var]
 
+    def get_consulted_env(self) -> dict:
+        """Returns environment variables which were read while the project was loaded and resolved. Resolved
+        project is valid while these variables have the same values.
+        :return:
+        Dict name -> value (None if variable wasn't set)
+        """
+        return self._consulted_env
+
+    def get_consulted_global_vars(self) -> dict:
+        return self._consulted_global_vars
+
+    def set_global_variables(self, global_variables):
+        self._global_variables = global_variables
+
+    def get_project_file_path(self) -> str:
+        return self._project_file_path
+
     def get_all_vars(self):
         return self._variables
 
     def get_module_data(self, type):
-        for module in self._modules:
-            if module["type"] == type:
-                return module
+        """Returns the first module of the type (or None)"""
+        self._load_all_fragments()
+        modules = self._modules_by_type.get(type)
+        if modules:
+            return modules[0]
+        return None
+
+    def get_module(self, name):
+        """Returns module by name (or None)"""
+        self._load_fragment(name)
+        return self._modules_by_name.get(name)
+
+    def get_modules_of_type(self, type) -> list:
+        self._load_all_fragments()
+        return list(self._modules_by_type.get(type, []))
+
+    def get_filelist(self, module_name, filelist_name):
+        """Returns files of module's filelist (or None)"""
+        self._load_fragment(module_name)
+        return self._filelists.get((module_name, filelist_name))
+
+    def get_step(self, module_name, step_name):
+        """Returns step of module (or None)"""
+        self._load_fragment(module_name)
+        return self._steps.get((module_name, step_name))
+
+    def get_modules(self) -> list:
+        """Returns all modules (include fragments are loaded)"""
+        self._load_all_fragments()
+        return self._modules or []
+
+    def get_module_names(self) -> list:
+        """Returns names of all modules without loading of include fragments"""
+        return [module.get("name") for module in self._modules or []] + list(self._fragments)
 
     def modules_info(self):
         """Prints information about modules
         """
-        for module in self._modules:
+        for module in self.get_modules():
             print(100 * "-")
             for key in module.keys():
                 if key != "steps":
@@ -352,34 +549,63 @@ class Project:
         ret = self._variables.get(name)
         if ret is None:
             ret = os.getenv(name)
+            self._consulted_env[name] = ret
         if ret is None:
             ret = virtual_env.get(name)
         if ret is None:
             logger.warning("Can't find variable \"{}\" in project, environment, virtual env!".format(name))
         return ret
 
+    def _on_variables_changed(self):
+        """Drops everything which was built from variables"""
+        self._resolver = None
+        self._is_resolved = False
+        self._substitution = None
+
+    def _lookup_external_var(self, name, virtual_env=None):
+        """Looks for a non-project variable: environment, then virtual env"""
+        ret = os.getenv(name)
+        self._consulted_env[name] = ret
+        if ret is None and virtual_env:
+            ret = virtual_env.get(name)
+        return ret
+
+    def _get_resolver(self, virtual_env=None) -> VariableResolver:
+        """Returns resolver of project variables. Resolver without virtual env is memoized until variables are
+        changed.
+        """
+        if virtual_env:
+            return VariableResolver(self._variables or {}, lambda name: self._lookup_external_var(name, virtual_env))
+        if self._resolver is None:
+            self._resolver = VariableResolver(self._variables or {}, self._lookup_external_var)
+        return self._resolver
+
+    @staticmethod
+    def _report_resolver_errors(resolver, strict=False):
+        if resolver.has_errors():
+            if strict:
+                resolver.check()
+            logger.warning("Can't resolve variables: {}".format(format_errors(resolver.get_undefined(),
+                                                                              resolver.get_cycles())))
+            resolver.clear_errors()
+
     def replace_vars(self, to_replace, recursive=True, real_env_enable=False, virtual_env={}) -> str or list or dict:
+        """Replaces "$VAR" by values of project variables (or environment/virtual env variables). Postponed vars
+        ("$$VAR") are kept. Lists and dicts are updated in place.
+        """
+        resolver = self._get_resolver(virtual_env)
         if type(to_replace) is str:
-            m = re.findall(r'(?<!\$)\$(?!\$)(\w+)', to_replace)
-            if bool(m):
-                for item in m:
-                    if self.get_global_var(item, virtual_env) is not None:
-                        to_replace = to_replace.replace("${}".format(item), self.get_global_var(item, virtual_env))
-                        stop_flag = False
-                    else:
-                        # logger.warning("Can't replace variable inside \"{}\"!".format(to_replace))
-                        stop_flag = True
-                if recursive and not stop_flag:
-                    to_replace = self.replace_vars(to_replace, True, real_env_enable, virtual_env)
+            to_replace = resolver.expand(to_replace, owner=to_replace, recursive=recursive)
             postponed_vars = re.findall(r'\$\$(\w+)', to_replace)
             if bool(postponed_vars):
                 logger.debug("Postponed var(s) found: {}".format(", ".join(postponed_vars)))
         elif type(to_replace) is list:
             for index, item in enumerate(to_replace):
-                to_replace[index] = self.replace_vars(item, recursive, real_env_enable, virtual_env)
+                to_replace[index] = resolver.expand(item, recursive=recursive)
         elif type(to_replace) is dict:
             for item in to_replace:
-                to_replace[item] = self.replace_vars(to_replace[item], recursive, real_env_enable, virtual_env)
+                to_replace[item] = resolver.expand(to_replace[item], owner=item, recursive=recursive)
+        self._report_resolver_errors(resolver)
         return to_replace
 
     def replace_postponed_vars(self, to_replace: str, replace_by: dict):
@@ -395,20 +621,48 @@ class Project:
         :return:
         String with replaced "$$SAMPLE_PARAM"
         """
-        postponed_vars = re.findall(r'\$\$(\w+)', to_replace)
-        if bool(postponed_vars):
-            for item in postponed_vars:
-                return to_replace.replace("$${}".format(item), replace_by[item])
+        return compile_template(to_replace).render(replace_by)
 
-    def resolve_vars(self):
-        self._variables = self.replace_vars(self._variables)
+    def compile_template(self, name_or_string) -> Template:
+        """Compiles string with postponed vars ("$$TEST_NAME") into a template. Use it when the same string is rendered
+        many times.
+
+        Usage example:
+        template = core.project.compile_template("TEST_CMD")
+        cmds = template.render_many([{"TEST_NAME": "test_0"}, {"TEST_NAME": "test_1"}])
+
+        :param name_or_string:
+        Name of project variable or a string (its "$VAR" are replaced first)
+        :return:
+        Template object (see core.resolver.Template), render() and render_many() raise TemplateKeysError (KeyError)
+        with all missing vars
+        """
+        if self.is_var(name_or_string):
+            text = self.get_var(name_or_string)
+        else:
+            text = self.replace_vars(name_or_string)
+        return compile_template(text)
+
+    def resolve_vars(self, strict=False):
+        """Resolves project variables. Every variable is expanded once, in dependency order. Undefined variables and
+        cycles are reported by one warning (and are kept as "$VAR").
+        :param strict:
+        Raise VariableResolutionError instead of warning
+        """
+        if self._variables is None:
+            return
+        resolver = self._get_resolver()
+        self._variables = resolver.resolve_all()
+        self._report_resolver_errors(resolver, strict)
+        self._is_resolved = True
+        self._substitution = None
 
     def write_project_yaml(self, path):
         """Save project as new YAML file
         :param path:
             New file path
         """
-        new_yaml = {"project": {"name": self._name, "variables": self._variables, "modules": self._modules}}
+        new_yaml = {"project": {"name": self._name, "variables": self._variables, "modules": self.get_modules()}}
 
         try:
             new_yaml_file = open(path, "w")
@@ -0,0 +1,78 @@
+"""Command registry core module
+"""
+
+import copy
+from sys import modules
+
+from core.logger import Logger
+
+
+class CommandRegistry(object):
+    """Commands of all flows indexed by command name and by flow. It's built once from the commands manifest, so
+    all lookups are dict accesses. Declarations are returned as copies, so callers can't change the registry.
+
+    Parameters
+    ----------
+    declarations : list of dict
+        Command declarations (flow, name, help, params, flags, silent, no_project)
+    package : str
+        Name of the package with flows
+    """
+
+    def __init__(self, declarations, package="flows") -> None:
+        self._package = package
+        self._commands = {}
+        self._flows = {}
+        for command in declarations:
+            self._commands[command["name"]] = command
+            self._flows.setdefault(command["flow"], []).append(command)
+
+    def __contains__(self, command_name) -> bool:
+        return command_name in self._commands
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+    def get_flows(self) -> list:
+        return list(self._flows)
+
+    def get_commands(self, flow=None) -> list:
+        if flow is None:
+            return copy.deepcopy(list(self._commands.values()))
+        return copy.deepcopy(self._flows.get(flow, []))
+
+    def _get_command(self, command_name: str) -> dict:
+        command = self._commands.get(command_name)
+        if command is None:
+            Logger.error("No such command \"{}\"".format(command_name))
+        return command
+
+    def get_command(self, command_name: str) -> dict:
+        return copy.deepcopy(self._get_command(command_name))
+
+    def get_flow_of_command(self, command_name: str) -> str:
+        return self._get_command(command_name)["flow"]
+
+    def get_params_of_command(self, command_name: str) -> list:
+        return copy.deepcopy(self._get_command(command_name)["params"])
+
+    def get_flags_of_command(self, command_name: str) -> list:
+        return copy.deepcopy(self._get_command(command_name)["flags"])
+
+    def get_silent_of_command(self, command_name: str) -> bool:
+        return self._get_command(command_name)["silent"]
+
+    def get_no_project_of_command(self, command_name: str) -> bool:
+        return self._get_command(command_name)["no_project"]
+
+    def get_module(self, command_name: str):
+        """Imports the command's module. This is the only place where command modules are loaded.
+        :return:
+        Module object or None if there is no such command
+        """
+        command = self._get_command(command_name)
+        if command is None:
+            return None
+        module_name = "{}.{}.commands.{}".format(self._package, command["flow"], command_name)
+        __import__(module_name)  # Not importlib: "-X importtime" (--profile-imports) sees only __import__
+        return modules[module_name]
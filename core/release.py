@@ -4,110 +4,293 @@
 import logging
 import os
 
-import yaml
+from core.config_io import load_yaml
 
 DEFAULT_RELEASE_FOLDER = "releases"
 DEFAULT_RELEASE_FILENAME = "release"
 logger = logging.getLogger(__name__)
 
 
-class Dependence:
-    def __init__(self, kids, next=None):
-        if type(kids) is str:
-            self.kids = None
-            self.name = kids
-        else:
-            self.kids = kids
-            self.name = "Top"
-        self.next = next
-        self.vcs_local_path = None
-
-    def set_kids(self, kids):
-        self.kids = kids
-
-    def add_kids(self, kid) -> None:
-        dep = self.kids
-        if dep == None:
-            self.kids = kid
-        else:
-            while True:
-                if dep.is_last():
-                    dep.set_next(kid)
-                    break
-                else:
-                    dep = dep.get_next()
+def get_release_file_path(project_file_path, project_file_type, release="HEAD") -> str:
+    """Returns path of the release file: releases/release.<type> for HEAD or releases/release_<release>.<type>
+    """
+    release_dir_path = os.path.join(os.path.dirname(project_file_path), DEFAULT_RELEASE_FOLDER)
+    if release == "HEAD":
+        release_file_name = "{}.{}".format(DEFAULT_RELEASE_FILENAME, project_file_type)
+    else:
+        release_file_name = "{}_{}.{}".format(DEFAULT_RELEASE_FILENAME, release, project_file_type)
+    return os.path.join(release_dir_path, release_file_name)
 
-    def is_last(self) -> bool:
-        if self.next is None:
-            return True
-        else:
-            return False
 
-    def set_next(self, next):
-        self.next = next
+class Dependence(object):
+    """Single dependence (repository, storage, ...) of the release. Nodes only keep their own fields, the relations are
+    kept by DependencyGraph.
+    """
 
-    def get_next(self):
-        return self.next
+    __slots__ = ("name", "group", "vcs", "local_path", "tag", "branch", "remote_path", "requires")
 
-    def set_name(self, name):
+    def __init__(self, name, group=None, vcs=None, local_path=None, tag=None, branch=None, remote_path=None,
+                 requires=()) -> None:
         self.name = name
+        self.group = group
+        self.vcs = vcs
+        self.local_path = local_path
+        self.tag = tag
+        self.branch = branch
+        self.remote_path = remote_path
+        self.requires = tuple(requires)
+
+    def __repr__(self) -> str:
+        return "{}({!r})".format(type(self).__name__, self.name)
 
     def get_name(self) -> str:
         return self.name
 
-    def get_kids(self):
-        return self.kids
-
-    def get_type(self):  # Override it
-        return None
-
-    def find_kid(self, name):
-        dep = self.get_kids()
-        while True:
-            if dep.get_name() is name:
-                return dep
-            else:
-                if dep.is_last():
-                    break
-                else:
-                    dep = dep.get_next()
-        return None
-
-    def set_local_path(self, path):
-        self.vcs_local_path = path
-
-
-class RepoSos(Dependence):
-    def __init__(self, kids, next, name, local_path, tag):
-        super().__init__(kids, next=next)
-        super().set_name(name)
-        self.local_path = local_path
-        self.tag = tag
+    def get_group(self) -> str:
+        return self.group
 
     def get_type(self):
-        return "sos"
+        return self.vcs
 
     def get_tag(self) -> str:
-        """Returns tag for RepoSos object
+        """Returns tag of the dependence
 
         Returns
         -------
         str
-            Returns tag for RepoSos object
+            Returns tag of the dependence (None if it isn't set)
         """
         return self.tag
 
 
+class RepoSos(Dependence):
+    __slots__ = ()
+
+    def __init__(self, name, group=None, local_path=None, tag=None, **kwargs) -> None:
+        super().__init__(name, group=group, vcs="sos", local_path=local_path, tag=tag, **kwargs)
+
+
 class RepoGit(Dependence):
-    def __init__(self, kids, next, name):
-        super().__init__(kids, next=next)
-        super().set_name(name)
+    __slots__ = ()
 
-    def get_type(self):
-        return "git"
+    def __init__(self, name, group=None, **kwargs) -> None:
+        super().__init__(name, group=group, vcs="git", **kwargs)
+
+
+_DEPENDENCE_CLASSES = {"sos": RepoSos, "git": RepoGit}
+
+
+def make_dependence(group, data) -> Dependence:
+    """Creates dependence node from its release file entry ({"name", "vcs", "local_path", "tag", ...})"""
+    vcs = data.get("vcs")
+    requires = data.get("requires") or ()
+    if type(requires) is str:
+        requires = requires.split()
+    fields = {"local_path": data.get("local_path"), "tag": data.get("tag"), "branch": data.get("branch"),
+              "remote_path": data.get("remote_path"), "requires": requires}
+    if vcs in _DEPENDENCE_CLASSES:
+        return _DEPENDENCE_CLASSES[vcs](data.get("name"), group=group, **fields)
+    return Dependence(data.get("name"), group=group, vcs=vcs, **fields)
+
+
+class DependencyGraph(object):
+    """Dependencies of the release indexed by name, group and VCS type
+
+    Edges are the optional "requires" lists of the dependencies (names of other dependencies). All lookups are O(1),
+    iteration keeps the order of the release file.
+    """
+
+    def __init__(self) -> None:
+        self._nodes = {}  # Name -> Dependence
+        self._groups = {}  # Group -> {name: Dependence}
+        self._by_vcs = {}  # VCS type -> {name: Dependence}
+        self._required_by = {}  # Name -> {name of dependent: None}
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, name) -> bool:
+        return name in self._nodes
+
+    def __iter__(self):
+        return iter(self._nodes.values())
+
+    def add_group(self, group) -> None:
+        self._groups.setdefault(group, {})
+
+    def add(self, node) -> Dependence:
+        """Adds dependence node. A dependence with the same name is replaced (the last one wins)."""
+        if node.name in self._nodes:
+            logger.warning("Dependence '{}' is defined more than once, the last definition is used".format(node.name))
+            self.remove(node.name)
+        self._nodes[node.name] = node
+        self._groups.setdefault(node.group, {})[node.name] = node
+        self._by_vcs.setdefault(node.vcs, {})[node.name] = node
+        for name in node.requires:
+            self._required_by.setdefault(name, {})[node.name] = None
+        return node
+
+    def remove(self, name) -> None:
+        node = self._nodes.pop(name)
+        del self._groups[node.group][name]
+        del self._by_vcs[node.vcs][name]
+        for required_name in node.requires:
+            self._required_by.get(required_name, {}).pop(name, None)
+
+    def get(self, name):
+        return self._nodes.get(name)
+
+    def get_names(self) -> list:
+        return list(self._nodes)
+
+    def get_groups(self) -> list:
+        return list(self._groups)
+
+    def get_group(self, group) -> list:
+        return list(self._groups.get(group, {}).values())
+
+    def get_by_vcs(self, vcs) -> list:
+        return list(self._by_vcs.get(vcs, {}).values())
+
+    def get_vcs_types(self) -> list:
+        return [vcs for vcs, nodes in self._by_vcs.items() if nodes]
+
+    def get_dependencies(self, name, recursive=False) -> list:
+        """Names of the dependencies required by the dependence (transitively if recursive)"""
+        return self._walk(name, lambda node_name: self._nodes[node_name].requires if node_name in self._nodes else (),
+                          recursive)
+
+    def get_dependents(self, name, recursive=False) -> list:
+        """Names of the dependencies which require the dependence (transitively if recursive)"""
+        return self._walk(name, lambda node_name: self._required_by.get(node_name, ()), recursive)
+
+    def get_missing(self) -> dict:
+        """Required names which aren't defined in the release: {name: [names of dependents]}"""
+        return {name: list(dependents) for name, dependents in self._required_by.items()
+                if dependents and name not in self._nodes}
+
+    @staticmethod
+    def _walk(name, get_next, recursive) -> list:
+        if not recursive:
+            return list(get_next(name))
+        visited = {name: None}
+        stack = list(reversed(list(get_next(name))))
+        ret = []
+        while stack:
+            node_name = stack.pop()
+            if node_name in visited:
+                continue
+            visited[node_name] = None
+            ret.append(node_name)
+            stack.extend(reversed(list(get_next(node_name))))
+        return ret
+
+
+def build_graph(dependencies) -> DependencyGraph:
+    """Builds dependency graph from release file data: [(group, [dependence data, ...]), ...]"""
+    graph = DependencyGraph()
+    for group, deps in dependencies:
+        graph.add_group(group)
+        for dep in deps or []:
+            graph.add(make_dependence(group, dep))
+    return graph
+
+
+class ReleaseDiff(object):
+    """Changes of dependencies between two releases (old -> new)
+
+    Attributes
+    ----------
+    added : list
+        Dependencies of the new release which aren't in the old one
+    removed : list
+        Dependencies of the old release which aren't in the new one
+    retagged : list
+        (old, new) pairs with changed tag (or branch for git)
+    moved : list
+        (old, new) pairs with changed local path
+    changed : list
+        (old, new) pairs with other changes (group, VCS type, remote path, requirements)
+    """
+
+    def __init__(self, old_version, new_version) -> None:
+        self.old_version = old_version
+        self.new_version = new_version
+        self.added = []
+        self.removed = []
+        self.retagged = []
+        self.moved = []
+        self.changed = []
+
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.retagged or self.moved or self.changed)
+
+    def get_changed_names(self) -> list:
+        """Names of the new release's dependencies to be updated (added, retagged, moved or otherwise changed)"""
+        names = {}
+        for dep in self.added:
+            names[dep.name] = None
+        for pairs in (self.retagged, self.moved, self.changed):
+            for _, new in pairs:
+                names[new.name] = None
+        return list(names)
+
+    def get_changed(self, vcs=None) -> list:
+        """Dependencies of the new release to be updated (of the VCS type only if it's set), in the diff order"""
+        new_deps = {dep.name: dep for dep in self.added}
+        for pairs in (self.retagged, self.moved, self.changed):
+            for _, new in pairs:
+                new_deps[new.name] = new
+        return [dep for dep in new_deps.values() if vcs is None or dep.vcs == vcs]
+
+    def print_diff(self):
+        print("Diff {} -> {}:".format(self.old_version, self.new_version))
+        if self.is_empty():
+            print("  No changes")
+            return
+        for dep in self.added:
+            print("  + {} ({}) [{}]".format(dep.name, dep.vcs, dep.group))
+        for dep in self.removed:
+            print("  - {} ({}) [{}]".format(dep.name, dep.vcs, dep.group))
+        for old, new in self.retagged:
+            if old.tag != new.tag:
+                print("  ~ {}: tag {} -> {}".format(new.name, old.tag, new.tag))
+            else:
+                print("  ~ {}: branch {} -> {}".format(new.name, old.branch, new.branch))
+        for old, new in self.moved:
+            print("  > {}: local path {} -> {}".format(new.name, old.local_path, new.local_path))
+        for old, new in self.changed:
+            print("  * {}: {}".format(new.name, ", ".join(_get_changed_fields(old, new))))
+
+
+_OTHER_FIELDS = ("group", "vcs", "remote_path", "requires")
+
+
+def _get_changed_fields(old, new) -> list:
+    return [field for field in _OTHER_FIELDS if getattr(old, field) != getattr(new, field)]
 
 
-class Release:
+def diff_graphs(old_graph, new_graph, old_version=None, new_version=None) -> ReleaseDiff:
+    """Compares two dependency graphs: one pass over each of them with O(1) lookups in the other one"""
+    ret = ReleaseDiff(old_version, new_version)
+    for old in old_graph:
+        new = new_graph.get(old.name)
+        if new is None:
+            ret.removed.append(old)
+            continue
+        if old.tag != new.tag or old.branch != new.branch:
+            ret.retagged.append((old, new))
+        if old.local_path != new.local_path:
+            ret.moved.append((old, new))
+        if _get_changed_fields(old, new):
+            ret.changed.append((old, new))
+    for new in new_graph:
+        if new.name not in old_graph:
+            ret.added.append(new)
+    return ret
+
+
+class Release(object):
     def __init__(self, project_file_path, project_file_type, release="HEAD"):
         self._project_file_path = project_file_path
         self._project_file_type = project_file_type
@@ -115,9 +298,7 @@ class Release:
         self._release_dir_path = None
         self._release_file_path = None
         self._version = "Unknown"
-        self._dependencies = Dependence(None)
-        self.repo_sos = []  # TODO
-        self.sos_local_paths = []  # TODO
+        self._dependencies = DependencyGraph()
         self.load()
 
     def load(self, custom_project_file_path=None, project_file_type=None, release=None):
@@ -134,11 +315,8 @@ class Release:
             os.abort()
 
         self._release_dir_path = os.path.join(os.path.dirname(self._project_file_path), DEFAULT_RELEASE_FOLDER)
-        if self._release == "HEAD":
-            release_file_name = "{}.{}".format(DEFAULT_RELEASE_FILENAME, self._project_file_type)
-        else:
-            release_file_name = "{}_{}.{}".format(DEFAULT_RELEASE_FILENAME, self._release, self._project_file_type)
-        self._release_file_path = os.path.join(self._release_dir_path, release_file_name)
+        self._release_file_path = get_release_file_path(self._project_file_path, self._project_file_type,
+                                                        self._release)
         logger.debug("Release file path: {}".format(self._release_file_path))
 
         if not os.path.isfile(self._release_file_path):
@@ -155,8 +333,7 @@ class Release:
 
     def load_yaml(self):
         release_data = {}
-        with open(self._release_file_path, 'r') as release_file:
-            release_data.update(yaml.load(release_file, Loader=yaml.FullLoader))
+        release_data.update(load_yaml(self._release_file_path))
 
         if release_data.get("release") is None:
             logger.fatal("Release yaml file has wrong format!")
@@ -165,108 +342,96 @@ class Release:
         self._version = release_data.get("release", {}).get("version")
         dependencies_dict = release_data.get("release", {}).get("dependencies")
 
-        for dep_type in dependencies_dict:
-            self._dependencies.add_kids(Dependence(dep_type))
-            node = self._dependencies.find_kid(dep_type)
-            for dep in dependencies_dict[dep_type]:
-                if dep.get("vcs") == "sos":
-                    node.add_kids(RepoSos(None, None, name=dep.get("name"), local_path=dep.get("local_path"),
-                                          tag=dep.get("tag")))
-                    self.sos_local_paths.append(dep.get("local_path"))  # TODO
-                    self.repo_sos.append(
-                        RepoSos(None, None, name=dep.get("name"), local_path=dep.get("local_path"),
-                                tag=dep.get("tag")))  # TODO
-                elif dep.get("vcs") == "git":
-                    node.add_kids(RepoGit(None, None, name=dep.get("name")))
-                elif dep.get("vcs") == "svn":
-                    pass  # TODO
-                else:
-                    node.add_kids(Dependence(dep.get("name")))
+        self._dependencies = build_graph(dependencies_dict.items())
 
     def load_xml(self):
-        release_xml = etree.parse(self._release_file_path)
-        release_xml_top = release_xml.getroot()
-
-        self._version = release_xml_top.findtext("version")
-
-        dependencies = release_xml_top.find("dependencies")
-        for dep_type in dependencies:
-            if dep_type.tag == "hardware":
-                pass
-            elif dep_type.tag == "software":
-                pass
-            elif dep_type.tag == "scripts":
-                pass
-            elif dep_type.tag == "shared":
-                pass
-            else:
+        from core.xml_loader import iterparse_release_xml  # lxml is needed for xml projects only
+
+        release_data = iterparse_release_xml(self._release_file_path)
+
+        self._version = release_data["version"]
+
+        for dep_type, _ in release_data["dependencies"]:
+            if dep_type not in ("hardware", "software", "scripts", "shared"):
                 print("ERROR: Undefined dependence group!")  # TODO
                 exit(1)
-            self._dependencies.add_kids(Dependence(dep_type.tag))
-            node = self._dependencies.find_kid(dep_type.tag)
-            for dep in dep_type:
-                # print("| ├ " + dep.findtext("name"))
-                if dep.findtext("vcs") == "sos":  # TODO: Add others
-                    # print("| ├ " + dep.findtext("local_path"))
-                    node.add_kids(RepoSos(None, None, name=dep.findtext("name"), local_path=dep.findtext("local_path"),
-                                          tag=dep.findtext("tag")))
-                    self.sos_local_paths.append(dep.findtext("local_path"))  # TODO
-                    self.repo_sos.append(
-                        RepoSos(None, None, name=dep.findtext("name"), local_path=dep.findtext("local_path"),
-                                tag=dep.findtext("tag")))  # TODO
-                else:
-                    node.add_kids(Dependence(dep.findtext("name")))
+        self._dependencies = build_graph(release_data["dependencies"])
 
-    def print_graph(self):
-        print("Dependencies:")
+    def get_dependencies(self) -> DependencyGraph:
+        return self._dependencies
 
-        dep = self._dependencies
-        depth = 0
+    def get_dependence(self, name):
+        return self._dependencies.get(name)
 
-        stack = []
+    def get_version(self) -> str:
+        return self._version
 
-        while True:
-            for i in range(0, depth):
-                if stack[i].is_last():
-                    print("  ", end="")
-                else:
-                    print("| ", end="")
+    def get_release(self) -> str:
+        return self._release
 
-            if dep.is_last():
-                print("└ ", end="")
-            else:
-                print("├ ", end="")
+    def has_release(self, release) -> bool:
+        """Checks if the release file of the version exists"""
+        return os.path.isfile(get_release_file_path(self._project_file_path, self._project_file_type, release))
 
-            if dep.get_type() is None:
-                print(dep.get_name())
-            else:
-                print("{} ({})".format(dep.get_name(), dep.get_type()))
+    def load_release(self, release) -> "Release":
+        """Loads another version of the release of the same project"""
+        return Release(self._project_file_path, self._project_file_type, release)
 
-            if dep.kids is not None:
-                depth += 1
-                stack.append(dep)
-                dep = dep.get_kids()
-            else:
-                if dep.is_last():
-                    while dep.is_last():
-                        depth -= 1
-                        if depth <= 0:
-                            break
-                        dep = stack.pop()
-                    if depth <= 0:
-                        break
-                    dep = dep.get_next()
+    def diff(self, other) -> ReleaseDiff:
+        """Changes from this release to the other one (e.g. old.diff(new) lists repositories to be updated)
+
+        Parameters
+        ----------
+        other : Release
+            New release
+
+        Returns
+        -------
+        ReleaseDiff
+            Added, removed, retagged, moved and otherwise changed dependencies
+        """
+        return diff_graphs(self._dependencies, other.get_dependencies(), self._release, other.get_release())
+
+    def print_graph(self):
+        print("Dependencies:")
+        print("└ Top")
+        groups = self._dependencies.get_groups()
+        for group_index, group in enumerate(groups):
+            last_group = group_index == len(groups) - 1
+            print("  {} {}".format("└" if last_group else "├", group))
+            deps = self._dependencies.get_group(group)
+            for dep_index, dep in enumerate(deps):
+                print("  {} {} ".format(" " if last_group else "|", "└" if dep_index == len(deps) - 1 else "├"), end="")
+                if dep.get_type() is None:
+                    print(dep.get_name())
                 else:
-                    dep = dep.get_next()
+                    print("{} ({})".format(dep.get_name(), dep.get_type()))
+
+    def get_release_file_path(self) -> str:
+        return self._release_file_path
+
+    def get_project_file_path(self) -> str:
+        return self._project_file_path
+
+    def get_project_file_type(self) -> str:
+        return self._project_file_type
 
     def get_repo_sos(self, name):
-        for repo in self.repo_sos:
-            if repo.get_name() == name:
-                return repo
+        dep = self._dependencies.get(name)
+        if dep is not None and dep.get_type() == "sos":
+            return dep
         return None
 
     def get_all_repo_sos(self):
-        return self.repo_sos
+        return self._dependencies.get_by_vcs("sos")
 
     def get_all_sos_paths(self):  # TODO: get_all_repo_sos_paths()
-        return self.sos_local_paths  # TODO
+        return [repo.local_path for repo in self._dependencies.get_by_vcs("sos")]
+
+    @property
+    def repo_sos(self):
+        return self.get_all_repo_sos()
+
+    @property
+    def sos_local_paths(self):
+        return self.get_all_sos_paths()
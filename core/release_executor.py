@@ -0,0 +1,224 @@
+"""Release executor core module
+
+Runs an operation (e.g. VCS update) for dependencies of the release in a bounded thread pool:
+    * a dependence starts after all its "requires" dependencies are finished. If one of them failed (or was
+      skipped), the dependence is skipped.
+    * the operation writes its messages to the stream it gets (print(..., file=out)). Output is collected per
+      dependence and printed at once in the calling thread when the dependence is finished, so outputs of parallel
+      operations aren't interleaved.
+    * policy FAIL_FAST: nothing is started after the first failure (running operations are finished), other
+      dependencies are skipped. Policy CONTINUE: all independent dependencies are processed.
+
+Operation is a callable(dependence, out) -> value. It fails if it raises an exception (Logger.fatal() too).
+"""
+
+import io
+import logging
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 8
+
+FAIL_FAST = "fail_fast"
+CONTINUE = "continue"
+POLICIES = (FAIL_FAST, CONTINUE)
+
+PASSED = "passed"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+class OperationResult(object):
+    """Result of the operation for a single dependence"""
+
+    __slots__ = ("name", "status", "value", "error", "start", "duration", "output")
+
+    def __init__(self, name, status, value=None, error=None, start=None, duration=0.0, output="") -> None:
+        self.name = name
+        self.status = status
+        self.value = value
+        self.error = error
+        self.start = start
+        self.duration = duration
+        self.output = output
+
+    def __repr__(self) -> str:
+        return "OperationResult({!r}, {!r}, {:.3f}s)".format(self.name, self.status, self.duration)
+
+    def is_ok(self) -> bool:
+        return self.status == PASSED
+
+
+class ExecutionReport(object):
+    """Results of the operation for all dependencies (in completion order) and the total time"""
+
+    def __init__(self) -> None:
+        self.results = {}  # Name -> OperationResult
+        self.duration = 0.0
+
+    def __getitem__(self, name) -> OperationResult:
+        return self.results[name]
+
+    def add(self, result) -> None:
+        self.results[result.name] = result
+
+    def get_names(self, status) -> list:
+        return [name for name, result in self.results.items() if result.status == status]
+
+    def get_failed(self) -> list:
+        return self.get_names(FAILED)
+
+    def get_skipped(self) -> list:
+        return self.get_names(SKIPPED)
+
+    def is_ok(self) -> bool:
+        return all(result.status == PASSED for result in self.results.values())
+
+    def print_report(self):
+        print("Dependencies: {} passed, {} failed, {} skipped in {:.2f}s".format(
+            len(self.get_names(PASSED)), len(self.get_failed()), len(self.get_skipped()), self.duration))
+        for result in self.results.values():
+            if result.status == PASSED:
+                continue
+            print("\t{} {}: {}".format(result.status.upper(), result.name, result.error))
+
+
+def _run_operation(operation, dep) -> OperationResult:
+    start = time.time()
+    timer = time.perf_counter()
+    out = io.StringIO()
+    try:
+        value = operation(dep, out)
+    except (Exception, SystemExit) as e:
+        logger.debug("Operation failed for dependence '{}'".format(dep.name), exc_info=True)
+        result = OperationResult(dep.name, FAILED, error=e, start=start, duration=time.perf_counter() - timer)
+    else:
+        result = OperationResult(dep.name, PASSED, value=value, start=start, duration=time.perf_counter() - timer)
+    result.output = out.getvalue()
+    return result
+
+
+class DependencyExecutor(object):
+    """Runs an operation for dependencies of the release graph (see the module description)
+
+    Parameters
+    ----------
+    graph : core.release.DependencyGraph
+        Dependencies of the release
+    max_workers : int
+        Size of the thread pool
+    policy : str
+        FAIL_FAST or CONTINUE
+    out : file-like object, optional
+        Stream for outputs of the operation (sys.stdout at the moment of printing by default)
+    """
+
+    def __init__(self, graph, max_workers=DEFAULT_MAX_WORKERS, policy=CONTINUE, out=None) -> None:
+        if policy not in POLICIES:
+            raise ValueError("Unknown policy '{}', expected one of {}".format(policy, ", ".join(POLICIES)))
+        self._graph = graph
+        self._max_workers = max(1, max_workers)
+        self._policy = policy
+        self._out = out
+
+    def run(self, operation, deps=None) -> ExecutionReport:
+        """Runs the operation
+
+        Parameters
+        ----------
+        operation : callable
+            callable(dependence, out) -> value (out is the stream for its messages)
+        deps : list, optional
+            Dependencies to process (all dependencies of the graph by default). Requirements on dependencies which
+            aren't in the list are ignored.
+
+        Returns
+        -------
+        ExecutionReport
+            Per-dependence results and timings
+        """
+        deps = list(self._graph) if deps is None else list(deps)
+        report = ExecutionReport()
+        timer = time.perf_counter()
+
+        by_name = {dep.name: dep for dep in deps}
+        waiting = {}  # Name -> number of not finished requirements
+        dependents = {name: [] for name in by_name}
+        for dep in deps:
+            requires = [name for name in dict.fromkeys(dep.requires) if name in by_name and name != dep.name]
+            waiting[dep.name] = len(requires)
+            for name in requires:
+                dependents[name].append(dep.name)
+        ready = deque()
+        blocked = {}  # Name -> name of the requirement which isn't passed
+        to_skip = []
+
+        def finish(result):
+            report.add(result)
+            if result.output:
+                (sys.stdout if self._out is None else self._out).write(result.output)
+            for name in dependents[result.name]:
+                if result.status != PASSED:
+                    blocked.setdefault(name, result.name)
+                waiting[name] -= 1
+                if waiting[name] == 0:
+                    if name in blocked:
+                        to_skip.append(name)
+                    else:
+                        ready.append(name)
+
+        for name in _get_cyclic(by_name, waiting, dependents):
+            report.add(OperationResult(name, SKIPPED, error="dependency cycle"))
+        for name in by_name:
+            if waiting[name] == 0:
+                ready.append(name)
+
+        stop = False
+        with ThreadPoolExecutor(max_workers=self._max_workers) as pool:
+            running = {}
+            while True:
+                while to_skip:
+                    name = to_skip.pop()
+                    error = "requirement '{}' isn't passed".format(blocked[name])
+                    finish(OperationResult(name, SKIPPED, error=error))
+                if not stop:
+                    while ready and len(running) < self._max_workers:
+                        name = ready.popleft()
+                        running[pool.submit(_run_operation, operation, by_name[name])] = name
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del running[future]
+                    result = future.result()
+                    finish(result)
+                    if result.status == FAILED and self._policy == FAIL_FAST:
+                        stop = True
+
+        for name in by_name:
+            if name not in report.results:
+                report.add(OperationResult(name, SKIPPED, error="stopped after a failure"))
+        report.duration = time.perf_counter() - timer
+        return report
+
+
+def _get_cyclic(by_name, waiting, dependents) -> list:
+    """Names of dependencies which are in (or depend on) requirement cycles (Kahn's algorithm)"""
+    left = dict(waiting)
+    stack = [name for name in by_name if left[name] == 0]
+    while stack:
+        for name in dependents[stack.pop()]:
+            left[name] -= 1
+            if left[name] == 0:
+                stack.append(name)
+    return [name for name in by_name if left[name]]
+
+
+def run_for_dependencies(release, operation, deps=None, max_workers=DEFAULT_MAX_WORKERS, policy=CONTINUE,
+                         out=None) -> ExecutionReport:
+    """Runs the operation for dependencies of the release (see DependencyExecutor)"""
+    return DependencyExecutor(release.get_dependencies(), max_workers, policy, out).run(operation, deps)
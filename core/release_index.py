@@ -0,0 +1,174 @@
+"""Release index core module
+
+Loads all releases of the project (releases/release.<type> as HEAD and releases/release_<version>.<type>) once and
+builds inverted indexes:
+    * repository -> {version: tag}
+    * tag label -> {version: [repositories]} (SoS tags are space-separated lists of labels, every label is indexed)
+
+Versions are ordered naturally ("1.2" < "1.10"), HEAD is the last one. refresh() reloads only changed and new files.
+"""
+
+import glob
+import logging
+import os
+import re
+
+from core.config_io import load_yaml
+from core.release import DEFAULT_RELEASE_FILENAME, DEFAULT_RELEASE_FOLDER, build_graph, diff_graphs
+
+logger = logging.getLogger(__name__)
+
+HEAD = "HEAD"
+
+
+def get_version_key(version) -> tuple:
+    """Natural sort key of the version, HEAD is the last one"""
+    if version == HEAD:
+        return 1, ()
+    return 0, tuple((0, int(part), "") if part.isdigit() else (1, 0, part) for part in re.split(r"(\d+)", version)
+                    if part)
+
+
+def read_release_file(release_file_path, file_type) -> tuple:
+    """Reads release file
+
+    Returns
+    -------
+    result : tuple
+        (version, [(group, [dependence data, ...]), ...])
+    """
+    if file_type == "xml":
+        from core.xml_loader import iterparse_release_xml  # lxml is needed for xml projects only
+
+        release_data = iterparse_release_xml(release_file_path)
+        return release_data["version"], release_data["dependencies"]
+    release_data = (load_yaml(release_file_path) or {}).get("release")
+    if release_data is None:
+        raise ValueError("Release yaml file {} has wrong format!".format(release_file_path))
+    return release_data.get("version"), list((release_data.get("dependencies") or {}).items())
+
+
+class ReleaseIndex(object):
+    """Index of all releases of the project
+
+    Parameters
+    ----------
+    project_file_path : str
+        Path of the project file (releases are in the "releases" directory next to it)
+    project_file_type : str
+        Type of release files: yaml, yml or xml
+    """
+
+    def __init__(self, project_file_path, project_file_type) -> None:
+        self._release_dir_path = os.path.join(os.path.dirname(project_file_path), DEFAULT_RELEASE_FOLDER)
+        self._file_type = project_file_type
+        self._files = {}  # Version -> (path, (mtime, size))
+        self._graphs = {}  # Version -> DependencyGraph
+        self._versions = []
+        self._repo_tags = {}  # Repository -> {version: tag}
+        self._label_versions = {}  # Tag label -> {version: [repositories]}
+        self._repo_label_versions = {}  # (repository, tag label) -> [versions]
+        self.refresh()
+
+    def _scan(self) -> dict:
+        ret = {}
+        head_path = os.path.join(self._release_dir_path, "{}.{}".format(DEFAULT_RELEASE_FILENAME, self._file_type))
+        if os.path.isfile(head_path):
+            ret[HEAD] = head_path
+        prefix = DEFAULT_RELEASE_FILENAME + "_"
+        suffix = "." + self._file_type
+        pattern = os.path.join(glob.escape(self._release_dir_path), prefix + "*" + suffix)
+        for path in glob.glob(pattern):
+            ret[os.path.basename(path)[len(prefix):-len(suffix)]] = path
+        return ret
+
+    def refresh(self) -> list:
+        """Rescans the releases directory, reloads changed and new files
+
+        Returns
+        -------
+        result : list
+            Versions which were (re)loaded or removed
+        """
+        paths = self._scan()
+        changed = [version for version in self._files if version not in paths]
+        for version in changed:
+            del self._files[version]
+            del self._graphs[version]
+        for version, path in paths.items():
+            try:
+                stat = os.stat(path)
+            except OSError:  # Removed after the scan
+                if self._files.pop(version, None) is not None:
+                    del self._graphs[version]
+                    changed.append(version)
+                continue
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if self._files.get(version) == (path, stamp):
+                continue
+            try:
+                _, dependencies = read_release_file(path, self._file_type)
+            except (OSError, ValueError) as e:
+                logger.error("Can't load release {}: {}".format(path, e))
+                self._files.pop(version, None)
+                self._graphs.pop(version, None)
+                continue
+            self._files[version] = (path, stamp)
+            self._graphs[version] = build_graph(dependencies)
+            changed.append(version)
+        if changed:
+            self._build_indexes()
+        return changed
+
+    def _build_indexes(self) -> None:
+        self._versions = sorted(self._graphs, key=get_version_key)
+        self._repo_tags = {}
+        self._label_versions = {}
+        self._repo_label_versions = {}
+        for version in self._versions:
+            for dep in self._graphs[version]:
+                if dep.tag is None:
+                    continue
+                self._repo_tags.setdefault(dep.name, {})[version] = dep.tag
+                for label in dict.fromkeys(str(dep.tag).split()):  # Tags can be numbers in YAML
+                    self._label_versions.setdefault(label, {}).setdefault(version, []).append(dep.name)
+                    self._repo_label_versions.setdefault((dep.name, label), []).append(version)
+
+    def get_versions(self) -> list:
+        """All versions in natural order (HEAD is the last one)"""
+        return list(self._versions)
+
+    def get_graph(self, version):
+        """DependencyGraph of the version (None if there is no such release)"""
+        return self._graphs.get(version)
+
+    def get_repo_names(self) -> list:
+        return list(self._repo_tags)
+
+    def get_repo_tags(self, repo) -> dict:
+        """Tags of the repository in all releases: {version: tag}"""
+        return dict(self._repo_tags.get(repo, {}))
+
+    def get_repo_tag(self, repo, version):
+        """Tag of the repository in the release (None if it isn't pinned there)"""
+        return self._repo_tags.get(repo, {}).get(version)
+
+    def get_tag_versions(self, tag) -> dict:
+        """Releases which use the tag (label): {version: [repositories]}"""
+        return {version: list(repos) for version, repos in self._label_versions.get(tag, {}).items()}
+
+    def get_repo_tag_versions(self, repo, tag) -> list:
+        """Versions which pin the repository to the tag (label)"""
+        return list(self._repo_label_versions.get((repo, tag), []))
+
+    def diff(self, old_version, new_version):
+        """ReleaseDiff between two indexed releases"""
+        for version in (old_version, new_version):
+            if version not in self._graphs:
+                raise KeyError("No release {}".format(version))
+        return diff_graphs(self._graphs[old_version], self._graphs[new_version], old_version, new_version)
+
+    def get_history(self, last=None) -> list:
+        """ReleaseDiffs between consecutive versions (of the last N releases if it's set)"""
+        versions = self._versions if last is None else self._versions[-(last + 1):]
+        return [self.diff(old, new) for old, new in zip(versions, versions[1:])]
@@ -0,0 +1,387 @@
+"""Variables resolver core module
+
+Every value is parsed once into literal and reference segments. References between project variables form a
+graph which is resolved in topological order, every variable is expanded only once. Cycles and undefined
+references don't stop resolution: they are left as is ("$NAME") and reported all together.
+
+The graph is kept after resolution: when a variable is changed, only the variable and its transitive dependents are
+resolved again (see VariableResolver.set_variable()).
+
+References are "$NAME" (\\w+) or "${NAME}" (delimited, e.g. "RTL_${VERSION}_dft": "$VERSION_dft" is another
+variable). Undefined references are kept as they're written. Postponed variables "$$NAME" are never expanded by the resolver, they are slots of
+templates (see Template) which are rendered later, e.g. once per test.
+"""
+
+import re
+from functools import lru_cache
+
+REFERENCE_PATTERN = re.compile(r'(?<!\$)\$(?!\$)(?:\{(\w+)\}|(\w+))')
+POSTPONED_PATTERN = re.compile(r'\$\$(\w+)')
+SUBSTITUTION_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=65536)
+def _tokenize(text) -> tuple:
+    """Returns (segments, references): segments like parse(), references as they're written ("$B" or "${B}")"""
+    segments = []
+    references = []
+    start = 0
+    for match in REFERENCE_PATTERN.finditer(text):
+        segments.append(text[start:match.start()])
+        segments.append(match.group(1) or match.group(2))
+        references.append(match.group(0))
+        start = match.end()
+    segments.append(text[start:])
+    return tuple(segments), tuple(references)
+
+
+def parse(text) -> tuple:
+    """Splits string into segments: literals at even indexes, names of referenced variables at odd indexes.
+
+    Example: "a $B c${D}" -> ("a ", "B", " c", "D", "")
+    """
+    return _tokenize(text)[0]
+
+
+def get_references(value) -> set:
+    """Returns names of variables referenced by str, list or dict value"""
+    ret = set()
+    if type(value) is str:
+        ret.update(parse(value)[1::2])
+    elif type(value) is list:
+        for item in value:
+            ret.update(get_references(item))
+    elif type(value) is dict:
+        for item in value.values():
+            ret.update(get_references(item))
+    return ret
+
+
+class VariableResolutionError(Exception):
+    """Undefined references and cycles found during resolution"""
+
+    def __init__(self, undefined, cycles) -> None:
+        self.undefined = undefined
+        self.cycles = cycles
+        super().__init__(format_errors(undefined, cycles))
+
+
+def format_errors(undefined, cycles) -> str:
+    messages = []
+    if undefined:
+        messages.append("undefined: " + ", ".join(
+            "${} (used by {})".format(name, ", ".join(sorted(owners))) for name, owners in sorted(undefined.items())))
+    if cycles:
+        messages.append("cycles: " + "; ".join(" -> ".join(cycle) for cycle in cycles))
+    return "; ".join(messages)
+
+
+class VariableResolver(object):
+    """Resolver for a dict of variables
+
+    Parameters
+    ----------
+    variables : dict
+        Variables (name -> str, list, dict or any other value). Copied, resolver doesn't change it.
+    lookup : callable
+        lookup(name) -> value or None. Used for names which aren't in variables (environment etc.)
+    """
+
+    def __init__(self, variables, lookup=None) -> None:
+        self._variables = dict(variables)
+        self._lookup = lookup
+        self._resolved = None  # Name -> resolved value
+        self._references = {}  # Name -> names referenced by its value
+        self._dependents = {}  # Name -> names of variables which reference it
+        self._external = {}  # Memoized lookup() results
+        self._cyclic = set()
+        self._cycles = []
+        self._undefined = {}  # Name -> set of owners
+
+    def _is_variable(self, name) -> bool:
+        return self._variables.get(name) is not None
+
+    def _get_references(self, name) -> set:
+        refs = self._references.get(name)
+        if refs is None:
+            refs = get_references(self._variables.get(name))
+            self._references[name] = refs
+            for ref in refs:
+                self._dependents.setdefault(ref, set()).add(name)
+        return refs
+
+    def _forget_references(self, name) -> None:
+        for ref in self._references.pop(name, ()):
+            self._dependents[ref].discard(name)
+
+    def get_dependents(self, name) -> set:
+        """Returns names of variables which depend on the variable (directly or transitively)"""
+        self.resolve_all()
+        ret = set()
+        queue = [name]
+        while queue:
+            for dependent in self._dependents.get(queue.pop(), ()):
+                if dependent not in ret:
+                    ret.add(dependent)
+                    queue.append(dependent)
+        return ret
+
+    def _sort(self, roots, within=None) -> list:
+        """Topological sort of variables (dependencies first). Cycles are recorded.
+        :param within:
+        Only these variables are sorted, other ones must be resolved already
+        """
+        state = {}  # Name -> 1 (in progress) or 2 (done)
+        order = []
+        for root in roots:
+            if root in state or not self._is_variable(root):
+                continue
+            state[root] = 1
+            stack = [(root, iter(sorted(self._get_references(root))))]
+            while stack:
+                name, deps = stack[-1]
+                for dep in deps:
+                    if not self._is_variable(dep) or (within is not None and dep not in within):
+                        continue
+                    dep_state = state.get(dep)
+                    if dep_state is None:
+                        state[dep] = 1
+                        stack.append((dep, iter(sorted(self._get_references(dep)))))
+                        break
+                    if dep_state == 1:
+                        path = [item[0] for item in stack]
+                        cycle = path[path.index(dep):] + [dep]
+                        self._cycles.append(cycle)
+                        self._cyclic.update(cycle)
+                else:
+                    state[name] = 2
+                    order.append(name)
+                    stack.pop()
+        return order
+
+    def _get_value(self, name, owner) -> str or None:
+        if self._resolved is not None and name in self._resolved:
+            value = self._resolved[name]
+        elif self._is_variable(name):
+            return None  # Cyclic or not resolved yet
+        else:
+            if name not in self._external:
+                self._external[name] = None if self._lookup is None else self._lookup(name)
+            value = self._external[name]
+        if value is None:
+            if name not in self._cyclic:
+                self._undefined.setdefault(name, set()).add(owner)
+            return None
+        return value if type(value) is str else str(value)
+
+    def _expand(self, value, owner):
+        if type(value) is str:
+            segments, references = _tokenize(value)
+            if len(segments) == 1:
+                return value
+            parts = list(segments)
+            for index in range(1, len(parts), 2):
+                resolved = self._get_value(parts[index], owner)
+                parts[index] = references[index // 2] if resolved is None else resolved
+            return "".join(parts)
+        if type(value) is list:
+            return [self._expand(item, owner) for item in value]
+        if type(value) is dict:
+            return {key: self._expand(item, owner) for key, item in value.items()}
+        return value
+
+    def resolve_all(self) -> dict:
+        """Resolves all variables (once, result is memoized)
+        :return:
+        New dict with resolved variables
+        """
+        if self._resolved is None:
+            self._resolved = {}
+            for name in self._sort(self._variables):
+                self._resolved[name] = self._expand(self._variables[name], name)
+            for name in self._variables:  # Variables with None value
+                if name not in self._resolved:
+                    self._resolved[name] = self._variables[name]
+        return dict(self._resolved)
+
+    def set_variable(self, name, value) -> dict:
+        """Changes (or adds) a variable and resolves again only this variable and its transitive dependents
+        :return:
+        Dict name -> new resolved value of variables which were changed
+        """
+        self.resolve_all()
+        self._forget_references(name)
+        self._variables[name] = value
+        self._external.pop(name, None)
+        self._get_references(name)
+
+        affected = self.get_dependents(name)
+        affected.add(name)
+        # Every member of a cycle depends on the others, so cycles are either fully affected or not at all
+        self._cycles = [cycle for cycle in self._cycles if affected.isdisjoint(cycle)]
+        self._cyclic.difference_update(affected)
+        previous = {item: self._resolved.pop(item, None) for item in affected}
+
+        for item in self._sort(sorted(affected), within=affected):
+            self._resolved[item] = self._expand(self._variables[item], item)
+        for item in affected:
+            if item not in self._resolved and item in self._variables:
+                self._resolved[item] = self._variables[item]
+        return {item: self._resolved.get(item) for item in affected if self._resolved.get(item) != previous[item]}
+
+    def resolve(self, name):
+        """Returns resolved value of variable or None"""
+        self.resolve_all()
+        return self._resolved.get(name)
+
+    def expand(self, value, owner="expression", recursive=True):
+        """Replaces references in a value (str, list or dict) by resolved variables.
+        :param recursive:
+        If False, references are replaced by raw (not expanded) values of variables
+        """
+        if not recursive:
+            return VariableResolver({}, lambda name: self._variables.get(name) if self._is_variable(name)
+                                    else self._get_value(name, owner))._expand(value, owner)
+        self.resolve_all()
+        return self._expand(value, owner)
+
+    def get_undefined(self) -> dict:
+        return {name: sorted(owners) for name, owners in self._undefined.items()}
+
+    def get_cycles(self) -> list:
+        return list(self._cycles)
+
+    def has_errors(self) -> bool:
+        return bool(self._undefined or self._cycles)
+
+    def clear_errors(self) -> None:
+        self._undefined = {}
+
+    def check(self) -> None:
+        """Raises VariableResolutionError with all undefined references and cycles"""
+        if self.has_errors():
+            raise VariableResolutionError(self.get_undefined(), self.get_cycles())
+
+
+class Substitution(object):
+    """Compiled "$NAME" and "${NAME}" -> value substitution (see Project.replace_variables())
+
+    All names are compiled into one alternation regex. A reference ends where the name (word characters) ends, so
+    "$FOOBAR" is never replaced by value of "$FOO", even if FOOBAR isn't defined (it's kept as is, like all undefined
+    references). Use "${FOO}BAR" to put a value before word characters. Only str values are substituted. Results are memoized (LRU).
+
+    Parameters
+    ----------
+    variables : dict
+        Variables (name -> value). Copied, so later changes of the dict aren't seen.
+    """
+
+    def __init__(self, variables, cache_size=SUBSTITUTION_CACHE_SIZE) -> None:
+        self._values = {name: value for name, value in (variables or {}).items() if type(value) is str}
+        if self._values:
+            names = "|".join(re.escape(name) for name in sorted(self._values, key=lambda name: (-len(name), name)))
+            self._pattern = re.compile(r"\$(?:\{(" + names + r")\}|(" + names + r")(?!\w))")
+        else:
+            self._pattern = None
+        self.substitute = lru_cache(maxsize=cache_size)(self._substitute)
+
+    def _replace_match(self, match) -> str:
+        return self._values[match.group(1) or match.group(2)]
+
+    def _substitute(self, expression):
+        if self._pattern is None or type(expression) is not str or "$" not in expression:
+            return expression
+        return self._pattern.sub(self._replace_match, expression)
+
+    def get_cache_info(self):
+        return self.substitute.cache_info()
+
+
+class TemplateKeysError(KeyError):
+    """Values for postponed variables are missing
+
+    Attributes
+    ----------
+    missing : list of str
+        Names of all missing variables
+    indexes : list of int
+        Indexes of value dicts with missing variables (render_many())
+    """
+
+    def __init__(self, missing, indexes=None) -> None:
+        self.missing = missing
+        self.indexes = indexes or []
+        super().__init__(missing)
+
+    def __str__(self) -> str:
+        message = "Missing postponed variable(s): {}".format(", ".join("$$" + name for name in self.missing))
+        if self.indexes:
+            message += " (in {} item(s), first is #{})".format(len(self.indexes), self.indexes[0])
+        return message
+
+
+class Template(object):
+    """String with postponed variables ("$$NAME"), parsed once and rendered many times
+
+    Usage example:
+    template = core.project.compile_template("TEST_CMD")
+    cmds = template.render_many({"TEST_NAME": test} for test in tests)
+    """
+
+    def __init__(self, text) -> None:
+        self.text = text
+        self._segments = POSTPONED_PATTERN.split(text)
+        self._slots = [(index, self._segments[index]) for index in range(1, len(self._segments), 2)]
+        self.names = tuple(sorted({name for _, name in self._slots}))
+
+    def _render(self, values) -> str:
+        parts = self._segments.copy()
+        for index, name in self._slots:
+            value = values[name]
+            parts[index] = value if type(value) is str else str(value)
+        return "".join(parts)
+
+    def get_missing(self, values) -> list:
+        return [name for name in self.names if name not in values]
+
+    def render(self, values) -> str:
+        """Replaces all postponed variables
+        :param values:
+        Dict name -> value
+        :return:
+        Rendered string
+        """
+        missing = self.get_missing(values)
+        if missing:
+            raise TemplateKeysError(missing)
+        return self._render(values)
+
+    def render_many(self, items) -> list:
+        """Renders the template for every dict of values. All items are checked before an error is raised, so the
+        error lists every missing variable.
+        :param items:
+        Iterable of dicts name -> value
+        :return:
+        List of rendered strings
+        """
+        if not self._slots:
+            return [self.text for _ in items]
+        names = self.names
+        render = self._render
+        ret = []
+        missing = set()
+        indexes = []
+        for index, values in enumerate(items):
+            if all(name in values for name in names):
+                ret.append(render(values))
+            else:
+                missing.update(self.get_missing(values))
+                indexes.append(index)
+        if indexes:
+            raise TemplateKeysError(sorted(missing), indexes)
+        return ret
+
+
+@lru_cache(maxsize=1024)
+def compile_template(text) -> Template:
+    return Template(text)
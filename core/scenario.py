@@ -4,7 +4,6 @@ Scenario module
 
 import logging
 import os
-from sys import modules
 
 from core.core import Core
 
@@ -42,7 +41,7 @@ class OdinCommand(Step):
 
     def __init__(self, command: str, args: dict = None, name: str = None):
         self._command = command
-        command_object = getattr(modules["flows." + Core().flows.get_flow_of_command(self._command) + ".commands"], self._command, None)
+        command_object = Core().flows.get_command_module(self._command)
         if command_object is None:
             logger.error('No such command {}!'.format(self._command))
             os.abort()
@@ -91,7 +90,7 @@ class OdinCommand(Step):
                 else:
                     temporary.append(arg)
                 setattr(core.args, arg, self._args[arg])
-        command = getattr(modules["flows." + Core().flows.get_flow_of_command(self._command) + ".commands"], self._command)
+        command = Core().flows.get_command_module(self._command)
         res = command.run(Core())
         for arg in backup:
             setattr(core.args, arg, backup[arg])
@@ -22,9 +22,9 @@ Example structure of scoreboard file:
 """
 
 import os
-import yaml
 import logging
 
+from core.config_io import dump_yaml, load_yaml
 from core.core import Core
 from core.logger import Logger
 
@@ -58,17 +58,12 @@ class Scoreboard(object):
 
     def _read_scoreboard(self):
         if os.path.isfile(self.scoreboard_file_path):
-            build_yaml_file = open(self.scoreboard_file_path, 'r')
-            data = yaml.load(build_yaml_file, Loader=yaml.FullLoader)
-            build_yaml_file.close()
-            return data
+            return load_yaml(self.scoreboard_file_path, python_tags=True)
         else:
             return None
 
     def _write_scoreboard(self, data):
-        build_yaml_file = open(self.scoreboard_file_path, "w")
-        yaml.dump(data, build_yaml_file)
-        build_yaml_file.close()
+        dump_yaml(data, self.scoreboard_file_path, python_tags=True)
         return True
 
     def clean_up(self):
@@ -348,9 +343,7 @@ class Scoreboard(object):
     def get_testlist_sve(self):
         testlist = []
         if os.path.isfile(self.scoreboard_file_path):
-            build_yaml_file = open(self.scoreboard_file_path, 'r')
-            valuesYaml = yaml.load(build_yaml_file, Loader=yaml.FullLoader)
-            build_yaml_file.close()
+            valuesYaml = load_yaml(self.scoreboard_file_path, python_tags=True)
             collection = "sim_tests"
             if collection in valuesYaml:
                 for test in valuesYaml[collection]:
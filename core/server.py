@@ -0,0 +1,236 @@
+"""Server core module
+
+Long-running Odin process (``odin.py serve``). It keeps flows, project, release and tools loaded and runs commands
+sent by ``odin_client.py`` over a Unix domain socket.
+
+Protocol (client -> server):
+    * 4 bytes: length of the request (network order) with client's stdin, stdout and stderr attached (SCM_RIGHTS)
+    * JSON request: {"argv": [...], "cwd": "...", "env": {...}}
+
+Protocol (server -> client):
+    * 4 bytes: pid of the worker (client forwards signals to it)
+    * 4 bytes: exit code of the command
+
+Every request is run in a forked worker. The worker gets copies of warm data, so commands can't change the
+server's state, and it writes directly to client's stdout/stderr.
+"""
+
+import json
+import logging
+import os
+import signal
+import socket
+import struct
+import subprocess
+import sys
+
+import flows
+from core.project import Project
+from core.release import Release
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("!I")
+_CODE = struct.Struct("!i")
+
+
+def _get_stamp(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except (OSError, TypeError):
+        return None
+
+
+def _get_project_stamp(project) -> tuple:
+    """Stamps of the project file and its include fragments"""
+    return tuple(_get_stamp(path) for path in project.get_source_file_paths())
+
+
+def _is_env_unchanged(project) -> bool:
+    """Checks env vars which were used to resolve the project"""
+    for name, value in project.get_consulted_env().items():
+        if os.getenv(name) != value:
+            return False
+    return True
+
+
+def _recv_exactly(conn, size) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed by client")
+        data += chunk
+    return data
+
+
+def _get_exit_code(code) -> int:
+    if code is None:
+        return 0
+    if type(code) is int:
+        return code
+    return 1
+
+
+class WarmCache(object):
+    """Project, release and tools which are reloaded only if their files (or env vars used by the project) are
+    changed. Project is reloaded if its include fragments are changed or glob patterns of includes match other files.
+    """
+
+    def __init__(self) -> None:
+        self._projects = {}  # Project file path -> (stamps of source files, Project)
+        self._releases = {}  # (project file path, release) -> (stamp, Release)
+
+    def get_project(self, global_variables) -> Project:
+        project_file_path = global_variables["PROJECT_FILE_PATH"]
+        entry = self._projects.get(project_file_path)
+        if entry is None or entry[0] != _get_project_stamp(entry[1]) or not entry[1].is_includes_unchanged() or \
+                not _is_env_unchanged(entry[1]):
+            logger.debug("Loading project {}".format(project_file_path))
+            project = Project(project_file_path, global_variables)
+            project.resolve_vars()
+            entry = (_get_project_stamp(project), project)
+            self._projects[project_file_path] = entry
+        return entry[1]
+
+    def get_release(self, project_file_path, project_file_type, release="HEAD") -> Release:
+        key = (project_file_path, release)
+        entry = self._releases.get(key)
+        if entry is None or entry[0] != _get_stamp(entry[1].get_release_file_path()):
+            logger.debug("Loading release {} of {}".format(release, project_file_path))
+            release_data = Release(project_file_path, project_file_type, release)
+            entry = (_get_stamp(release_data.get_release_file_path()), release_data)
+            self._releases[key] = entry
+        return entry[1]
+
+    def get_tools(self):
+        return flows.get_tools()  # Reloaded by core.tools.registry if tools.yaml files are changed
+
+
+class OdinServer(object):
+    """Unix socket server
+
+    Parameters
+    ----------
+    socket_path : str
+        Path of the Unix socket
+    main : callable
+        main(argv, cache) -> exit code. Runs a command in the worker
+    prepare : callable
+        prepare(argv, cache). Warms up the cache for the command before the worker is forked
+    """
+
+    def __init__(self, socket_path, main, prepare) -> None:
+        self._socket_path = socket_path
+        self._main = main
+        self._prepare = prepare
+        self._cache = WarmCache()
+        self._socket = None
+        self._restart_argv = [sys.executable, os.path.abspath(sys.argv[0])] + sys.argv[1:]
+
+    def _bind(self) -> None:
+        os.makedirs(os.path.dirname(self._socket_path), exist_ok=True)
+        if os.path.exists(self._socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self._socket_path)
+            except OSError:
+                os.unlink(self._socket_path)  # Stale socket of a dead server
+            else:
+                probe.close()
+                raise OSError("Server is already running on {}".format(self._socket_path))
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.bind(self._socket_path)
+        os.chmod(self._socket_path, 0o600)
+        self._socket.listen(64)
+
+    def _close(self) -> None:
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+            if os.path.exists(self._socket_path):
+                os.unlink(self._socket_path)
+
+    def serve_forever(self) -> int:
+        self._bind()
+        signal.signal(signal.SIGCHLD, signal.SIG_IGN)  # Workers are reaped automatically
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        print("Odin server is listening on {}".format(self._socket_path), flush=True)
+        try:
+            while True:
+                conn, _ = self._socket.accept()
+                try:
+                    restart = self._handle(conn)
+                except Exception as e:
+                    logger.error("Can't handle request: {}".format(e))
+                    restart = False
+                finally:
+                    conn.close()
+                if restart:
+                    logger.info("Flows were changed, restarting the server...")
+                    self._close()
+                    os.execv(sys.executable, self._restart_argv)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._close()
+        return 0
+
+    def _handle(self, conn) -> bool:
+        """Reads the request, warms up the cache and forks a worker.
+        :return:
+        True if the server must be restarted
+        """
+        header, fds, _, _ = socket.recv_fds(conn, _HEADER.size, 3)
+        try:
+            if len(fds) != 3:
+                raise ConnectionError("Client must send stdin, stdout and stderr")
+            request = json.loads(_recv_exactly(conn, _HEADER.unpack(header)[0]).decode())
+
+            os.chdir(request["cwd"])
+            os.environ.clear()
+            os.environ.update(request["env"])
+
+            restart = not flows.is_manifest_up_to_date()
+            if not restart:
+                self._prepare(request["argv"], self._cache)
+
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                self._socket.close()
+                os._exit(self._work(conn, fds, request["argv"], restart))
+        finally:
+            for fd in fds:
+                os.close(fd)
+        return restart
+
+    def _work(self, conn, fds, argv, cold) -> int:
+        """Worker: runs the command with client's stdio and sends the exit code"""
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        conn.sendall(_CODE.pack(os.getpid()))
+        for index, fd in enumerate(fds):
+            os.dup2(fd, index)
+        sys.argv = [os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "odin.py")] + argv
+        try:
+            if cold:
+                # Commands were changed: run new code in a separate process, the server will restart
+                code = subprocess.call([sys.executable] + sys.argv)
+            else:
+                code = _get_exit_code(self._main(argv, self._cache))
+        except SystemExit as e:
+            code = _get_exit_code(e.code)
+            if type(e.code) is str:
+                print(e.code, file=sys.stderr)
+        except BaseException as e:
+            logger.exception(e)
+            code = 1
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            conn.sendall(_CODE.pack(code))
+        except OSError:
+            pass
+        return code
@@ -0,0 +1,122 @@
+"""Project snapshot core module
+
+Snapshot is a pickled resolved Project together with its Release. It's stored in the user cache dir
+($XDG_CACHE_HOME/odin/snapshots) and it's valid while:
+    * project file (and its include fragments), release file and Odin's modules which load and resolve them
+      (SOURCE_MODULES) have the same content (md5)
+    * glob patterns of include fragments match the same files
+    * environment variables which were read during resolution have the same values
+    * global variables which were used by the project ("auto" vars) have the same values
+"""
+
+import hashlib
+import importlib.util
+import logging
+import os
+import pickle
+
+from core.project import glob_fragments
+from core.release import get_release_file_path
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 2
+# Modules whose code defines the content of the snapshot (they aren't imported: lxml may be missing)
+SOURCE_MODULES = ("core.project", "core.release", "core.resolver", "core.xml_loader", "core.config_io")
+
+
+def get_snapshot_file_path(project_file_path, release="HEAD") -> str:
+    cache_dir_path = os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    snapshot_name = hashlib.md5("{}:{}".format(os.path.abspath(project_file_path), release).encode()).hexdigest()
+    return os.path.join(cache_dir_path, "odin", "snapshots", snapshot_name + ".pickle")
+
+
+def _hash_file(path):
+    try:
+        with open(path, "rb") as hashed_file:
+            return hashlib.md5(hashed_file.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _get_source_file_paths(project, release) -> list:
+    project_file_path = os.path.abspath(project.get_project_file_path())
+    return [os.path.abspath(path) for path in project.get_source_file_paths()] + \
+        [get_release_file_path(project_file_path, project.get_project_file_type(), release)] + \
+        [importlib.util.find_spec(name).origin for name in SOURCE_MODULES]
+
+
+def load_snapshot(project_file_path, global_variables, release="HEAD"):
+    """Loads resolved project and release from the snapshot
+
+    Parameters
+    ----------
+    project_file_path : str
+        Path of the project file
+    global_variables : dict
+        Odin's global variables (will be set into the project)
+    release : str
+        Release name
+
+    Returns
+    -------
+    result : tuple or None
+        (Project, Release) or None if there is no valid snapshot
+    """
+    try:
+        with open(get_snapshot_file_path(project_file_path, release), "rb") as snapshot_file:
+            snapshot = pickle.load(snapshot_file)
+    except Exception:
+        return None
+
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        return None
+    for path, digest in snapshot["files"].items():
+        if _hash_file(path) != digest:
+            return None
+    for pattern, paths in snapshot["includes"].items():
+        if glob_fragments(pattern) != paths:
+            return None
+    for name, value in snapshot["env"].items():
+        if os.getenv(name) != value:
+            return None
+    for name, value in snapshot["global_vars"].items():
+        if global_variables.get(name) != value:
+            return None
+
+    logger.debug("Project snapshot is used for {}".format(project_file_path))
+    snapshot["project"].set_global_variables(global_variables)
+    return snapshot["project"], snapshot["release"]
+
+
+def save_snapshot(project, release_data, release="HEAD") -> bool:
+    """Saves resolved project and its release
+
+    Returns
+    -------
+    result : bool
+        True if saved
+    """
+    project_file_path = project.get_project_file_path()
+    snapshot_file_path = get_snapshot_file_path(project_file_path, release)
+    file_paths = _get_source_file_paths(project, release)
+    snapshot = {"version": SNAPSHOT_VERSION,
+                "files": {path: _hash_file(path) for path in file_paths},
+                "includes": project.get_include_patterns(),
+                "env": dict(project.get_consulted_env()),
+                "global_vars": dict(project.get_consulted_global_vars()),
+                "project": project,
+                "release": release_data}
+
+    tmp_file_path = "{}.{}".format(snapshot_file_path, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(snapshot_file_path), exist_ok=True)
+        with open(tmp_file_path, "wb") as snapshot_file:
+            pickle.dump(snapshot, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file_path, snapshot_file_path)
+    except (OSError, pickle.PicklingError, TypeError, AttributeError, RecursionError) as e:
+        logger.warning("Can't save project snapshot \"{}\": {}".format(snapshot_file_path, e))
+        if os.path.exists(tmp_file_path):
+            os.remove(tmp_file_path)
+        return False
+    return True
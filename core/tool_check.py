@@ -0,0 +1,147 @@
+"""Tool check core module
+
+Checks availability of tools without spawning shells:
+    * a tool with bin_path is available if bin_path/executable is a file (as before)
+    * otherwise the executable is searched in the tool's PATH (tool's path and bin_path prepended to the base PATH,
+      see core.environment) like `which` does
+    * directory listings are cached per check run (a directory is listed once for all tools) and listing times are
+      kept, so slow mounts can be found
+    * tools are checked in parallel threads
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.environment import build_environment, is_set
+
+DEFAULT_MAX_WORKERS = 16
+
+
+def _is_executable(path) -> bool:
+    return os.path.isfile(path) and os.access(path, os.X_OK)
+
+
+class DirectoryCache(object):
+    """Thread-safe cache of directory listings (None for missing or unreadable directories)"""
+
+    def __init__(self) -> None:
+        self._listings = {}
+        self._timings = {}  # Directory -> listing time, seconds
+        self._lock = threading.Lock()
+
+    def list(self, dir_path):
+        try:
+            return self._listings[dir_path]
+        except KeyError:
+            pass
+        timer = time.perf_counter()
+        try:
+            listing = frozenset(os.listdir(dir_path))
+        except OSError:
+            listing = None
+        with self._lock:
+            self._listings[dir_path] = listing
+            self._timings[dir_path] = time.perf_counter() - timer
+        return listing
+
+    def get_timings(self) -> dict:
+        """Listing times of directories (seconds), the slowest first"""
+        with self._lock:
+            return dict(sorted(self._timings.items(), key=lambda item: item[1], reverse=True))
+
+
+def which(executable, path_list, cache=None):
+    """Finds executable in the ":"-separated path list (without spawning `which`)
+
+    Parameters
+    ----------
+    executable : str
+        Name or path of the executable
+    path_list : str
+        Directories to search in
+    cache : DirectoryCache, optional
+        Cache of directory listings
+
+    Returns
+    -------
+    result : str
+        Path of the executable or None
+    """
+    if os.path.dirname(executable):
+        return executable if _is_executable(executable) else None
+    if cache is None:
+        cache = DirectoryCache()
+    for dir_path in (path_list or "").split(os.pathsep):
+        if not dir_path:
+            continue
+        listing = cache.list(dir_path)
+        if listing is not None and executable in listing:
+            path = os.path.join(dir_path, executable)
+            if _is_executable(path):
+                return path
+    return None
+
+
+class ToolCheckResult(object):
+    """Result of the tool check"""
+
+    __slots__ = ("group", "name", "executable", "path", "available", "latency")
+
+    def __init__(self, group, name, executable, path, available, latency) -> None:
+        self.group = group
+        self.name = name
+        self.executable = executable
+        self.path = path
+        self.available = available
+        self.latency = latency
+
+    def to_dict(self) -> dict:
+        return {"group": self.group, "name": self.name, "executable": self.executable, "path": self.path,
+                "available": self.available, "latency_ms": round(self.latency * 1000.0, 3)}
+
+
+def check_tool(tool, cache=None, base_env=None) -> ToolCheckResult:
+    """Checks availability of the tool
+
+    Parameters
+    ----------
+    tool : core.tools.Tool
+        Tool to check
+    cache : DirectoryCache, optional
+        Cache of directory listings (shared by checks of the same run)
+    base_env : dict, optional
+        Base environment (os.environ by default)
+
+    Returns
+    -------
+    ToolCheckResult
+        Resolved path of the executable, availability and check latency
+    """
+    timer = time.perf_counter()
+    if is_set(tool.bin_path):
+        path = os.path.join(tool.bin_path, tool.executable)
+        if not os.path.isfile(path):
+            path = None
+    else:
+        path = which(tool.executable, build_environment([tool], base_env=base_env).get("PATH"), cache)
+    return ToolCheckResult(tool.group, tool.name, tool.executable, path, path is not None,
+                           time.perf_counter() - timer)
+
+
+def check_tools(tools, max_workers=DEFAULT_MAX_WORKERS, cache=None, base_env=None) -> list:
+    """Checks availability of tools in parallel threads
+
+    Returns
+    -------
+    result : list
+        ToolCheckResult objects in the order of tools
+    """
+    if cache is None:
+        cache = DirectoryCache()
+    tools = list(tools)
+    if not tools:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tools)))) as pool:
+        return list(pool.map(lambda tool: check_tool(tool, cache, base_env), tools))
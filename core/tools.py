@@ -1,25 +1,27 @@
 """Tools core module
 """
 
+import copy
 import os
-import sys
-from subprocess import run, PIPE, Popen
-
-import yaml
+import re
+import shlex
+import threading
 
+from core.config_io import load_yaml
+from core.environment import build_environment
 from core.logger import Logger
 from core.logger import bcolors
+from core.tool_check import check_tool, check_tools
 
+_ENV_VAR_PATTERN = re.compile(r"\$(\w+)|\$\{(\w+)\}")
 
-def _check_field(field) -> bool:
-    """
-    Check if filed is not None and != "None"(str)
-    :return:
-    False if field is None or == "None", True in other cases
-    """
-    if field is None or field == "None":
-        return False
-    return True
+
+def expand_env_vars(text, env) -> str:
+    """Replaces $VAR and ${VAR} by values from env (unknown variables are kept)"""
+    def replace(match):
+        name = match.group(1) or match.group(2)
+        return env[name] if name in env else match.group(0)
+    return _ENV_VAR_PATTERN.sub(replace, text)
 
 
 class Tool(object):
@@ -41,93 +43,173 @@ class Tool(object):
 
         self.env_ready = False
 
+    def copy(self) -> "Tool":
+        """Returns a copy of the tool (its env dict is copied too)"""
+        ret = copy.copy(self)
+        if type(self.env) is dict:
+            ret.env = dict(self.env)
+        return ret
+
+    def get_env(self, base_env=None, project=None):
+        """
+        Tool's environment (PATH, LD_LIBRARY_PATH, LM_LICENSE_FILE, other env vars). os.environ isn't changed.
+        :return:
+        core.environment.Environment (immutable mapping)
+        """
+        return build_environment([self], project, base_env)
+
     def setup(self):
         """
-        Set tool's parameters (PATH, LD_LIBRARY_PATH, LM_LICENSE_FILE, other env vars) into odin's virtual environment.
-        """
-        if _check_field(self.bin_path):
-            os.environ["PATH"] = self.bin_path + ":" + os.environ.get("PATH", "")
-        if _check_field(self.path):
-            os.environ["PATH"] = self.path + ":" + os.environ.get("PATH", "")
-        if _check_field(self.lib):
-            os.environ["LD_LIBRARY_PATH"] = self.lib + ":" + os.environ.get("LD_LIBRARY_PATH", "")
-        if _check_field(self.license):
-            os.environ["LM_LICENSE_FILE"] = self.license + ":" + os.environ.get("LM_LICENSE_FILE", "")
-        if _check_field(self.env):
-            for env_var in self.env:
-                os.environ[env_var] = self.env.get(env_var)
+        Set tool's parameters (PATH, LD_LIBRARY_PATH, LM_LICENSE_FILE, other env vars) into odin's process environment.
+        Paths aren't duplicated if it's called many times. Prefer get_env() and core.environment.build_environment():
+        they don't change the environment of the whole process.
+        """
+        os.environ.update(self.get_env().to_dict())
         self.env_ready = True
 
-    def run(self, params = None, stdout_capture: bool = False):
+    def get_argv(self, params=None, env=None) -> list:
         """
-        Run tool (just run for testing purposes).
+        Command line of the tool as argv list (no shell is used to run it).
         :param params:
-        String of params
-        :param stdout_capture:
-        stdout capturing True/False
+        List of params or string of params (split like a shell does; only $VAR and ${VAR} are expanded)
+        :param env:
+        Environment for $VAR expansion in string params (no expansion if it's None)
         :return:
-        Set of (run_line, exit_code, stdout, stderr)
+        argv list
         """
-        if self.env_ready is not True:
-            self.setup()
-
-        run_line = self.executable
+        argv = [self.executable]
         if params is not None:
             if type(params) is list:
-                run_line += " " + " ".join(params)
+                argv += [str(param) for param in params]
             elif type(params) is str:
-                run_line += " " + params
-
+                argv += [arg if env is None else expand_env_vars(arg, env) for arg in shlex.split(params)]
         if self.lsf_only:
-            print("Starting using LSF...")
-            run_line = "bsub -Is '" + run_line + "'"
+            argv = ["bsub", "-Is"] + argv
+        return argv
+
+    async def run_async(self, params=None, env=None, **kwargs):
+        """
+        Run tool in asyncio (see core.process.run_process_async() for kwargs: timeout, on_stdout, on_stderr,
+        stdout_path, stderr_path, capture, ...). Use core.process.ProcessRunner to run many tools under a limit.
+        :return:
+        core.process.ProcessResult
+        """
+        if env is None:
+            env = self.get_env()
+        kwargs.setdefault("new_session", not self.lsf_only)  # bsub -Is needs the terminal
+        from core.process import run_process_async  # asyncio isn't loaded on startup
+
+        return await run_process_async(self.get_argv(params, env), env=env, **kwargs)
+
+    def start(self, params=None, env=None, cwd=None):
+        """
+        Start tool in background and return without waiting for its exit (output goes to the terminal).
+        :return:
+        subprocess.Popen handle of the process (None if it can't be started)
+        """
+        if env is None:
+            env = self.get_env()
+        from core.process import start_process  # asyncio isn't loaded on startup
 
-        # Run
-        if stdout_capture:
-            process_handle = Popen(run_line, stdout=PIPE, stderr=PIPE, shell=True)
-            stdout, stderr = process_handle.communicate()
-            stdout, stderr = stdout.decode(sys.stdout.encoding or 'utf-8'), stderr.decode(sys.stderr.encoding or 'utf-8')
-            exit_code = process_handle.returncode
-        else:
-            exit_code = os.system(run_line + " &")
-            stdout = None
-            stderr = None
+        return start_process(self.get_argv(params, env), env=env, cwd=cwd, new_session=not self.lsf_only)
 
-        return run_line, exit_code, stdout, stderr
+    def run(self, params=None, stdout_capture: bool = False, env=None, wait=None, **kwargs):
+        """
+        Run tool. It's started in background (like "&" in a shell) unless the output is captured or consumed.
+        :param params:
+        List of params or string of params
+        :param stdout_capture:
+        stdout capturing True/False (output goes to the terminal if it's False and no other consumers are set)
+        :param env:
+        Environment of the process (tool's environment by default, see get_env())
+        :param wait:
+        Wait for the exit (by default if stdout_capture is True or kwargs are set)
+        :param kwargs:
+        See core.process.run_process_async(): timeout, on_stdout, on_stderr, stdout_path, stderr_path, ... (the tool
+        is waited for)
+        :return:
+        Set of (run_line, exit_code, stdout, stderr). exit_code is 0 if the tool is started in background.
+        """
+        from core.process import NOT_FOUND_EXIT_CODE, run_coroutine, start_process  # asyncio isn't loaded on startup
+
+        if self.lsf_only:
+            print("Starting using LSF...")
+        if env is None:
+            env = self.get_env()
+        argv = self.get_argv(params, env)
+        run_line = " ".join(shlex.quote(arg) for arg in argv)
+        if wait is None:
+            wait = stdout_capture or bool(kwargs)
+        if not wait:
+            process = start_process(argv, env=env, new_session=not self.lsf_only)
+            return run_line, 0 if process is not None else NOT_FOUND_EXIT_CODE, None, None
+        result = run_coroutine(self.run_async(params, env=env, capture=stdout_capture, **kwargs))
+        return run_line, result.exit_code, result.stdout, result.stderr
 
 
 class Tools:
     """
-    Class for tools' collection
+    Class for tools' collection. Tools are indexed by (group, name), by group and by name.
     """
     def __init__(self) -> None:
         self.xml_path = None
         self.groups = []
         self.tools = []
+        self._by_key = {}  # (group, name) -> Tool
+        self._by_group = {}  # Group -> [Tool, ...]
+        self._by_name = {}  # Name -> [Tool, ...]
+
+    def add_tool(self, tool) -> None:
+        if tool.group not in self._by_group:
+            self.groups.append(tool.group)
+            self._by_group[tool.group] = []
+        self.tools.append(tool)
+        self._by_key[(tool.group, tool.name)] = tool
+        self._by_group[tool.group].append(tool)
+        self._by_name.setdefault(tool.name, []).append(tool)
+
+    def copy(self) -> "Tools":
+        """Returns a copy with copies of all tools (changes of the copy don't affect this collection)"""
+        ret = Tools()
+        ret.xml_path = self.xml_path
+        for group in self.groups:
+            ret.groups.append(group)
+            ret._by_group[group] = []
+        for tool in self.tools:
+            ret.add_tool(tool.copy())
+        return ret
 
     def parse_yaml(self, yaml_paths):
         file_data = {}
         for yaml_path in yaml_paths:
             if os.path.isfile(yaml_path):
-                build_yaml_file = open(yaml_path, 'r')
-                file_data.update(yaml.load(build_yaml_file, Loader=yaml.FullLoader)["tools"])
-                build_yaml_file.close()
+                file_data.update(load_yaml(yaml_path)["tools"])
             else:
                 Logger.error("No such file \"{}\"".format(yaml_path))
         for group in file_data:
-            self.groups.append(group)
+            if group not in self._by_group:
+                self.groups.append(group)
+                self._by_group[group] = []
             for tool in file_data[group]:
-                self.tools.append(Tool(group, tool["name"], tool["executable"],
-                                       version=tool.get("version", None),
-                                       bin_path=tool.get("bin_path", None),
-                                       path=tool.get("path", None),
-                                       lib=tool.get("lib", None),
-                                       license=tool.get("license", None),
-                                       env=tool.get("env", None),
-                                       lsf_only=tool.get("lsf_only", False)
-                                       ))
-
-    def print_list(self):
+                self.add_tool(Tool(group, tool["name"], tool["executable"],
+                                   version=tool.get("version", None),
+                                   bin_path=tool.get("bin_path", None),
+                                   path=tool.get("path", None),
+                                   lib=tool.get("lib", None),
+                                   license=tool.get("license", None),
+                                   env=tool.get("env", None),
+                                   lsf_only=tool.get("lsf_only", False)
+                                   ))
+
+    def print_list(self, results=None):
+        """
+        Prints tools and results of their checks.
+        :param results:
+        core.tool_check.ToolCheckResult list (in order of self.tools); tools are checked in parallel if it's None
+        """
+        if results is None:
+            results = check_tools(self.tools)
+        checks = {(result.group, result.name): result for result in results}
         for group in self.groups:
             print()
             Logger.info("Group \"" + group + "\":")
@@ -140,51 +222,36 @@ class Tools:
                 Logger.info("\t\t   License: {}".format(tool.license))
                 Logger.info("\t\t  Env vars: {}".format(str(tool.env)))
                 Logger.info("\t\t  LSF only: {}".format(str(tool.lsf_only)))
-                if tool.bin_path is not None:
-                    path = os.path.join(tool.bin_path, tool.executable)
-                    if os.path.isfile(path):
-                        Logger.info("\t\t     Check: " + bcolors.OKGREEN + "PASS" + bcolors.ENDC)
-                    else:
-                        Logger.info("\t\t     Check: " + bcolors.FAIL + "FAIL" + bcolors.ENDC)
+                if checks[(tool.group, tool.name)].available:
+                    Logger.info("\t\t     Check: " + bcolors.OKGREEN + "PASS" + bcolors.ENDC)
                 else:
-                    path = tool.executable
-                    if run("which " + path, stdout=PIPE, stderr=PIPE, universal_newlines=True,
-                           shell=True).returncode != 0:
-                        Logger.info("\t\t     Check: " + bcolors.FAIL + "FAIL" + bcolors.ENDC)
-                    else:
-                        Logger.info("\t\t     Check: " + bcolors.OKGREEN + "PASS" + bcolors.ENDC)
+                    Logger.info("\t\t     Check: " + bcolors.FAIL + "FAIL" + bcolors.ENDC)
 
     def get_groups_list(self):
         return self.groups
 
     def get_tools_from_group(self, group):
-        ret_list = []
-        for tool in self.tools:
-            if tool.group == group:
-                ret_list.append(tool)
-        return ret_list
+        return list(self._by_group.get(group, []))
 
     def get_tool(self, name, group=None) -> Tool:
-
-        counter = 0
-        for tool in self.tools:
-            if tool.name == name:
-                if group is not None and tool.group == group:
-                    return tool
-                counter += 1
-                res_tool = tool
-        if counter == 0:
-            return None
-        if counter == 1:
-            return res_tool
-        if counter > 1:
-            Logger.fatal("More then one instance of {} found! Use \"group\" parameter.".format(name))
+        if group is not None:
+            tool = self._by_key.get((group, name))
+            if tool is not None:
+                return tool
+        tools = self._by_name.get(name, [])
+        if len(tools) == 0:
             return None
+        if len(tools) == 1:
+            return tools[0]
+        Logger.fatal("More then one instance of {} found! Use \"group\" parameter.".format(name))
+        return None
 
     def replace_pathes_vars(self, project):
+        """Replaces project variables in tools' paths (undefined ones are reported as "<group>.<tool>.path")"""
         for tool in self.tools:
-            tool.path = project.recursive_replace(tool.path)
-            tool.bin_path = project.recursive_replace(tool.bin_path)
+            tool.path = project.recursive_replace(tool.path, owner="{}.{}.path".format(tool.group, tool.name))
+            tool.bin_path = project.recursive_replace(tool.bin_path, owner="{}.{}.bin_path".format(tool.group,
+                                                                                                 tool.name))
 
     def check_tool(self, name, group) -> bool:
         """Checks if tool is available.
@@ -198,18 +265,59 @@ class Tools:
         -------
         bool
             True - if tool is available.
-            Flase - if tool is unavailable.
+            False - if tool is unavailable.
         """
-        tool = self.get_tool(name, group)
-        if tool.bin_path != "None":
-            path = os.path.join(tool.bin_path, tool.executable)
-            if os.path.isfile(path):
-                return True
-            else:
-                return False
-        else:
-            path = tool.executable
-            if run("which " + path, stdout=PIPE, stderr=PIPE, universal_newlines=True, shell=True).returncode != 0:
-                return False
-            else:
-                return True
+        return check_tool(self.get_tool(name, group)).available
+
+
+def _get_stamp(paths) -> tuple:
+    ret = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            ret.append((path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            ret.append((path, None, None))
+    return tuple(ret)
+
+
+class ToolsRegistry(object):
+    """Process-level cache of Tools. tools.yaml files are parsed again only if their mtime (or size) is changed.
+    Cached Tools are never returned: callers get copies, so e.g. replace_pathes_vars() can't change the cache.
+    """
+
+    def __init__(self) -> None:
+        self._entries = {}  # Tuple of paths -> (stamp, Tools)
+        self._lock = threading.Lock()
+
+    def get_tools(self, yaml_paths) -> Tools:
+        """
+        :param yaml_paths:
+        Paths of tools.yaml files
+        :return:
+        Tools class instance (a new copy of the cached one)
+        """
+        key = tuple(yaml_paths)
+        stamp = _get_stamp(key)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != stamp:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None or entry[0] != stamp:
+                    tools = Tools()
+                    tools.parse_yaml(key)
+                    entry = (stamp, tools)
+                    self._entries[key] = entry
+        return entry[1].copy()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+registry = ToolsRegistry()
+
+
+def load_tools(yaml_paths) -> Tools:
+    """Tools of the tools.yaml files (cached, see ToolsRegistry)"""
+    return registry.get_tools(yaml_paths)
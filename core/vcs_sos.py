@@ -21,11 +21,14 @@ class VcsSos(object):
     ----------
     path : str, optional
         Path to the SoS repository
+    out : file-like object, optional
+        Stream for messages (sys.stdout by default)
     """
     soscmd_stdout = ''
 
-    def __init__(self, path=None):
+    def __init__(self, path=None, out=None):
         self.path = path
+        self.out = out
 
     def __set_path_if_none(self, new_path):
         """Sets self.path if it is None
@@ -48,9 +51,9 @@ class VcsSos(object):
         stdout, stderr = stdout.decode(sys.stdout.encoding or 'utf-8'), stderr.decode(sys.stderr.encoding or 'utf-8')
         process_return_code = process_handle.returncode
         if process_return_code != 0:
-            Logger.error("Return code = {}".format(process_return_code))
-            Logger.info("stdout: {}".format(stdout))
-            Logger.red("stderr: {}".format(stderr))
+            Logger.error("Return code = {}".format(process_return_code), file=self.out)
+            Logger.info("stdout: {}".format(stdout), file=self.out)
+            Logger.red("stderr: {}".format(stderr), file=self.out)
         self.soscmd_stdout = stdout
         return process_return_code
 
@@ -66,29 +69,29 @@ class VcsSos(object):
             Name of SoS user
         """
         if os.path.exists(self.path):
-            Logger.warning("Path \"{}\" already exists!".format(self.path))
+            Logger.warning("Path \"{}\" already exists!".format(self.path), file=self.out)
             return
         else:
             path_parsed = re.findall(r"^\/proj\/([a-zA-Z0-9_-]+)\/workareas\/([a-zA-Z0-9_-]+)", self.path)
             project_name, workarea_name = path_parsed[0][0], path_parsed[0][1]
             command_line = "cd {} && ProjectCreateWorkarea -p {} -d {} -u {} -l USCA41".format(os.path.dirname(self.path), project_name, workarea_name, user_name)
-            Logger.cmd(command_line)
+            Logger.cmd(command_line, file=self.out)
             process_handle = Popen(command_line, stdout=PIPE, stderr=PIPE, shell=True)
             stdout, stderr = process_handle.communicate()
             stdout, stderr = stdout.decode(sys.stdout.encoding or 'utf-8'), stderr.decode(sys.stderr.encoding or 'utf-8')
             process_return_code = process_handle.returncode
             if process_return_code != 0:
-                Logger.fatal("Return code = {}".format(process_return_code))
+                Logger.fatal("Return code = {}".format(process_return_code), file=self.out)
 
     def update(self, rso):
         rso_list = rso.split(" ")
         params = "update"
         for tag in rso_list:
             params += " -l{}".format(tag)
-        self.run_sos_cli(params)
+        return self.run_sos_cli(params)
 
     def populate(self, path=None):
-        self.run_sos_cli("populate .")
+        return self.run_sos_cli("populate .")
 
     def exit(self):
         self.run_sos_cli("exitsos")
@@ -140,13 +143,13 @@ class VcsSos(object):
         stdout, stderr = stdout.decode(sys.stdout.encoding or 'utf-8'), stderr.decode(sys.stderr.encoding or 'utf-8')
         process_return_code = process_handle.returncode
         if process_return_code != 0:
-            Logger.fatal('Return code = {}'.format(process_return_code))
+            Logger.fatal('Return code = {}'.format(process_return_code), file=self.out)
         # Parse output to find revision string
         status = re.findall(r"([0-6]+) ([0-4]+)\s*\{CurrentVer ([A-Za-z0-9/_]+)\}", stdout)
         if status != []:
             return status[0][2]
         else:
-            Logger.fatal("Can't get status of file {}".format(file))
+            Logger.fatal("Can't get status of file {}".format(file), file=self.out)
 
     def get_other_revision(self, file, revision):
         """Bring the selected revisions of the selected files into your workarea
@@ -0,0 +1,111 @@
+"""XML loader benchmark
+
+Compares parse time and peak RSS of project.xml by the tree and the streaming loaders of core.xml_loader:
+    python -m core.xml_benchmark [--modules N] [--files N] [project.xml]
+If no project.xml is given, a generated one is used. POSIX only (peak RSS is read by resource.getrusage()).
+"""
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from core.xml_loader import iterparse_project_xml, parse_project_xml_tree
+
+LOADERS = {"tree": parse_project_xml_tree, "stream": iterparse_project_xml}
+
+
+def generate_project_xml(path, modules=200, files=100) -> None:
+    """Writes a big project.xml: every module has variables, 2 filelists with files and steps with tools"""
+    with open(path, "w") as xml_file:
+        xml_file.write("<project>\n  <name>benchmark</name>\n  <variables>\n")
+        for index in range(modules):
+            xml_file.write("    <var><name>VAR_{0}</name><value>/path/{0}</value></var>\n".format(index))
+        xml_file.write("  </variables>\n  <modules>\n")
+        for index in range(modules):
+            xml_file.write("    <module>\n      <name>module_{0}</name>\n      <type>type_{0}</type>\n"
+                           "      <variables><var><name>TOP</name><value>top_{0}</value></var></variables>\n"
+                           "      <filelists>\n".format(index))
+            for filelist in ("rtl", "tb"):
+                xml_file.write("        <filelist>\n          <name>{}</name>\n".format(filelist))
+                for file_index in range(files):
+                    xml_file.write("          <file>$VAR_{}/{}/file_{}.sv</file>\n".format(index, filelist,
+                                                                                        file_index))
+                xml_file.write("        </filelist>\n")
+            xml_file.write("      </filelists>\n      <steps>\n")
+            for step in ("compile", "elaborate", "simulate"):
+                xml_file.write("        <step><name>{0}</name><parameter>-{0}</parameter><tools>"
+                               "<tool><name>xrun</name><parameter>-{0}</parameter></tool></tools></step>\n"
+                               .format(step))
+            xml_file.write("      </steps>\n    </module>\n")
+        xml_file.write("  </modules>\n</project>\n")
+
+
+def _describe(project_data) -> list:
+    """Comparable representation of parsed project"""
+    modules = [(module['name'], module['type'], module['vars'], module['filelists'],
+                [(step.name, step.parameter, [(tool.name, tool.parameter) for tool in step.tools])
+                 for step in module['steps']]) for module in project_data["modules"]]
+    return [project_data["name"], project_data["variables"], modules]
+
+
+def _run_loader(loader, path) -> None:
+    """Benchmark child: prints "<seconds> <peak RSS, KiB>" """
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    LOADERS[loader](path)
+    elapsed = time.perf_counter() - start
+    print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before)
+
+
+def benchmark(path, repeat=3) -> dict:
+    """Runs every loader in a separate process (so peak RSS isn't shared) and checks that they return the same data
+    :return:
+    Dict loader -> (best time in seconds, peak RSS growth in KiB)
+    """
+    ret = {}
+    for loader in LOADERS:
+        runs = []
+        for _ in range(repeat):
+            output = subprocess.check_output([sys.executable, "-m", "core.xml_benchmark", "--run", loader, path],
+                                             cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                             universal_newlines=True)
+            elapsed, rss = output.split()
+            runs.append((float(elapsed), int(rss)))
+        ret[loader] = (min(run[0] for run in runs), max(run[1] for run in runs))
+    # Children inherit peak RSS of this process (Linux), so loaders are compared here only after the measurement
+    if _describe(parse_project_xml_tree(path)) != _describe(iterparse_project_xml(path)):
+        raise AssertionError("Loaders return different data for {}".format(path))
+    return ret
+
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(prog="python -m core.xml_benchmark", description="project.xml loaders benchmark")
+    parser.add_argument("path", nargs="?", help="project.xml (generated if not given)")
+    parser.add_argument("--modules", type=int, default=200, help="Modules in generated project.xml")
+    parser.add_argument("--files", type=int, default=100, help="Files per filelist in generated project.xml")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--run", choices=list(LOADERS), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run is not None:
+        _run_loader(args.run, args.path)
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp_dir_path:
+        path = args.path
+        if path is None:
+            path = os.path.join(tmp_dir_path, "project.xml")
+            generate_project_xml(path, args.modules, args.files)
+        print("{} ({:.1f} MiB)".format(path, os.path.getsize(path) / 2 ** 20))
+        print("{:8}  {:>10}  {:>14}".format("Loader", "Time, ms", "Peak RSS, MiB"))
+        for loader, (elapsed, rss) in benchmark(path, args.repeat).items():
+            print("{:8}  {:>10.1f}  {:>14.1f}".format(loader, elapsed * 1000, rss / 1024))
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main(sys.argv[1:]))
@@ -0,0 +1,173 @@
+"""XML loader core module
+
+Streaming (lxml iterparse) parsers of project.xml and release.xml. Every processed element is cleared and removed
+from its parent, so the memory doesn't grow with the number of modules and files. Tree-based parsers (etree.parse and
+findtext, like Project and Release used before) are kept for comparison (see core.xml_benchmark).
+"""
+
+from lxml import etree
+
+from core.project import Step, Tool
+
+
+def _clear(element) -> None:
+    """Frees processed element and its already processed siblings"""
+    element.clear()
+    parent = element.getparent()
+    if parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
+
+
+def _new_module() -> dict:
+    return {'name': None, 'type': None, 'vars': {}, 'filelists': {}, 'steps': []}
+
+
+def iterparse_project_xml(project_file_path) -> dict:
+    """Parses project.xml incrementally
+
+    Returns
+    -------
+    result : dict
+        {"name": str, "variables": [(name, value, auto), ...], "modules": [module, ...]}, where module is
+        {'name', 'type', 'vars', 'filelists', 'steps'} like in Project
+    """
+    ret = {"name": None, "variables": [], "modules": []}
+    path = []
+    module = None
+    filelist_name = None
+    filelist = None
+    step = None
+    for event, element in etree.iterparse(project_file_path, events=("start", "end"), remove_comments=True):
+        if event == "start":
+            path.append(element.tag)
+            if len(path) == 3 and path[1] == "modules":
+                module = _new_module()
+            elif path[-1] == "filelist" and path[-2] == "filelists":
+                filelist_name = None
+                filelist = []
+            elif path[-1] == "step" and path[-2] == "steps":
+                step = {"name": None, "parameter": None, "tools": []}
+            continue
+
+        tag = path.pop()
+        parent = path[-1] if path else None
+        depth = len(path)
+        if depth == 1 and tag == "name":
+            ret["name"] = element.text or ""
+        elif tag == "var" and parent == "variables":
+            if depth == 2:
+                ret["variables"].append((element.findtext("name"), element.findtext("value"),
+                                         element.findtext("auto")))
+            elif module is not None:
+                module['vars'][element.findtext("name")] = element.findtext("value")
+            _clear(element)
+        elif module is None:
+            continue
+        elif depth == 3 and parent == "module" and tag in ("name", "type"):
+            module[tag] = element.text or ""
+        elif tag == "file" and parent == "filelist":
+            filelist.append(element.text)
+            _clear(element)
+        elif tag == "name" and parent == "filelist":
+            filelist_name = element.text or ""
+        elif tag == "filelist" and parent == "filelists":
+            module['filelists'][filelist_name] = filelist
+            _clear(element)
+        elif tag == "tool" and parent == "tools" and step is not None:
+            step["tools"].append(Tool(element.findtext("name"), element.findtext("parameter")))
+            _clear(element)
+        elif tag in ("name", "parameter") and parent == "step":
+            step[tag] = element.text or ""
+        elif tag == "step" and parent == "steps":
+            module['steps'].append(Step(step["name"], step["parameter"], step["tools"]))
+            step = None
+            _clear(element)
+        elif depth == 2 and tag == "module":
+            ret["modules"].append(module)
+            module = None
+            _clear(element)
+    return ret
+
+
+def parse_project_xml_tree(project_file_path) -> dict:
+    """Parses project.xml as a whole tree (the former Project.load_xml()). Same result as iterparse_project_xml()."""
+    ret = {"name": None, "variables": [], "modules": []}
+    project_xml_top = etree.parse(project_file_path).getroot()
+    ret["name"] = project_xml_top.findtext("name")
+    variables = project_xml_top.find("variables")
+    if variables is not None:
+        for var in variables:
+            ret["variables"].append((var.findtext("name"), var.findtext("value"), var.findtext("auto")))
+    modules = project_xml_top.find("modules")
+    if modules is not None:
+        for module in modules:
+            module_data = _new_module()
+            module_data['name'] = module.findtext("name")
+            module_data['type'] = module.findtext("type")
+            variables = module.find("variables")
+            if variables is not None:
+                for var in variables:
+                    module_data['vars'][var.findtext("name")] = var.findtext("value")
+            filelists = module.find("filelists")
+            if filelists is not None:
+                for filelist in filelists:
+                    module_data['filelists'][filelist.findtext("name")] = [file.text for file in
+                                                                           filelist.findall("file")]
+            steps = module.find("steps")
+            if steps is not None:
+                for step in steps:
+                    list_tools = []
+                    tools = step.find("tools")
+                    if tools is not None:
+                        for tool in tools:
+                            list_tools.append(Tool(tool.findtext("name"), tool.findtext("parameter")))
+                    module_data['steps'].append(Step(step.findtext("name"), step.findtext("parameter"), list_tools))
+            ret["modules"].append(module_data)
+    return ret
+
+
+def iterparse_release_xml(release_file_path) -> dict:
+    """Parses release.xml incrementally
+
+    Returns
+    -------
+    result : dict
+        {"version": str, "dependencies": [(group, [dependence, ...]), ...]}, where dependence is
+        {"name", "vcs", "local_path", "tag"}
+    """
+    ret = {"version": None, "dependencies": []}
+    path = []
+    group = None
+    for event, element in etree.iterparse(release_file_path, events=("start", "end"), remove_comments=True):
+        if event == "start":
+            path.append(element.tag)
+            if len(path) == 3 and path[1] == "dependencies":
+                group = (element.tag, [])
+                ret["dependencies"].append(group)
+            continue
+
+        tag = path.pop()
+        depth = len(path)
+        if depth == 1 and tag == "version":
+            ret["version"] = element.text or ""
+        elif depth == 3 and group is not None:
+            group[1].append({"name": element.findtext("name"), "vcs": element.findtext("vcs"),
+                             "local_path": element.findtext("local_path"), "tag": element.findtext("tag")})
+            _clear(element)
+        elif depth == 2 and group is not None:
+            group = None
+            _clear(element)
+    return ret
+
+
+def parse_release_xml_tree(release_file_path) -> dict:
+    """Parses release.xml as a whole tree (the former Release.load_xml()). Same result as iterparse_release_xml()."""
+    ret = {"version": None, "dependencies": []}
+    release_xml_top = etree.parse(release_file_path).getroot()
+    ret["version"] = release_xml_top.findtext("version")
+    for dep_type in release_xml_top.find("dependencies"):
+        ret["dependencies"].append((dep_type.tag, [{"name": dep.findtext("name"), "vcs": dep.findtext("vcs"),
+                                                    "local_path": dep.findtext("local_path"),
+                                                    "tag": dep.findtext("tag")} for dep in dep_type]))
+    return ret
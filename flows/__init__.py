@@ -1,28 +1,208 @@
+import ast
+import json
+from glob import glob
+from hashlib import md5
+from importlib import import_module
 from keyword import iskeyword
-from os import listdir
-from os.path import dirname, join, isdir, isfile
-from sys import modules
+from os import getenv, getpid, listdir, makedirs, remove, replace, stat
+from os.path import dirname, expanduser, join, isdir, isfile, split, splitext
 
+from core.completion import SHELLS, write_completion_script
 from core.logger import Logger
-from core.tools import Tools
+from core.profiler import profiler
+from core.registry import CommandRegistry
+from core.tools import Tools, load_tools
 
 basedir = dirname(__file__)
 
-__all__ = []
-for name in listdir(basedir):
-    flow_dir_path = join(basedir, name)
-    if isdir(flow_dir_path) and len(listdir(flow_dir_path)) > 0 and not name.startswith('_') \
-            and name.isidentifier() and not iskeyword(name):
-        if len(listdir(flow_dir_path)) == 1 and listdir(flow_dir_path).pop() == ".git":
-            Logger.warning("Only .git folder in flow \"{}\"!".format(name))
-            continue
+MANIFEST_VERSION = 1
+
+
+def _scan_flows() -> list:
+    ret = []
+    for name in listdir(basedir):
+        flow_dir_path = join(basedir, name)
+        if isdir(flow_dir_path) and len(listdir(flow_dir_path)) > 0 and not name.startswith('_') \
+                and name.isidentifier() and not iskeyword(name):
+            if len(listdir(flow_dir_path)) == 1 and listdir(flow_dir_path).pop() == ".git":
+                Logger.warning("Only .git folder in flow \"{}\"!".format(name))
+                continue
+            ret.append(name)
+    ret.sort()
+    return ret
+
+
+def _get_command_names(flow) -> list:
+    """Lists command modules of the flow without importing them"""
+    commands_dir_path = join(basedir, flow, "commands")
+    if not isdir(commands_dir_path):
+        Logger.fatal("No commands in flow \"{}\"".format(flow))
+    ret = []
+    for file_path in glob(join(commands_dir_path, '*.py')):
+        command = splitext(split(file_path)[-1])[0]
+        if not command.startswith('_') and command.isidentifier() and not iskeyword(command):
+            ret.append(command)
+    ret.sort()
+    return ret
+
+
+def _read_command_dict(flow, command) -> dict:
+    """Reads the ``_command`` dict of a command.
+
+    The dict is taken from the module's source as a literal, so the command module (and everything it imports) is
+    not loaded. Commands with a non-literal ``_command`` are imported as before.
+    """
+    command_file_path = join(basedir, flow, "commands", command + ".py")
+    try:
+        with open(command_file_path, 'r', encoding='UTF-8') as command_file:
+            tree = ast.parse(command_file.read(), command_file_path)
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and \
+                    any(isinstance(target, ast.Name) and target.id == "_command" for target in node.targets):
+                return ast.literal_eval(node.value)
+    except (SyntaxError, ValueError):
+        pass
+    return getattr(import_module(__name__ + '.' + flow + ".commands." + command), "_command")
+
+
+def _read_declarations(flow) -> list:
+    ret = []
+    for command in _get_command_names(flow):
         try:
-            __import__(__name__ + '.' + name)
+            command_dict = _read_command_dict(flow, command)
         except Exception as e:
-            Logger.warning('Ignoring exception while loading the \"{}\" flow. Exception: {}'.format(name, e))
-        else:
-            __all__.append(name)
-__all__.sort()
+            Logger.warning('Ignoring exception while loading the \"{}\" command. Exception: {}'.format(command, e))
+            continue
+        ret.append({"flow": flow, "name": command, "help": command_dict["help"], "params": command_dict["params"],
+                    "flags": command_dict.get("flags", None), "silent": command_dict.get("silent", False),
+                    "no_project": command_dict.get("no_project", False)})
+    return ret
+
+
+def _get_cache_dir_path() -> str:
+    return join(getenv("XDG_CACHE_HOME", join(expanduser("~"), ".cache")), "odin")
+
+
+def _get_installation_id() -> str:
+    return md5(basedir.encode()).hexdigest()[:12]
+
+
+def get_manifest_file_path() -> str:
+    """Path of the commands manifest cache. One file per Odin installation in $XDG_CACHE_HOME/odin (~/.cache/odin)
+    """
+    return join(_get_cache_dir_path(), "commands_{}.json".format(_get_installation_id()))
+
+
+def get_completion_file_path(shell) -> str:
+    """Path of the generated completion script for the shell. It's placed next to the commands manifest
+    """
+    return join(_get_cache_dir_path(), "completion_{}.{}".format(_get_installation_id(), shell))
+
+
+def get_server_socket_path() -> str:
+    """Default Unix socket of "odin.py serve". It can be overridden by $ODIN_SOCKET (see odin_client.py)
+    """
+    return getenv("ODIN_SOCKET", join(_get_cache_dir_path(), "server_{}.sock".format(_get_installation_id())))
+
+
+def _update_completion_scripts(registry) -> None:
+    """Regenerates completion scripts that were emitted before, so they always match the manifest"""
+    for shell in SHELLS:
+        completion_file_path = get_completion_file_path(shell)
+        if isfile(completion_file_path):
+            write_completion_script(registry, shell, completion_file_path)
+
+
+def _get_stamp(path):
+    try:
+        return stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _get_stamps(flows_list) -> dict:
+    """Mtimes of everything the manifest depends on. Directories are included, so added or removed flows and
+    commands are detected without listing them.
+    """
+    paths = [basedir, join(dirname(basedir), ".gitmodules")]
+    for flow in flows_list:
+        paths.append(join(basedir, flow))
+        paths.append(join(basedir, flow, "commands"))
+        paths += sorted(glob(join(basedir, flow, "commands", "*.py")))
+    return {path: _get_stamp(path) for path in paths}
+
+
+def _load_manifest():
+    """Loads the manifest if it is still valid
+    :return:
+    Manifest dict or None if there is no manifest or it is out of date
+    """
+    try:
+        with open(get_manifest_file_path(), 'r') as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("basedir") != basedir:
+        return None
+    for path, stamp in manifest["stamps"].items():
+        if _get_stamp(path) != stamp:
+            return None
+    return manifest
+
+
+def _save_manifest(manifest) -> bool:
+    manifest_file_path = get_manifest_file_path()
+    tmp_file_path = "{}.{}".format(manifest_file_path, getpid())
+    try:
+        makedirs(dirname(manifest_file_path), exist_ok=True)
+        try:
+            with open(tmp_file_path, 'w') as manifest_file:
+                json.dump(manifest, manifest_file)
+            replace(tmp_file_path, manifest_file_path)
+        except BaseException:
+            if isfile(tmp_file_path):
+                remove(tmp_file_path)
+            raise
+    except (OSError, TypeError, ValueError) as e:
+        Logger.warning("Can't save commands manifest \"{}\". Exception: {}".format(manifest_file_path, e))
+        return False
+    return True
+
+
+def is_manifest_up_to_date() -> bool:
+    """Checks that flows and commands weren't changed since the manifest was loaded (used by long-running server)"""
+    for path, stamp in _manifest["stamps"].items():
+        if _get_stamp(path) != stamp:
+            return False
+    return True
+
+
+def _build_manifest() -> dict:
+    flows_list = _scan_flows()
+    manifest = {"version": MANIFEST_VERSION, "basedir": basedir, "stamps": _get_stamps(flows_list),
+                "flows": flows_list, "commands": {}}
+    for flow in flows_list:
+        with profiler.phase("flows: read commands of \"{}\"".format(flow)):
+            manifest["commands"][flow] = _read_declarations(flow)
+    _save_manifest(manifest)
+    return manifest
+
+
+with profiler.phase("flows: load manifest"):
+    _manifest = _load_manifest()
+_is_manifest_rebuilt = _manifest is None
+if _is_manifest_rebuilt:
+    with profiler.phase("flows: build manifest"):
+        _manifest = _build_manifest()
+
+__all__ = list(_manifest["flows"])
+_registry = CommandRegistry([command for flow in __all__ for command in _manifest["commands"][flow]], __name__)
+if _is_manifest_rebuilt:
+    _update_completion_scripts(_registry)
+
+
+def get_registry() -> CommandRegistry:
+    return _registry
 
 
 def get_flows() -> list:
@@ -30,55 +210,42 @@ def get_flows() -> list:
 
 
 def get_commands(selected_flow=None) -> list:
-    ret = []
-
-    for flow in __all__:
-        if selected_flow is not None and selected_flow != flow:
-            continue
-        try:
-            commands = getattr(modules[__name__ + '.' + flow], "commands").__all__
-        except AttributeError:
-            Logger.fatal("No commands in flow \"{}\"".format(flow))
-
-        for command in commands:
-            command_dict = getattr(modules[__name__ + '.' + flow + ".commands." + command], "_command")
-            ret.append(
-                {"flow": flow, "name": command, "help": command_dict["help"], "params": command_dict["params"],
-                 "flags": command_dict.get("flags", None), "silent": command_dict.get("silent", False),
-                 "no_project": command_dict.get("no_project", False)})
-    return ret
+    return _registry.get_commands(selected_flow)
 
 
 def get_command(command_name: str) -> dict:
-    for command in get_commands():
-        if command["name"] == command_name:
-            return command
-    Logger.error("No such command \"{}\"".format(command_name))
-    return None
+    return _registry.get_command(command_name)
+
+
+def get_command_module(command_name: str):
+    return _registry.get_module(command_name)
 
 
 def get_flow_of_command(command_name: str) -> str:
-    return get_command(command_name)["flow"]
+    return _registry.get_flow_of_command(command_name)
 
 
 def get_params_of_command(command_name: str) -> str:
-    return get_command(command_name)["params"]
+    return _registry.get_params_of_command(command_name)
 
 
 def get_silent_of_command(command_name: str) -> bool:
-    return get_command(command_name)["silent"]
+    return _registry.get_silent_of_command(command_name)
 
 
 def get_no_project_of_command(command_name: str) -> bool:
-    return get_command(command_name)["no_project"]
+    return _registry.get_no_project_of_command(command_name)
 
 
-def get_tools() -> Tools:
+def get_tools_file_paths() -> list:
     tools_file_list = []
     for flow in __all__:
         tools_file_path = join(join(join(basedir, flow), "configs"), "tools.yaml")
         if isfile(tools_file_path):
             tools_file_list.append(tools_file_path)
-    tools = Tools()
-    tools.parse_yaml(tools_file_list)
-    return tools
+    return tools_file_list
+
+
+def get_tools() -> Tools:
+    """Tools of all flows. It's cached: tools.yaml files are parsed again only if they're changed."""
+    return load_tools(get_tools_file_paths())
@@ -1,14 +1,20 @@
 """Show and check tools
 """
 
+import json
 import logging
+import time
 
 from core.logger import Logger
+from core.tool_check import DirectoryCache, check_tools
 
 _command = {'help': 'Show and check tools',
             'params': [{'name': 'open', 'help': 'Open tool', 'default': 'None'},
                        {'name': 'group', 'help': 'Open tool from selected group', 'default': 'None'},
-                       {'name': 'params', 'help': 'Params for tool to open', 'default': 'None'}]}
+                       {'name': 'params', 'help': 'Params for tool to open', 'default': 'None'},
+                       {'name': 'report_file', 'help': 'Write results of checks as JSON to this file',
+                        'default': 'None'}],
+            'flags': [{'name': 'json', 'help': 'Print results of checks as JSON (with per-tool latency)'}]}
 
 logger = logging.getLogger(__name__)
 
@@ -21,26 +27,41 @@ def run(core):
             tool = core.get_tool(core.args.open, core.args.group)
         if tool is None:
             Logger.fatal("No such tool!")
-        tool.setup()
+        tools = [tool]
         print("Starting", tool.executable, "...")
         if tool.lsf_only:
             tool_lsf = core.get_tool("LSF", core.args.group)
             if tool_lsf is not None:
-                tool_lsf.setup()
+                tools.append(tool_lsf)
             else:
                 logger.warning("You are trying to start LSF-only tool, but Odin can't find LSF tool in tool gruop '{}'!".format(core.args.group))
+        env = core.get_env(tools)
 
         if core.args.params == "None":
-            run_line, exit_code, stdout, stderr = tool.run(stdout_capture=True)
+            run_line, exit_code, stdout, stderr = tool.run(stdout_capture=True, env=env)
         else:
-            # run_line, exit_code, stdout, stderr = tool.run(params=core.args.params, stdout_capture=True)
-            run_line, exit_code, stdout, stderr = tool.run(params=core.args.params, stdout_capture=True)
+            run_line, exit_code, stdout, stderr = tool.run(params=core.args.params, stdout_capture=True, env=env)
 
         print("Run line: {}".format(run_line))
         print("Exit code: {}".format(exit_code))
         print("stdout: {}".format(stdout))
         print("stderr: {}".format(stderr))
     else:
+        tools = core.get_tools()
+        cache = DirectoryCache()
+        timer = time.perf_counter()
+        results = check_tools(tools.tools, cache=cache)
+        if core.args.json or core.args.report_file != "None":
+            report = json.dumps({"tools": [result.to_dict() for result in results],
+                                 "directories_ms": {path: round(seconds * 1000.0, 3)
+                                                    for path, seconds in cache.get_timings().items()},
+                                 "total_ms": round((time.perf_counter() - timer) * 1000.0, 3)}, indent=2)
+            if core.args.report_file != "None":
+                with open(core.args.report_file, "w") as report_file:
+                    report_file.write(report + "\n")
+            if core.args.json:
+                print(report)
+                return 0
         Logger.info("Show and check tools")
-        core.flows.get_tools().print_list()
+        tools.print_list(results)
         return 0
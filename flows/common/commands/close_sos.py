@@ -7,11 +7,14 @@ Details:
 Run 'exitsos'
 '''
 
+from core.release_executor import run_for_dependencies
 from core.vcs_sos import VcsSos
 
 _command = {'help': 'Closes all GUI for Cliosoft SoS', 'params': None}
 
 def run(data):
-    for wa in data.release.get_all_sos_paths():
-        VcsSos(data.project.replace_variables(wa)).exit()
-    return 0
+    def exit_sos(repo, out):
+        VcsSos(data.project.replace_variables(repo.local_path), out).exit()
+
+    report = run_for_dependencies(data.release, exit_sos, data.release.get_all_repo_sos())
+    return 0 if report.is_ok() else 1
@@ -1,14 +1,28 @@
 """Get info for completion
 """
 
+from core.completion import SHELLS, write_completion_script
+from core.logger import Logger
+
 _command = {'help': 'Get info for completion',
-            'params': [{'name': 'cmd', 'help': "Command name to get it's params", 'default': 'None'}],
-            'silent': True}
+            'params': [{'name': 'cmd', 'help': "Command name to get it's params", 'default': 'None'},
+                       {'name': 'emit', 'help': "Write static completion script for bash or zsh and print its path. "
+                                                "Source it in your shell's rc file", 'default': 'None'}],
+            'silent': True,
+            'no_project': True}
 
 
 def run(core):
 
-    if core.args.cmd == "None":
+    if core.args.emit != "None":
+        if core.args.emit not in SHELLS:
+            Logger.error("Unsupported shell \"{}\"! Use one of: {}".format(core.args.emit, ", ".join(SHELLS)))
+            return 1
+        completion_file_path = core.flows.get_completion_file_path(core.args.emit)
+        if not write_completion_script(core.get_command_registry(), core.args.emit, completion_file_path):
+            return 1
+        print(completion_file_path)
+    elif core.args.cmd == "None":
         for cmd in core.flows.get_commands():
             print(cmd["name"])
     else:
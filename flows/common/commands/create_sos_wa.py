@@ -7,6 +7,7 @@ Details:
 Run 'ProjectCreateWorkarea -p <project_name> -d <dir_name> -u <user_name> -l USCA41'
 '''
 
+from core.release_executor import run_for_dependencies
 from core.vcs_sos import VcsSos
 
 _command = {'help': 'Create SoS workareas. Prepare release.xml first.', 'params': None}
@@ -14,7 +15,14 @@ _command = {'help': 'Create SoS workareas. Prepare release.xml first.', 'params'
 
 def run(data):
     print("# New workareas for projects:")
-    for wa in data.release.get_all_sos_paths():
-        print('\t> {}'.format(data.project.replace_variables(wa)))
-        VcsSos(data.project.replace_variables(wa)).create_workarea(data.project.get_user_name())
+
+    def create_workarea(repo, out):
+        path = data.project.replace_variables(repo.local_path)
+        print('\t> {}'.format(path), file=out)
+        VcsSos(path, out).create_workarea(data.project.get_user_name())
+
+    report = run_for_dependencies(data.release, create_workarea, data.release.get_all_repo_sos())
+    if not report.is_ok():
+        report.print_report()
+        return 1
     return 0
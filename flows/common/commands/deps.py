@@ -1,10 +1,50 @@
 """Show dependencies
 """
 
-_command = {'help': 'Show dependencies as graph', 'params': None}
+from core.logger import Logger
+
+_command = {'help': 'Show dependencies as graph',
+            'params': [{'name': 'diff', 'help': 'Show changes of dependencies from this release version',
+                        'default': 'None'},
+                       {'name': 'repo', 'help': 'Show tags of the repository in all releases', 'default': 'None'},
+                       {'name': 'tag', 'help': 'Show releases which use the tag', 'default': 'None'},
+                       {'name': 'history', 'help': 'Show changes across the last N releases', 'default': 'None'}]}
+
+
+def _get_release_index(core):
+    from core.release_index import ReleaseIndex
+
+    return ReleaseIndex(core.release.get_project_file_path(), core.release.get_project_file_type())
 
 
 def run(core):
+    if core.args.diff != "None":
+        if not core.release.has_release(core.args.diff):
+            Logger.error("Can't find release \"{}\"!".format(core.args.diff))
+            return 1
+        core.release.load_release(core.args.diff).diff(core.release).print_diff()
+        return 0
+    if core.args.repo != "None":
+        index = _get_release_index(core)
+        tags = index.get_repo_tags(core.args.repo)
+        if core.args.tag != "None":
+            tags = {version: tags[version] for version in index.get_repo_tag_versions(core.args.repo, core.args.tag)}
+        print("Repository {}:".format(core.args.repo))
+        print("\n".join(["\t{}: {}".format(version, tag) for version, tag in tags.items()]) or "\tNo releases")
+        return 0
+    if core.args.tag != "None":
+        versions = _get_release_index(core).get_tag_versions(core.args.tag)
+        print("Tag {}:".format(core.args.tag))
+        print("\n".join(["\t{}: {}".format(version, ", ".join(repos)) for version, repos in versions.items()])
+              or "\tNo releases")
+        return 0
+    if core.args.history != "None":
+        if not core.args.history.isdigit() or int(core.args.history) == 0:
+            Logger.error("--history expects a positive number of releases, got \"{}\"".format(core.args.history))
+            return 1
+        for diff in _get_release_index(core).get_history(int(core.args.history)):
+            diff.print_diff()
+        return 0
     core.release.print_graph()
     print("Version:", core.release._version)
     return 0
@@ -13,8 +13,8 @@ def run(core):
     print("\tVariables:")
     print("\n".join(["\t\t${} = {}".format(var, core.project._variables[var]) for var in core.project._variables]))
     print("\tModules:")
-    if bool(core.project._modules):
-        print("\n".join(["\t\t{}".format(mod['name']) for mod in core.project._modules]))
+    if bool(core.project.get_module_names()):
+        print("\n".join(["\t\t{}".format(name) for name in core.project.get_module_names()]))
     else:
         print("\t\tNo modules in this project")
 
@@ -0,0 +1,25 @@
+"""Odin server
+
+Keeps flows, project, release and tools loaded and runs commands sent by odin_client.py over a Unix socket.
+"""
+
+from core.logger import Logger
+from core.server import OdinServer
+
+_command = {'help': 'Run Odin server (send commands to it by odin_client.py)',
+            'params': [{'name': 'socket', 'help': 'Unix socket path ($ODIN_SOCKET by default)', 'default': 'None'}],
+            'no_project': True}
+
+
+def run(core):
+    from odin import main, prepare  # odin.py is the entry point, its directory is in sys.path
+
+    if core.args.socket == "None":
+        socket_path = core.flows.get_server_socket_path()
+    else:
+        socket_path = core.args.socket
+    try:
+        return OdinServer(socket_path, main, prepare).serve_forever()
+    except OSError as e:
+        Logger.error(str(e))
+        return 1
@@ -1,29 +1,64 @@
 """Update all VCS repositories
 """
 
+from core.logger import Logger
+from core.release_executor import CONTINUE, FAIL_FAST, run_for_dependencies
 from core.scoreboard import Scoreboard
 from core.scoreboard import scoreboard_step
 from core.vcs_sos import VcsSos
 
 _command = {'help': 'Update all repositories according release.xml',
-            'params': [{'name': 'VER', 'help': 'Version of release.xml', 'type': 'string', 'default': 'HEAD'}],
-            'flags': [{'name': 'dry', 'help': 'Dry run'}]}
+            'params': [{'name': 'VER', 'help': 'Version of release.xml', 'type': 'string', 'default': 'HEAD'},
+                       {'name': 'since', 'help': 'Update only repositories changed since this release version',
+                        'default': 'None'},
+                       {'name': 'jobs', 'help': 'Number of repositories updated in parallel',
+                        'default': '8'}],  # core.release_executor.DEFAULT_MAX_WORKERS (literal for the manifest)
+            'flags': [{'name': 'dry', 'help': 'Dry run'},
+                      {'name': 'fail_fast', 'help': 'Stop after the first failed repository'}]}
 
 
 @scoreboard_step("update", "Updated")
 def run(core):
     if core.args.dry:
         print('Dry run enabled')
+
+    release = core.release
+    for version in (core.args.VER, core.args.since):
+        if version not in ("HEAD", "None") and not release.has_release(version):
+            Logger.error("Can't find release \"{}\"!".format(version))
+            return 1
+    if core.args.VER != "HEAD":
+        release = release.load_release(core.args.VER)
+
+    if core.args.since != "None":
+        diff = release.load_release(core.args.since).diff(release)
+        diff.print_diff()
+        repos = diff.get_changed("sos")
+    else:
+        repos = release.get_all_repo_sos()
+
     print("Cliosoft SoS part:")
-    for repo in core.release.get_all_repo_sos():
-        print("\tRepo " + repo.get_name())
-        if not core.args.dry:
-            VcsSos(core.project.replace_variables(repo.local_path)).update(core.project.replace_variables(repo.tag))
-            VcsSos(core.project.replace_variables(repo.local_path)).populate()
+    if core.args.dry:
+        for repo in repos:
+            print("\tRepo " + repo.get_name())
+        return 0
+
+    def update_repo(repo, out):
+        print("\tRepo " + repo.get_name(), file=out)
+        vcs = VcsSos(core.project.replace_variables(repo.local_path), out)
+        exit_code = vcs.update(core.project.replace_variables(repo.tag))
+        if exit_code == 0:
+            exit_code = vcs.populate()
+        if exit_code != 0:
+            raise RuntimeError("soscmd exit code {}".format(exit_code))
+
+    report = run_for_dependencies(release, update_repo, repos, max_workers=int(core.args.jobs),
+                                  policy=FAIL_FAST if core.args.fail_fast else CONTINUE)
+    report.print_report()
 
     # print("Git part:")  # TODO: VAL-113
 
     # if Scoreboard(core).update_step("update", "Passed", "SoS are updated"):
     #     print("Scoreboard updated.")
 
-    return 0
+    return 0 if report.is_ok() else 1
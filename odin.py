@@ -2,22 +2,30 @@
 
 import argparse
 import os
-from sys import modules
+import subprocess
+import sys
 import logging
+import time
+
+_imports_start_times = time.perf_counter(), time.process_time()
 
 import flows
 from core import Core, Logger, Project, Release, print_logo
+from core.profiler import parse_import_times, print_import_times, profiler
+from core.release import get_release_file_path
+from core.snapshot import load_snapshot, save_snapshot
+
+profiler.add("import core and flows", _imports_start_times)
 
 """
 Globals
 """
 DEFAULT_PROJECT_FILENAME = "project"
 release = "HEAD"  # TODO: Replace this by some argument?
-
-global_variables = {}
+GLOBAL_OPTIONS_WITH_VALUE = ["--profile-json"]
 
 
-def get_project_file_path():  # TODO: Move to a separate file?
+def find_project_file_path():
     project_file_path = os.getenv("PROJECT_XML", default=os.getenv("PROJECT_YAML", default=os.getenv("PROJECT_YML")))
 
     if project_file_path is None:
@@ -26,83 +34,230 @@ def get_project_file_path():  # TODO: Move to a separate file?
             if os.path.isfile(project_file_path_wo_ext + ext):
                 project_file_path = project_file_path_wo_ext + ext
 
+    return project_file_path
+
+
+def get_project_file_path():  # TODO: Move to a separate file?
+    project_file_path = find_project_file_path()
+
     if project_file_path is None:
-        log.fatal("No project.xml/.yaml/.yml file found! \
+        Logger.fatal("No project.xml/.yaml/.yml file found! \
                     You can just go to the project's folder or set $PROJECT_XML/PROJECT_YAML/PROJECT_YML env var.")
 
     return project_file_path
 
 
-"""Main
-"""
-if __name__ == "__main__":
-    log = Logger(debug_level=Logger.DBG_ALL)  # TODO: Replace by logger from stdlib
-
-    logging.basicConfig(
-        # level=logging.INFO,
-        level=logging.DEBUG,
-        format="%(asctime)s - [%(levelname)s] - %(name)s - (%(filename)s).%(funcName)s(%(lineno)d) - %(message)s",
-    )
-    logger = logging.getLogger("odin.py")
-
+def get_global_variables() -> dict:
+    global_variables = {}
     global_variables["ODIN_PATH"] = os.path.dirname(os.path.abspath(__file__))
     global_variables["ODIN_WORKDIR_PATH"] = os.getcwd()
     # conf_path = os.path.join(global_variables["ODIN_PATH"], "conf")  # TODO: Delete
+    return global_variables
+
+
+def get_command_name(argv):
+    """Peeks at the command name before argparse is built. Global options are skipped.
+    :return:
+    Command name or None
+    """
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg in GLOBAL_OPTIONS_WITH_VALUE:
+            skip = True
+        elif not arg.startswith("-"):
+            return arg
+    return None
+
+
+def add_command_parser(subparsers, command):
+    command_parser = subparsers.add_parser(command["name"], help="{} ({})".format(command["help"], command["flow"]))
+    if command["params"] is not None:
+        for param in command["params"]:
+            command_parser.add_argument('--'+param['name'], default=param['default'], help=param['help'])
+    if command["flags"] is not None:
+        for flag in command["flags"]:
+            command_parser.add_argument('-'+flag['name'], nargs="?", default=False, const=True, help=flag['help'])
+    return command_parser
+
+
+def load_project(global_variables, cache=None):
+    """Loads project and release.
+    :param cache:
+    Optional WarmCache (server mode). Project and release are taken from it if their files weren't changed.
+    Without cache the on-disk snapshot (see core.snapshot) is tried first.
+    :return:
+    Set of (project, release)
+    """
+    if cache is not None:
+        with profiler.phase("Project (cache)"):
+            project = cache.get_project(global_variables)
+        with profiler.phase("Release (cache)"):
+            return project, cache.get_release(global_variables["PROJECT_FILE_PATH"],
+                                              project.get_project_file_type(), release)
+
+    with profiler.phase("load_snapshot"):
+        snapshot = load_snapshot(global_variables["PROJECT_FILE_PATH"], global_variables, release)
+    if snapshot is not None:
+        return snapshot
+
+    """Project
+    """
+    with profiler.phase("Project.load"):
+        project = Project(global_variables["PROJECT_FILE_PATH"], global_variables)
+    with profiler.phase("Project.resolve_vars"):
+        project.resolve_vars()
+
+    """Releases
+    """
+    with profiler.phase("Release.load"):
+        release_data = Release(global_variables["PROJECT_FILE_PATH"], project.get_project_file_type(), release)
+
+    with profiler.phase("save_snapshot"):
+        save_snapshot(project, release_data, release)
+    return project, release_data
+
+
+def run_with_import_profile(argv) -> int:
+    """Runs odin.py again under "python -X importtime" and prints import time of core and flows modules.
+    Other stderr lines are passed through.
+    """
+    import_time_lines = []
+    process_handle = subprocess.Popen([sys.executable, "-X", "importtime", os.path.abspath(__file__)] + argv,
+                                      stderr=subprocess.PIPE, universal_newlines=True)
+    for line in process_handle.stderr:
+        if line.startswith("import time:"):
+            import_time_lines.append(line)
+        else:
+            sys.stderr.write(line)
+    exit_code = process_handle.wait()
+    print_import_times(parse_import_times(import_time_lines))
+    return exit_code
+
+
+def report_profile(args) -> None:
+    if args.profile_json is not None:
+        profiler.write_json(args.profile_json)
+    if args.profile_startup:
+        profiler.print_table()
+        project = getattr(Core(), "project", None)
+        if project is not None and project.get_source_file_paths()[1:]:
+            stats = project.get_fragment_stats()
+            print("Project fragments: {} parsed ({:.2f} ms), {} deferred ({:.1f} KiB not parsed)".format(
+                stats["loaded"], stats["wall"] * 1000, stats["deferred"], stats["deferred_size"] / 1024),
+                file=sys.stderr)
+
+
+def prepare(argv, cache) -> None:
+    """Loads everything the command will need into the cache. Server calls it before forking a worker, so workers
+    start with warm data. Errors are left for the worker to report.
+    """
+    cache.get_tools()
+    registry = flows.get_registry()
+    command_name = get_command_name(argv)
+    if command_name not in registry or registry.get_no_project_of_command(command_name):
+        return
+    global_variables = get_global_variables()
+    global_variables["PROJECT_FILE_PATH"] = find_project_file_path()
+    if global_variables["PROJECT_FILE_PATH"] is None or not os.path.isfile(global_variables["PROJECT_FILE_PATH"]):
+        return
+    try:
+        project = cache.get_project(global_variables)
+        if os.path.isfile(get_release_file_path(global_variables["PROJECT_FILE_PATH"],
+                                                project.get_project_file_type(), release)):
+            cache.get_release(global_variables["PROJECT_FILE_PATH"], project.get_project_file_type(), release)
+    except (Exception, SystemExit):
+        pass
+
+
+def main(argv, cache=None):
+    if cache is not None:
+        profiler.reset()  # Server's own startup isn't a part of this command
+
+    log = Logger(debug_level=Logger.DBG_ALL)  # TODO: Replace by logger from stdlib
+
+    global_variables = get_global_variables()
 
     """
     ArgParser
     """
-    parser = argparse.ArgumentParser()
-    subparsers = parser.add_subparsers(title="command", help='Command list:', dest='command')
-    subparser = {}
-    for command in flows.get_commands():
-        subparser[command["name"]] = subparsers.add_parser(command["name"],
-                                                           help="{} ({})".format(command["help"], command["flow"]))
-        if command["params"] is not None:
-            for param in command["params"]:
-                subparser[command["name"]].add_argument('--'+param['name'], default=param['default'], help=param['help'])
-        if command["flags"] is not None:
-            for flag in command["flags"]:
-                subparser[command["name"]].add_argument('-'+flag['name'], nargs="?", default=False, const=True, help=flag['help'])
-
-    args = parser.parse_args()
+    registry = flows.get_registry()
+
+    with profiler.phase("argparse"):
+        parser = argparse.ArgumentParser(prog="odin.py")
+        parser.add_argument("--profile-startup", action="store_true",
+                            help="Print wall and CPU time of startup phases (to stderr)")
+        parser.add_argument("--profile-json", metavar="PATH", help="Write startup phases to a JSON file")
+        parser.add_argument("--profile-imports", action="store_true",
+                            help="Print import time of core and flows modules (runs odin.py under -X importtime)")
+        subparsers = parser.add_subparsers(title="command", help='Command list:', dest='command')
+        command_name = get_command_name(argv)
+        if command_name in registry:
+            # Only the selected command's subparser is needed
+            add_command_parser(subparsers, registry.get_command(command_name))
+        else:
+            # Full tree for "-h", no command or a wrong command
+            for command in registry.get_commands():
+                add_command_parser(subparsers, command)
+
+        args = parser.parse_args(argv)
+
+    if args.profile_imports:
+        return run_with_import_profile([arg for arg in argv if arg != "--profile-imports"])
 
     if args.command is None:
         parser.print_help()
         log.bypass("\nUse \"odin.py command -h\" for more information about commands.", flush=True)
-        exit(0)
+        return 0
 
-    log.set_silent_mode(flows.get_silent_of_command(args.command))
+    try:
+        log.set_silent_mode(registry.get_silent_of_command(args.command))
 
-    print_logo(log)
+        with profiler.phase("print_logo"):
+            print_logo(log)
 
-    if not flows.get_no_project_of_command(args.command):
-        global_variables["PROJECT_FILE_PATH"] = get_project_file_path()
+        if not registry.get_no_project_of_command(args.command):
+            with profiler.phase("get_project_file_path"):
+                global_variables["PROJECT_FILE_PATH"] = get_project_file_path()
+            project, release_data = load_project(global_variables, cache)
+        else:
+            project = None
+            release_data = None
 
-        """Project
+        """Core
         """
-        project = Project(global_variables["PROJECT_FILE_PATH"], global_variables)
-        project.resolve_vars()
+        core_data = Core()
+        core_data.set(project=project, release=release_data, flows=flows, args=args, glob_vars=global_variables,
+                      tools=None if cache is None else cache.get_tools())
 
-        """Releases
-        """
-        release = Release(global_variables["PROJECT_FILE_PATH"], project.get_project_file_type(), release)
-    else:
-        project = None
-        release = None
+        try:
+            with profiler.phase("import command \"{}\"".format(args.command)):
+                command = registry.get_module(args.command)
+        except Exception as e:
+            log.fatal("Can't load command \"{}\". Exception: {}".format(args.command, e))
+        try:
+            run_command = command.run
+        except AttributeError:
+            log.fatal("Bad command \"{}\"!".format(args.command))
+        else:
+            log.bypass(" Run command \"{}\" ".format(args.command).center(80, "-"))
+            with profiler.phase("run command \"{}\"".format(args.command)):
+                result = run_command(core_data)
+            log.bypass(" End ".center(80, "-"))
+            return result
+    finally:
+        report_profile(args)
 
-    """Core
-    """
-    core_data = Core()
-    core_data.set(project=project, release=release, flows=flows, args=args, glob_vars=global_variables)
 
-    command = getattr(modules["flows." + flows.get_flow_of_command(args.command) + ".commands"], args.command)
-    try:
-        run_command = command.run
-    except AttributeError:
-        log.fatal("Bad command \"{}\"!".format(args.command))
-    else:
-        log.bypass(" Run command \"{}\" ".format(args.command).center(80, "-"))
-        result = run_command(core_data)
-        log.bypass(" End ".center(80, "-"))
-        exit(result)
+"""Main
+"""
+if __name__ == "__main__":
+    logging.basicConfig(
+        # level=logging.INFO,
+        level=logging.DEBUG,
+        format="%(asctime)s - [%(levelname)s] - %(name)s - (%(filename)s).%(funcName)s(%(lineno)d) - %(message)s",
+    )
+    logger = logging.getLogger("odin.py")
+
+    exit(main(sys.argv[1:]))
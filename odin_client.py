@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""Thin client for "odin.py serve"
+
+Forwards argv, cwd and environment to the server and exits with the command's exit code. Output goes directly to
+this process' stdout/stderr. If there is no server, odin.py is started as usual.
+
+Usage: alias odin.py="python3 <odin>/odin_client.py"
+"""
+
+import hashlib
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+
+ODIN_PATH = os.path.dirname(os.path.abspath(__file__))
+
+
+def get_socket_path() -> str:
+    """Must match flows.get_server_socket_path()"""
+    cache_dir_path = os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    installation_id = hashlib.md5(os.path.join(ODIN_PATH, "flows").encode()).hexdigest()[:12]
+    return os.getenv("ODIN_SOCKET", os.path.join(cache_dir_path, "odin", "server_{}.sock".format(installation_id)))
+
+
+def recv_int(conn) -> int:
+    data = b""
+    while len(data) < 4:
+        chunk = conn.recv(4 - len(data))
+        if not chunk:
+            raise ConnectionError("Server closed connection")
+        data += chunk
+    return struct.unpack("!i", data)[0]
+
+
+def run_local(argv):
+    odin_file_path = os.path.join(ODIN_PATH, "odin.py")
+    os.execv(sys.executable, [sys.executable, odin_file_path] + argv)
+
+
+def main(argv) -> int:
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(get_socket_path())
+    except OSError:
+        run_local(argv)
+
+    request = json.dumps({"argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)}).encode()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    socket.send_fds(conn, [struct.pack("!I", len(request))], [0, 1, 2])
+    conn.sendall(request)
+
+    pid = recv_int(conn)
+    for signum in [signal.SIGINT, signal.SIGTERM, signal.SIGHUP]:
+        signal.signal(signum, lambda received_signum, frame: os.kill(pid, received_signum))
+    while True:
+        try:
+            return recv_int(conn)
+        except InterruptedError:
+            continue
+        except ConnectionError:
+            return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
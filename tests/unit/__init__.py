@@ -1,3 +1,16 @@
 import test_project
 import test_vcs_git
 import test_tools
+import test_flows
+import test_server
+import test_profiler
+import test_snapshot
+import test_resolver
+import test_xml_loader
+import test_filelist
+import test_config_io
+import test_environment
+import test_release
+import test_release_executor
+import test_tool_check
+import test_process
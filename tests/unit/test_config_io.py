@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import yaml
+
+from core import config_io
+from core.config_io import dump_yaml, load_yaml
+from core.scoreboard import Scoreboard
+
+
+class TestConfigIo(unittest.TestCase):
+    def test_000_cache(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_path:
+            path = os.path.join(tmp_dir_path, "config.yaml")
+            with open(path, "w") as yaml_file:
+                yaml_file.write("tools:\n  - name: a\n")
+            data = load_yaml(path)
+            self.assertEqual(data, {"tools": [{"name": "a"}]})
+            data["tools"].append("changed by caller")
+            self.assertEqual(load_yaml(path), {"tools": [{"name": "a"}]})
+            self.assertIn((path, False), config_io._cache)
+
+            with open(path, "w") as yaml_file:
+                yaml_file.write("tools:\n  - name: bb\n")
+            self.assertEqual(load_yaml(path), {"tools": [{"name": "bb"}]})
+
+    def test_010_dump(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_path:
+            path = os.path.join(tmp_dir_path, "scoreboard.yaml")
+            data = {"sim_tests": {"test_0": {"name": "test_0", "result": "Passed"}}}
+            dump_yaml(data, path)
+            self.assertEqual(load_yaml(path), data)
+            config_io.clear_cache()
+            self.assertEqual(load_yaml(path, use_cache=False), data)
+            self.assertNotIn((path, False), config_io._cache)
+
+    def test_020_old_scoreboard(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_path:
+            path = os.path.join(tmp_dir_path, "scoreboard.yaml")
+            with open(path, "w") as yaml_file:
+                yaml.dump({"builds": {"fpga": {"size": (1, 2)}}}, yaml_file)  # Written by the old Scoreboard
+            with self.assertRaises(yaml.constructor.ConstructorError):
+                load_yaml(path)
+
+            core = SimpleNamespace(project=SimpleNamespace(is_var=lambda name: False),
+                                   glob_vars={"ODIN_WORKDIR_PATH": tmp_dir_path})
+            scoreboard = Scoreboard(core)
+            self.assertEqual(scoreboard.get_file_path(), path)
+            data = scoreboard._read_scoreboard()
+            self.assertEqual(data, {"builds": {"fpga": {"size": (1, 2)}}})
+
+            data["builds"]["asic"] = {"size": (3, 4)}
+            scoreboard._write_scoreboard(data)
+            config_io.clear_cache()
+            self.assertEqual(scoreboard._read_scoreboard()["builds"]["asic"]["size"], (3, 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
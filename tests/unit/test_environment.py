@@ -0,0 +1,74 @@
+import os
+import time
+import unittest
+
+from core.environment import EnvironmentBuilder, compose_path_list
+from core.tools import Tool
+
+
+class TestEnvironment(unittest.TestCase):
+    def test_000_compose_path_list(self):
+        self.assertEqual(compose_path_list("/a:/b", "", "/b:/c::/a"), "/a:/b:/c")
+
+    def test_010_build(self):
+        builder = EnvironmentBuilder()
+        base_env = {"PATH": "/usr/bin:/bin", "HOME": "/home/a"}
+        sim = Tool("sim", "xrun", "xrun", bin_path="/cad/xrun/bin", lib="/cad/xrun/lib", license="1@lic",
+                   env={"XRUN_HOME": "/cad/xrun"})
+        lsf = Tool("lsf", "LSF", "bsub", bin_path="/lsf/bin", path="/usr/bin")
+
+        env = builder.build([sim, lsf], base_env=base_env)
+        self.assertEqual(env["PATH"], "/usr/bin:/lsf/bin:/cad/xrun/bin:/bin")
+        self.assertEqual(env["LD_LIBRARY_PATH"], "/cad/xrun/lib")
+        self.assertEqual(env["LM_LICENSE_FILE"], "1@lic")
+        self.assertEqual(env["XRUN_HOME"], "/cad/xrun")
+        self.assertEqual(env["HOME"], "/home/a")
+        self.assertEqual(base_env, {"PATH": "/usr/bin:/bin", "HOME": "/home/a"})
+        with self.assertRaises(TypeError):
+            env["PATH"] = "/"
+
+        self.assertIs(builder.build([sim, lsf], base_env=base_env), env)
+        self.assertIsNot(builder.build([sim], base_env=base_env), env)
+        # No growth when the environment of one build is used as the base of the next one
+        self.assertEqual(builder.build([sim, lsf], base_env=env.to_dict())["PATH"], env["PATH"])
+        base_env["PATH"] = "/sbin"
+        self.assertEqual(builder.build([lsf], base_env=base_env)["PATH"], "/usr/bin:/lsf/bin:/sbin")
+
+    def test_015_cache_hit(self):
+        builder = EnvironmentBuilder()
+        base_env = {"ODIN_VAR_{}".format(index): "value_{}".format(index) for index in range(20000)}
+        tools = [Tool("sim", "tool_{}".format(index), "tool", bin_path="/cad/{}/bin".format(index),
+                      lib="/cad/{}/lib".format(index), env={"TOOL_{}_HOME".format(index): "/cad"})
+                 for index in range(20)]
+        environment = builder.build(tools, base_env=base_env)
+
+        def measure(build, rounds=3, count=100):
+            timings = []
+            for _ in range(rounds):
+                timer = time.perf_counter()
+                for _ in range(count):
+                    build()
+                timings.append(time.perf_counter() - timer)
+            return min(timings)
+
+        def rebuild():
+            builder.clear_cache()
+            return builder.build(tools, base_env=base_env)
+
+        hit_time = measure(lambda: builder.build(tools, base_env=base_env))
+        self.assertIs(builder.build(tools, base_env=base_env), builder.build(tools, base_env=base_env))
+        self.assertLess(hit_time, measure(rebuild))
+        self.assertEqual(rebuild().to_dict(), environment.to_dict())
+
+    def test_020_tool(self):
+        tool = Tool("test", "echo", "echo", bin_path="/odin/test/bin", env={"ODIN_TEST_VAR": "1"})
+        path = os.environ.get("PATH")
+        self.assertEqual(tool.get_env()["PATH"].split(os.pathsep)[0], "/odin/test/bin")
+        self.assertEqual(os.environ.get("PATH"), path)
+        self.assertNotIn("ODIN_TEST_VAR", os.environ)
+        run_line, exit_code, stdout, stderr = tool.run("$ODIN_TEST_VAR", stdout_capture=True)
+        self.assertEqual((exit_code, stdout), (0, "1\n"))
+
+
+if __name__ == '__main__':
+    unittest.main()
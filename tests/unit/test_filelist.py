@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+
+from core.filelist import FilelistExpander, StatCache
+from core.project import Project
+
+
+class TestFilelist(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+        for path in ["rtl/a.sv", "rtl/b.sv", "rtl/sub/c.sv", "ip/ip.sv", "ip/ip_pkg.sv"]:
+            os.makedirs(os.path.join(self.root, os.path.dirname(path)), exist_ok=True)
+            open(os.path.join(self.root, path), "w").close()
+        with open(os.path.join(self.root, "ip", "ip.f"), "w") as filelist_file:
+            filelist_file.write("// IP filelist\nip_pkg.sv\nip.sv\n+incdir+$RTL\n-F ip.f\n")
+        with open(os.path.join(self.root, "project.yaml"), "w") as project_file:
+            project_file.write("project:\n"
+                               "  name: test\n"
+                               "  variables:\n"
+                               "    RTL: rtl\n"
+                               "  modules:\n"
+                               "    - name: top\n"
+                               "      filelists:\n"
+                               "        rtl:\n"
+                               "          - $RTL/b.sv\n"
+                               "          - $RTL/**/*.sv\n"
+                               "          - -F ip/ip.f\n"
+                               "          - $RTL/missing.sv\n"
+                               "          - $RTL/*.vhd\n")
+        self.project = Project(os.path.join(self.root, "project.yaml"), {})
+        self.project.resolve_vars()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_000_expand(self):
+        expander = FilelistExpander(self.project, cache=StatCache())
+        result = expander.expand_module_filelist("top", "rtl")
+        root = self.root
+        self.assertEqual([os.path.relpath(path, root) for path in result.files],
+                         ["rtl/b.sv", "rtl/a.sv", "rtl/sub/c.sv", "ip/ip_pkg.sv", "ip/ip.sv"])
+        self.assertEqual(len(result.mtimes), 5)
+        self.assertEqual([os.path.basename(path) for path in result.missing], ["*.vhd", "missing.sv"])
+        self.assertFalse(result.is_ok())
+        self.assertEqual(result.options, ("+incdir+rtl",))
+        self.assertEqual(result.includes, (os.path.join(root, "ip", "ip.f"),))
+        self.assertEqual(result.get_newer_than(result.get_latest_mtime()), [])
+        self.assertIs(expander.expand_module_filelist("top", "rtl"), result)
+
+    def test_010_stat_cache(self):
+        cache = StatCache()
+        path = os.path.join(self.root, "rtl", "a.sv")
+        self.assertEqual([stat is None for stat in cache.stat_many([path, path + ".no"])], [False, True])
+        os.remove(path)
+        self.assertIsNotNone(cache.stat(path))
+        cache.invalidate([path])
+        self.assertIsNone(cache.stat(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
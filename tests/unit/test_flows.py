@@ -0,0 +1,128 @@
+import ast
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import flows
+from core.completion import generate_bash, generate_zsh
+from core.registry import CommandRegistry
+from core.release_executor import DEFAULT_MAX_WORKERS
+
+
+STARTUP_SCRIPT = "import sys, flows; flows.get_commands(); print(' '.join(sorted(sys.modules)))"
+
+
+def get_startup_modules(cache_dir_path) -> list:
+    """Modules which are loaded by "import flows" in a new interpreter (with the manifest in cache_dir_path)"""
+    root_dir_path = os.path.dirname(os.path.dirname(os.path.abspath(flows.__file__)))
+    env = dict(os.environ, XDG_CACHE_HOME=cache_dir_path, PYTHONPATH=root_dir_path)
+    return subprocess.check_output([sys.executable, "-c", STARTUP_SCRIPT], cwd=root_dir_path, env=env,
+                                   universal_newlines=True).split()
+
+
+class TestFlows(unittest.TestCase):
+    def test_000_commands_are_not_imported(self):
+        commands = flows.get_commands()
+        self.assertIn("report", [command["name"] for command in commands])
+        self.assertNotIn("flows.common.commands.report", sys.modules)
+
+    def test_005_startup_modules(self):
+        with tempfile.TemporaryDirectory() as cache_dir_path:
+            for _ in range(2):  # Cold (manifest is built) and warm start
+                modules = get_startup_modules(cache_dir_path)
+                self.assertIn("core.tools", modules)
+                for name in ["asyncio", "core.process", "core.release_executor", "core.scoreboard",
+                             "flows.common.commands.update"]:
+                    self.assertNotIn(name, modules)
+
+    def test_007_literal_commands(self):
+        # Every shipped _command is a literal, so the manifest is built without importing commands
+        command_file_paths = glob.glob(os.path.join(flows.basedir, "*", "commands", "*.py"))
+        self.assertTrue(command_file_paths)
+        for command_file_path in command_file_paths:
+            if os.path.basename(command_file_path) == "__init__.py":
+                continue
+            with open(command_file_path, encoding="UTF-8") as command_file:
+                tree = ast.parse(command_file.read(), command_file_path)
+            values = [node.value for node in tree.body if isinstance(node, ast.Assign) and
+                      any(isinstance(target, ast.Name) and target.id == "_command" for target in node.targets)]
+            self.assertEqual(len(values), 1, command_file_path)
+            with self.subTest(command_file_path=command_file_path):
+                self.assertIsInstance(ast.literal_eval(values[0]), dict)
+        jobs = [param for param in flows.get_params_of_command("update") if param["name"] == "jobs"][0]
+        self.assertEqual(jobs["default"], str(DEFAULT_MAX_WORKERS))
+
+    def test_008_unambiguous_arguments(self):
+        # argparse accepts prefixes of long options, so "--json" would be taken for "--json_out"
+        command = flows.get_command("check_tools")
+        names = [item["name"] for item in command["params"] + command["flags"]]
+        for name in names:
+            self.assertEqual([other for other in names if other.startswith(name)], [name])
+
+    def test_010_get_command(self):
+        command = flows.get_command("completion")
+        self.assertEqual(command["flow"], "common")
+        self.assertTrue(command["silent"])
+        self.assertTrue(command["no_project"])
+        self.assertFalse(flows.get_command("info")["no_project"])
+        self.assertIsNone(flows.get_command("no_such_command"))
+
+    def test_020_get_command_module(self):
+        module = flows.get_command_module("info")
+        self.assertEqual(module.__name__, "flows.common.commands.info")
+        self.assertEqual(module._command["help"], flows.get_command("info")["help"])
+
+    def test_030_manifest(self):
+        with tempfile.TemporaryDirectory() as cache_dir_path, mock.patch.dict(os.environ, {"XDG_CACHE_HOME": cache_dir_path}):
+            self.assertIsNone(flows._load_manifest())
+            manifest = flows._build_manifest()
+            self.assertTrue(os.path.isfile(flows.get_manifest_file_path()))
+            self.assertEqual(flows._load_manifest(), json.loads(json.dumps(manifest)))
+
+            command_file_path = os.path.join(flows.basedir, "common", "commands", "info.py")
+            manifest["stamps"][command_file_path] -= 1
+            flows._save_manifest(manifest)
+            self.assertIsNone(flows._load_manifest())
+
+            manifest_files = os.listdir(os.path.dirname(flows.get_manifest_file_path()))
+            self.assertFalse(flows._save_manifest({"not serializable": object()}))
+            with mock.patch("flows.replace", side_effect=OSError("read-only")):
+                self.assertFalse(flows._save_manifest(manifest))
+            self.assertEqual(os.listdir(os.path.dirname(flows.get_manifest_file_path())), manifest_files)
+
+    def test_040_registry(self):
+        registry = CommandRegistry([{"flow": "a", "name": "x", "help": "", "params": None, "flags": None,
+                                     "silent": False, "no_project": True},
+                                    {"flow": "b", "name": "y", "help": "", "params": [], "flags": None,
+                                     "silent": True, "no_project": False}])
+        self.assertEqual(len(registry), 2)
+        self.assertIn("x", registry)
+        self.assertEqual(registry.get_flows(), ["a", "b"])
+        self.assertEqual([command["name"] for command in registry.get_commands("b")], ["y"])
+        self.assertEqual(registry.get_flow_of_command("y"), "b")
+        self.assertTrue(registry.get_no_project_of_command("x"))
+        self.assertTrue(registry.get_silent_of_command("y"))
+        registry.get_command("x")["flow"] = "changed"
+        registry.get_commands()[0]["name"] = "changed"
+        self.assertEqual([command["name"] for command in registry.get_commands("a")], ["x"])
+        self.assertEqual(registry.get_flow_of_command("x"), "a")
+        self.assertIsNone(registry.get_command("z"))
+        self.assertIs(flows.get_registry(), flows.get_registry())
+
+    def test_050_completion_scripts(self):
+        bash_script = generate_bash(flows.get_registry())
+        zsh_script = generate_zsh(flows.get_registry())
+        for command in flows.get_commands():
+            self.assertIn(command["name"], bash_script)
+            self.assertIn(command["name"], zsh_script)
+        self.assertIn('"--cmd --emit"', bash_script)
+        self.assertIn("'-v:Version of Odin'", zsh_script)
+
+
+if __name__ == '__main__':
+    unittest.main()
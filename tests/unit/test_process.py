@@ -0,0 +1,84 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+from core.process import NOT_FOUND_EXIT_CODE, ProcessRunner, run_process
+from core.tools import Tool
+
+PRINT_LINES = "import sys\nfor i in range(1000): print(i)\nsys.stderr.write('err')\nsys.exit(3)"
+
+
+class TestProcess(unittest.TestCase):
+    def test_000_capture(self):
+        result = run_process([sys.executable, "-c", PRINT_LINES], capture=True)
+        self.assertEqual(result.exit_code, 3)
+        self.assertFalse(result.is_ok())
+        self.assertEqual(result.stdout.splitlines()[-1], "999")
+        self.assertEqual(result.stderr, "err")
+        self.assertEqual((result.stdout_lines, result.stderr_lines), (1000, 1))
+
+    def test_010_streaming(self):
+        lines = []
+        with tempfile.TemporaryDirectory() as tmp_dir_path:
+            log_path = os.path.join(tmp_dir_path, "stdout.log")
+            result = run_process([sys.executable, "-c", PRINT_LINES], stdout_path=log_path, on_stderr=lines.append)
+            with open(log_path) as log_file:
+                self.assertEqual(len(log_file.readlines()), 1000)
+        self.assertIsNone(result.stdout)
+        self.assertEqual(result.stdout_lines, 1000)
+        self.assertEqual(lines, ["err"])
+
+    def test_020_timeout(self):
+        start = time.perf_counter()
+        result = run_process([sys.executable, "-c", "import time; print('started', flush=True); time.sleep(30)"],
+                             timeout=0.5, capture=True)
+        self.assertTrue(result.timed_out)
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertEqual(result.stdout, "started\n")
+        self.assertLess(time.perf_counter() - start, 10.0)
+
+    def test_030_not_found(self):
+        result = run_process(["odin_no_such_executable"], capture=True)
+        self.assertEqual(result.exit_code, NOT_FOUND_EXIT_CODE)
+        self.assertIsNotNone(result.error)
+
+    def test_040_runner(self):
+        runner = ProcessRunner(limit=4)
+        start = time.perf_counter()
+        results = runner.run_all_sync([([sys.executable, "-c", "import time; time.sleep(0.3); print({})".format(i)],
+                                        {"capture": True}) for i in range(8)])
+        self.assertEqual([result.stdout for result in results], ["{}\n".format(i) for i in range(8)])
+        self.assertLess(time.perf_counter() - start, 2.4)
+
+    def test_050_tool(self):
+        tool = Tool("common", "python", sys.executable)
+        self.assertEqual(tool.get_argv("-c 'print(1)'"), [sys.executable, "-c", "print(1)"])
+        self.assertEqual(Tool("common", "sim", "xrun", lsf_only=True).get_argv(["-f", "a.f"]),
+                         ["bsub", "-Is", "xrun", "-f", "a.f"])
+        self.assertEqual(tool.get_argv("$A ${B} $C", {"A": "a b", "B": "b"}), [sys.executable, "a b", "b", "$C"])
+        run_line, exit_code, stdout, stderr = tool.run("-c 'print(1)'", stdout_capture=True)
+        self.assertEqual((exit_code, stdout, stderr), (0, "1\n", ""))
+        self.assertTrue(run_line.endswith("-c 'print(1)'"))
+
+    def test_060_background(self):
+        tool = Tool("common", "python", sys.executable)
+        start = time.perf_counter()
+        self.assertEqual(tool.run("-c 'import time; time.sleep(0.5)'")[1], 0)
+        process = tool.start("-c 'import time; time.sleep(30)'")
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertIsNone(process.poll())
+        process.kill()
+        process.wait()
+        self.assertEqual(Tool("common", "missing", "odin_no_such_executable").run()[1], NOT_FOUND_EXIT_CODE)
+
+    def test_070_running_loop(self):
+        async def run_in_loop():
+            return Tool("common", "python", sys.executable).run("-c 'print(1)'", stdout_capture=True)[1:3]
+        self.assertEqual(asyncio.run(run_in_loop()), (0, "1\n"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+
+from core.profiler import StartupProfiler, parse_import_times
+
+
+class TestProfiler(unittest.TestCase):
+    def test_000_phases(self):
+        profiler = StartupProfiler()
+        with profiler.phase("a"):
+            pass
+        phases = profiler.get_phases()
+        self.assertEqual(len(phases), 1)
+        self.assertEqual(phases[0]["name"], "a")
+        self.assertGreaterEqual(phases[0]["wall"], 0)
+        profiler.reset()
+        self.assertEqual(profiler.get_phases(), [])
+
+    def test_010_parse_import_times(self):
+        lines = ["import time: self [us] | cumulative | imported package",
+                 "import time:       100 |        100 |     yaml.error",
+                 "import time:       200 |       1500 |   core.project",
+                 "import time:       300 |       3000 | flows"]
+        import_times = parse_import_times(lines)
+        self.assertEqual([item["module"] for item in import_times], ["flows", "core.project"])
+        self.assertEqual(import_times[1]["depth"], 1)
+        self.assertAlmostEqual(import_times[0]["cumulative"], 0.003)
+
+
+if __name__ == '__main__':
+    unittest.main()
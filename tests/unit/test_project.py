@@ -3,6 +3,7 @@ import unittest
 import shutil
 import time
 import subprocess
+import tempfile
 
 from core.project import Project
 
@@ -45,3 +46,76 @@ class TestProject(unittest.TestCase):
 
         with self.assertRaises(IOError):
             project = Project("../../flows/common/projects/sample_yaml/project.abc", [])
+
+    def test_030_module_lookup(self):
+        print(" test_030_module_lookup() ".center(80, "-"))
+
+        with tempfile.TemporaryDirectory() as tmp_dir_path:
+            project_file_path = os.path.join(tmp_dir_path, "project.yaml")
+            with open(project_file_path, "w") as project_file:
+                project_file.write("project:\n"
+                                   "  name: test\n"
+                                   "  modules:\n"
+                                   "    - name: core\n"
+                                   "      type: rtl\n"
+                                   "      filelists:\n"
+                                   "        rtl: [a.sv, b.sv]\n"
+                                   "      steps:\n"
+                                   "        - name: compile\n"
+                                   "    - name: periph\n"
+                                   "      type: rtl\n"
+                                   "      vars:\n"
+                                   "        TOP: periph_top\n")
+            project = Project(project_file_path, {})
+
+            self.assertEqual(project.get_module("periph")["type"], "rtl")
+            self.assertIsNone(project.get_module("unknown"))
+            self.assertEqual(project.get_module_data("rtl")["name"], "core")
+            self.assertEqual([module["name"] for module in project.get_modules_of_type("rtl")], ["core", "periph"])
+            self.assertEqual(project.get_module_vars_dict("rtl"), {"TOP": "periph_top"})
+            self.assertEqual(project.get_filelist("core", "rtl"), ["a.sv", "b.sv"])
+            self.assertIsNone(project.get_filelist("periph", "rtl"))
+            self.assertEqual(project.get_step("core", "compile"), {"name": "compile"})
+
+    def test_040_include_fragments(self):
+        print(" test_040_include_fragments() ".center(80, "-"))
+
+        with tempfile.TemporaryDirectory() as tmp_dir_path:
+            os.makedirs(os.path.join(tmp_dir_path, "modules"))
+            for name in ["cpu", "dma"]:
+                with open(os.path.join(tmp_dir_path, "modules", name + ".yaml"), "w") as fragment_file:
+                    fragment_file.write("type: rtl\n"
+                                        "filelists:\n"
+                                        "  rtl: [$ROOT/{}.sv]\n".format(name))
+            project_file_path = os.path.join(tmp_dir_path, "project.yaml")
+            with open(project_file_path, "w") as project_file:
+                project_file.write("project:\n"
+                                   "  name: test\n"
+                                   "  variables:\n"
+                                   "    ROOT: /soc\n"
+                                   "  modules:\n"
+                                   "    - name: top\n"
+                                   "      type: top\n"
+                                   "  include:\n"
+                                   "    - modules/cpu.yaml\n"
+                                   "    - modules/d*.yaml\n")
+            project = Project(project_file_path, {})
+            project.resolve_vars()
+
+            self.assertEqual(project.get_var("ROOT"), "/soc")
+            self.assertEqual(project.get_module_names(), ["top", "cpu", "dma"])
+            self.assertEqual(project.get_fragment_stats()["deferred"], 2)
+            self.assertEqual(project.get_filelist("cpu", "rtl"), ["$ROOT/cpu.sv"])
+            stats = project.get_fragment_stats()
+            self.assertEqual((stats["loaded"], stats["deferred"]), (1, 1))
+            self.assertEqual(len(project.get_source_file_paths()), 3)
+            self.assertEqual([module["name"] for module in project.get_modules_of_type("rtl")], ["cpu", "dma"])
+            self.assertEqual(project.get_fragment_stats()["deferred"], 0)
+
+            self.assertTrue(project.is_includes_unchanged())
+            with open(os.path.join(tmp_dir_path, "modules", "dsp.yaml"), "w") as fragment_file:
+                fragment_file.write("- type: rtl\n")
+            self.assertFalse(project.is_includes_unchanged())
+            project = Project(project_file_path, {})
+            with self.assertLogs("core.project", level="ERROR"):
+                self.assertEqual([module["name"] for module in project.get_modules_of_type("rtl")], ["cpu", "dma"])
@@ -0,0 +1,166 @@
+import contextlib
+import io
+import os
+import pickle
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import flows
+
+from core.release import DependencyGraph, Release, RepoSos, make_dependence
+from core.release_index import ReleaseIndex, get_version_key
+
+RELEASE_YAML = """release:
+  version: "1.0"
+  dependencies:
+    hardware:
+      - name: core
+        vcs: sos
+        tag: CORE_1
+        local_path: /wa/core
+      - name: periph
+        vcs: sos
+        tag: PERIPH_1
+        local_path: /wa/periph
+        requires: [core]
+    software:
+      - name: fw
+        vcs: git
+        branch: master
+        requires: [periph, libs]
+    shared:
+      - name: storage
+        type: smb
+"""
+
+
+def write_release(dir_path, text, name="release.yaml") -> str:
+    """Writes project.yaml and releases/<name>, returns path of the project file"""
+    os.makedirs(os.path.join(dir_path, "releases"), exist_ok=True)
+    project_file_path = os.path.join(dir_path, "project.yaml")
+    with open(project_file_path, "w") as project_file:
+        project_file.write("project:\n  name: test\n")
+    with open(os.path.join(dir_path, "releases", name), "w") as release_file:
+        release_file.write(text)
+    return project_file_path
+
+
+class TestRelease(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.project_file_path = write_release(self.tmp_dir.name, RELEASE_YAML)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_000_graph(self):
+        release = Release(self.project_file_path, "yaml")
+        graph = release.get_dependencies()
+
+        self.assertEqual(release._version, "1.0")
+        self.assertEqual(graph.get_names(), ["core", "periph", "fw", "storage"])
+        self.assertEqual(graph.get_groups(), ["hardware", "software", "shared"])
+        self.assertEqual([dep.get_name() for dep in graph.get_group("hardware")], ["core", "periph"])
+        self.assertEqual(graph.get_vcs_types(), ["sos", "git", None])
+        self.assertIsInstance(release.get_dependence("core"), RepoSos)
+        self.assertEqual(release.get_dependence("fw").branch, "master")
+
+        self.assertEqual(graph.get_dependents("core"), ["periph"])
+        self.assertEqual(graph.get_dependents("core", recursive=True), ["periph", "fw"])
+        self.assertEqual(graph.get_dependencies("fw", recursive=True), ["periph", "core", "libs"])
+        self.assertEqual(graph.get_missing(), {"libs": ["fw"]})
+
+    def test_010_sos(self):
+        release = Release(self.project_file_path, "yaml")
+
+        self.assertEqual(release.get_repo_sos("periph").get_tag(), "PERIPH_1")
+        self.assertIsNone(release.get_repo_sos("fw"))
+        self.assertEqual([repo.get_name() for repo in release.get_all_repo_sos()], ["core", "periph"])
+        self.assertEqual(release.get_all_sos_paths(), ["/wa/core", "/wa/periph"])
+
+        restored = pickle.loads(pickle.dumps(release, protocol=pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(restored.get_repo_sos("core").local_path, "/wa/core")
+
+    def test_020_large_graph(self):
+        graph = DependencyGraph()
+        for index in range(20000):
+            graph.add(make_dependence("hardware", {"name": "repo_{}".format(index), "vcs": "sos",
+                                                   "requires": ["repo_{}".format(index - 1)] if index else []}))
+        self.assertEqual(len(graph), 20000)
+        self.assertEqual(graph.get("repo_19999").get_tag(), None)
+        self.assertEqual(len(graph.get_dependents("repo_0", recursive=True)), 19999)
+
+        graph.add(make_dependence("software", {"name": "repo_5", "vcs": "git"}))
+        self.assertEqual(len(graph), 20000)
+        self.assertEqual(len(graph.get_by_vcs("sos")), 19999)
+        self.assertEqual(graph.get_dependents("repo_4"), [])
+
+    def test_030_diff(self):
+        write_release(self.tmp_dir.name, RELEASE_YAML.replace("tag: CORE_1", "tag: CORE_2")
+                      .replace("/wa/periph", "/wa2/periph").replace("      - name: storage\n        type: smb\n", "")
+                      + "    scripts:\n      - name: ci\n        vcs: git\n", name="release_2.0.yaml")
+        old = Release(self.project_file_path, "yaml")
+        self.assertTrue(old.has_release("2.0"))
+        self.assertFalse(old.has_release("3.0"))
+        new = old.load_release("2.0")
+        diff = old.diff(new)
+
+        self.assertEqual((diff.old_version, diff.new_version), ("HEAD", "2.0"))
+        self.assertEqual([dep.name for dep in diff.added], ["ci"])
+        self.assertEqual([dep.name for dep in diff.removed], ["storage"])
+        self.assertEqual([(old_dep.tag, new_dep.tag) for old_dep, new_dep in diff.retagged], [("CORE_1", "CORE_2")])
+        self.assertEqual([new_dep.local_path for _, new_dep in diff.moved], ["/wa2/periph"])
+        self.assertEqual(diff.changed, [])
+        self.assertEqual(diff.get_changed_names(), ["ci", "core", "periph"])
+        self.assertEqual([dep.name for dep in diff.get_changed("sos")], ["core", "periph"])
+        self.assertTrue(old.diff(old).is_empty())
+        self.assertEqual(new.diff(old).get_changed_names(), ["storage", "core", "periph"])
+
+
+    def test_040_index(self):
+        for version, core_tag in [("1.10", "CORE_3 STABLE"), ("1.2", "CORE_2 STABLE"), ("1.9", "CORE_2")]:
+            write_release(self.tmp_dir.name, RELEASE_YAML.replace("CORE_1", core_tag),
+                          name="release_{}.yaml".format(version))
+        index = ReleaseIndex(self.project_file_path, "yaml")
+
+        self.assertEqual(index.get_versions(), ["1.2", "1.9", "1.10", "HEAD"])
+        self.assertEqual(sorted(["1.10", "HEAD", "1.2.1", "1.2"], key=get_version_key),
+                         ["1.2", "1.2.1", "1.10", "HEAD"])
+        self.assertEqual(index.get_repo_tags("core"), {"1.2": "CORE_2 STABLE", "1.9": "CORE_2",
+                                                       "1.10": "CORE_3 STABLE", "HEAD": "CORE_1"})
+        self.assertEqual(index.get_repo_tag("periph", "1.9"), "PERIPH_1")
+        self.assertEqual(index.get_tag_versions("STABLE"), {"1.2": ["core"], "1.10": ["core"]})
+        self.assertEqual(index.get_repo_tag_versions("core", "CORE_2"), ["1.2", "1.9"])
+        self.assertEqual(index.get_repo_tag_versions("periph", "CORE_2"), [])
+        self.assertEqual([(diff.old_version, diff.new_version) for diff in index.get_history(2)],
+                         [("1.9", "1.10"), ("1.10", "HEAD")])
+        self.assertEqual(index.diff("1.2", "1.9").get_changed_names(), ["core"])
+
+        self.assertEqual(index.refresh(), [])
+        os.remove(os.path.join(self.tmp_dir.name, "releases", "release_1.9.yaml"))
+        write_release(self.tmp_dir.name, RELEASE_YAML.replace("CORE_1", "CORE_4"), name="release_2.0.yaml")
+        self.assertEqual(sorted(index.refresh()), ["1.9", "2.0"])
+        self.assertEqual(index.get_repo_tag_versions("core", "CORE_2"), ["1.2"])
+        self.assertEqual(index.get_tag_versions("CORE_4"), {"2.0": ["core"]})
+
+        write_release(self.tmp_dir.name, RELEASE_YAML.replace("CORE_1", "5"), name="release_2.1.yaml")
+        with mock.patch("core.release_index.os.stat", side_effect=FileNotFoundError):
+            self.assertEqual(sorted(index.refresh()), ["1.10", "1.2", "2.0", "HEAD"])
+        self.assertEqual(index.get_versions(), [])
+        self.assertEqual(sorted(index.refresh()), ["1.10", "1.2", "2.0", "2.1", "HEAD"])
+        self.assertEqual(index.get_tag_versions("5"), {"2.1": ["core"]})
+        self.assertEqual(index.get_repo_tag("core", "2.1"), 5)
+
+    def test_050_deps_history_argument(self):
+        release = Release(self.project_file_path, "yaml")
+        for history, exit_code in [("x", 1), ("0", 1), ("-1", 1), ("2", 0)]:
+            core = SimpleNamespace(release=release, args=SimpleNamespace(diff="None", repo="None", tag="None",
+                                                                          history=history))
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(flows.get_command_module("deps").run(core), exit_code)
+
+
+if __name__ == '__main__':
+    unittest.main()
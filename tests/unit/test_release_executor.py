@@ -0,0 +1,113 @@
+import contextlib
+import io
+import sys
+import threading
+import time
+import unittest
+
+from core.release import DependencyGraph, make_dependence
+from core.release_executor import DependencyExecutor, FAIL_FAST, FAILED, PASSED, SKIPPED
+
+
+def make_graph(entries) -> DependencyGraph:
+    """entries: [(group, name, requires)]"""
+    graph = DependencyGraph()
+    for group, name, requires in entries:
+        graph.add(make_dependence(group, {"name": name, "vcs": "sos", "requires": requires}))
+    return graph
+
+
+class Recorder(object):
+    """Operation which records the order of finished dependencies and fails for the selected names"""
+
+    def __init__(self, failing=(), delay=0.0) -> None:
+        self.failing = failing
+        self.delay = delay
+        self.finished = []
+        self.lock = threading.Lock()
+
+    def __call__(self, dep, out):
+        time.sleep(self.delay)
+        if dep.name in self.failing:
+            raise RuntimeError("failed " + dep.name)
+        with self.lock:
+            self.finished.append(dep.name)
+        return dep.name.upper()
+
+
+class TestReleaseExecutor(unittest.TestCase):
+    def test_000_parallel(self):
+        graph = make_graph([("hardware", "repo_{}".format(index), []) for index in range(16)])
+        report = DependencyExecutor(graph, max_workers=8).run(Recorder(delay=0.1))
+
+        self.assertTrue(report.is_ok())
+        self.assertEqual(len(report.results), 16)
+        self.assertEqual(report["repo_3"].value, "REPO_3")
+        self.assertGreaterEqual(report["repo_3"].duration, 0.1)
+        self.assertLess(report.duration, 1.0)
+
+    def test_010_order(self):
+        graph = make_graph([("hardware", "a", ["b"]), ("hardware", "b", ["c"]), ("hardware", "c", []),
+                            ("software", "fw", ["a"])])
+        operation = Recorder()
+        report = DependencyExecutor(graph).run(operation)
+
+        self.assertTrue(report.is_ok())
+        self.assertEqual(operation.finished, ["c", "b", "a", "fw"])
+
+    def test_015_output(self):
+        def operation(dep, out):
+            self.assertIs(sys.stdout, stdout)  # Outputs of operations don't go through the global stream
+            print("start " + dep.name, file=out)
+            time.sleep(0.05)
+            print("end " + dep.name, file=out)
+
+        graph = make_graph([("hardware", "repo_{}".format(index), []) for index in range(8)])
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            report = DependencyExecutor(graph, max_workers=8).run(operation)
+        lines = stdout.getvalue().splitlines()
+
+        self.assertTrue(report.is_ok())
+        self.assertEqual(len(lines), 16)
+        for start, end in zip(lines[::2], lines[1::2]):
+            self.assertEqual(start.replace("start", "end"), end)
+        self.assertEqual(report["repo_0"].output, "start repo_0\nend repo_0\n")
+
+        out = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            DependencyExecutor(make_graph([("hardware", "a", [])]), out=out).run(operation)
+        self.assertEqual(out.getvalue(), "start a\nend a\n")
+
+    def test_020_policies(self):
+        entries = [("hardware", "a", []), ("hardware", "b", ["a"]), ("hardware", "c", ["b"]), ("software", "d", [])]
+        graph = make_graph(entries)
+
+        report = DependencyExecutor(graph, max_workers=1).run(Recorder(failing=["a"]))
+        self.assertEqual(report.get_failed(), ["a"])
+        self.assertEqual(sorted(report.get_skipped()), ["b", "c"])
+        self.assertEqual(report["d"].status, PASSED)
+        self.assertIn("'a'", report["b"].error)
+
+        report = DependencyExecutor(graph, max_workers=1, policy=FAIL_FAST).run(Recorder(failing=["a"]))
+        self.assertEqual(report["a"].status, FAILED)
+        self.assertEqual(report["d"].status, SKIPPED)
+        self.assertFalse(report.is_ok())
+
+        with self.assertRaises(ValueError):
+            DependencyExecutor(graph, policy="unknown")
+
+    def test_030_cycle_and_subset(self):
+        graph = make_graph([("hardware", "a", ["b"]), ("hardware", "b", ["a"]), ("hardware", "c", ["a"]),
+                            ("hardware", "d", ["e"]), ("hardware", "e", [])])
+        report = DependencyExecutor(graph).run(Recorder())
+        self.assertEqual(sorted(report.get_skipped()), ["a", "b", "c"])
+        self.assertEqual(report["a"].error, "dependency cycle")
+        self.assertEqual(report["d"].status, PASSED)
+
+        report = DependencyExecutor(graph).run(Recorder(), [graph.get("d")])
+        self.assertEqual(list(report.results), ["d"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,208 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from core.project import Project
+from core.release import Release
+from core.resolver import Substitution, Template, TemplateKeysError, VariableResolutionError, VariableResolver, parse
+from core.tools import Tool, Tools
+
+
+class TestResolver(unittest.TestCase):
+    def test_000_parse(self):
+        self.assertEqual(parse("a $B c"), ("a ", "B", " c"))
+        self.assertEqual(parse("$$POSTPONED $A"), ("$$POSTPONED ", "A", ""))
+        self.assertEqual(parse("no refs"), ("no refs",))
+        self.assertEqual(parse("a_${B}_c $$D"), ("a_", "B", "_c $$D"))
+
+    def test_010_resolve_all(self):
+        variables = {"TOP": "$MID/top", "MID": "$ROOT/mid", "ROOT": "/root", "LIST": ["$ROOT", "$$LATER"],
+                     "FOO": "foo", "FOOBAR": "$FOO $FOOBAZ", "FOOBAZ": "baz", "NUM": 5, "N": "$NUM"}
+        resolved = VariableResolver(variables).resolve_all()
+        self.assertEqual(resolved["TOP"], "/root/mid/top")
+        self.assertEqual(resolved["LIST"], ["/root", "$$LATER"])
+        self.assertEqual(resolved["FOOBAR"], "foo baz")
+        self.assertEqual(resolved["N"], "5")
+        self.assertEqual(variables["TOP"], "$MID/top")
+
+    def test_020_lookup(self):
+        looked_up = []
+
+        def lookup(name):
+            looked_up.append(name)
+            return {"HOME": "/home/a"}.get(name)
+
+        resolver = VariableResolver({"A": "$HOME/a", "B": "$HOME/b"}, lookup)
+        self.assertEqual(resolver.resolve("B"), "/home/a/b")
+        self.assertEqual(looked_up, ["HOME"])
+        self.assertEqual(resolver.expand("$A:$B"), "/home/a/a:/home/a/b")
+        self.assertEqual(resolver.expand("$A", recursive=False), "$HOME/a")
+
+    def test_030_errors(self):
+        resolver = VariableResolver({"A": "$B", "B": "$C/$A", "C": "c", "D": "$UNDEFINED", "E": "$UNDEFINED"})
+        resolved = resolver.resolve_all()
+        self.assertEqual(resolved["C"], "c")
+        self.assertEqual(resolved["D"], "$UNDEFINED")
+        self.assertEqual(resolver.get_undefined(), {"UNDEFINED": ["D", "E"]})
+        self.assertEqual(len(resolver.get_cycles()), 1)
+        self.assertEqual(set(resolver.get_cycles()[0]), {"A", "B"})
+        with self.assertRaises(VariableResolutionError) as context:
+            resolver.check()
+        self.assertIn("$UNDEFINED", str(context.exception))
+        self.assertIn("cycles", str(context.exception))
+
+    def test_035_set_variable(self):
+        resolver = VariableResolver({"ROOT": "/a", "BUILD": "$ROOT/build", "LOG": "$BUILD/log", "OTHER": "x",
+                                     "LATER": "$NEW/later"})
+        resolver.resolve_all()
+        self.assertEqual(resolver.get_dependents("ROOT"), {"BUILD", "LOG"})
+        self.assertEqual(resolver.set_variable("ROOT", "/b"), {"ROOT": "/b", "BUILD": "/b/build", "LOG": "/b/build/log"})
+        self.assertEqual(resolver.resolve("OTHER"), "x")
+        # Variable which was undefined
+        self.assertEqual(resolver.set_variable("NEW", "n"), {"NEW": "n", "LATER": "n/later"})
+        # New references and cycles
+        self.assertEqual(resolver.set_variable("BUILD", "$OTHER/build"), {"BUILD": "x/build", "LOG": "x/build/log"})
+        self.assertEqual(resolver.get_dependents("ROOT"), set())
+        resolver.set_variable("OTHER", "$LOG")
+        self.assertEqual(len(resolver.get_cycles()), 1)
+        resolver.set_variable("OTHER", "y")
+        self.assertEqual(resolver.get_cycles(), [])
+        self.assertEqual(resolver.resolve("LOG"), "y/build/log")
+
+    def test_040_project(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_path, mock.patch.dict(os.environ, {"ODIN_TEST_ENV": "env"}):
+            project_file_path = os.path.join(tmp_dir_path, "project.yaml")
+            with open(project_file_path, "w") as project_file:
+                project_file.write("project:\n"
+                                   "  name: test\n"
+                                   "  variables:\n"
+                                   "    A: $B/a\n"
+                                   "    B: $ODIN_TEST_ENV/b\n"
+                                   "    C: $$LATER\n"
+                                   "  modules:\n"
+                                   "    - name: m\n"
+                                   "      type: t\n"
+                                   "      vars:\n"
+                                   "        M: $A/m\n")
+            project = Project(project_file_path, {})
+            project.resolve_vars()
+            self.assertEqual(project.get_var("A"), "env/b/a")
+            self.assertEqual(project.get_var("C"), "$$LATER")
+            self.assertEqual(project.get_consulted_env()["ODIN_TEST_ENV"], "env")
+            self.assertEqual(project.replace_vars("$A:$VIRTUAL", virtual_env={"VIRTUAL": "v"}), "env/b/a:v")
+            project.resolve_module_vars()
+            self.assertEqual(project.get_module_vars_dict("t")["M"], "env/b/a/m")
+            project.set_var("D", "$A/d")
+            self.assertEqual(project.replace_vars("$D"), "env/b/a/d")
+
+            changes = []
+            project.subscribe(changes.append)
+            project.update_var("B", "new")
+            self.assertEqual(changes, [{"B": "new", "A": "new/a", "D": "new/a/d"}])
+            self.assertEqual(project.get_var("A"), "new/a")
+            self.assertEqual(project.get_var_dependents("B"), {"A", "D"})
+            project.update_var("C", "$$LATER")
+            self.assertEqual(len(changes), 1)
+
+    def test_050_substitution(self):
+        substitution = Substitution({"FOO": "1", "FOOBAR": "2", "LIST": ["x"], "EMPTY": None})
+        self.assertEqual(substitution.substitute("$FOO/$FOOBAR/$FOOX/$LIST/$BAZ"), "1/2/$FOOX/$LIST/$BAZ")
+        self.assertEqual(substitution.substitute("$FOO/$FOOBAR/$FOOX/$LIST/$BAZ"), "1/2/$FOOX/$LIST/$BAZ")
+        self.assertEqual(substitution.get_cache_info().hits, 1)
+        self.assertIsNone(substitution.substitute(None))
+        self.assertEqual(Substitution({}).substitute("$FOO"), "$FOO")
+        self.assertEqual(Substitution({"FOO": "x"}).substitute("$FOOBAR and $FOO-$FOO_1 $FOO"), "$FOOBAR and x-$FOO_1 x")
+        self.assertEqual(Substitution({"FOO": "x"}).substitute("${FOO}BAR ${FOO_1} ${FOO"), "xBAR ${FOO_1} ${FOO")
+
+    def test_060_project_replace_variables(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_path:
+            project_file_path = os.path.join(tmp_dir_path, "project.yaml")
+            with open(project_file_path, "w") as project_file:
+                project_file.write("project:\n"
+                                   "  name: test\n"
+                                   "  variables:\n"
+                                   "    REPO: repo\n"
+                                   "    REPO_TAG: tag\n")
+            project = Project(project_file_path, {})
+            self.assertEqual(project.replace_variables("$REPO_TAG@$REPO"), "tag@repo")
+            project.update_var("REPO", "other")
+            self.assertEqual(project.replace_variables("$REPO_TAG@$REPO"), "tag@other")
+
+    def test_070_template(self):
+        template = Template("run $$TEST -seed $$SEED -log $$TEST.log")
+        self.assertEqual(template.names, ("SEED", "TEST"))
+        self.assertEqual(template.render({"TEST": "t0", "SEED": 1}), "run t0 -seed 1 -log t0.log")
+        self.assertEqual(template.render_many({"TEST": "t{}".format(i), "SEED": i} for i in range(2)),
+                         ["run t0 -seed 0 -log t0.log", "run t1 -seed 1 -log t1.log"])
+        with self.assertRaises(TemplateKeysError) as context:
+            template.render_many([{"TEST": "t0", "SEED": 0}, {"TEST": "t1"}, {}])
+        self.assertEqual(context.exception.missing, ["SEED", "TEST"])
+        self.assertEqual(context.exception.indexes, [1, 2])
+        with self.assertRaises(KeyError):
+            template.render({})
+        self.assertEqual(Template("no slots").render_many([{}, {}]), ["no slots", "no slots"])
+
+    def test_080_project_templates(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_path:
+            project_file_path = os.path.join(tmp_dir_path, "project.yaml")
+            with open(project_file_path, "w") as project_file:
+                project_file.write("project:\n"
+                                   "  name: test\n"
+                                   "  variables:\n"
+                                   "    SIM: xrun\n"
+                                   "    TEST_CMD: $SIM $$TEST $$ARGS\n")
+            project = Project(project_file_path, {})
+            project.resolve_vars()
+            self.assertEqual(project.replace_postponed_vars(project.get_var("TEST_CMD"), {"TEST": "t", "ARGS": "-a"}),
+                             "xrun t -a")
+            self.assertEqual(project.replace_postponed_vars("nothing", {}), "nothing")
+            self.assertEqual(project.compile_template("TEST_CMD").render({"TEST": "t", "ARGS": ""}), "xrun t ")
+            self.assertEqual(project.compile_template("$SIM -r $$TEST").render_many([{"TEST": "a"}]), ["xrun -r a"])
+
+    def test_085_delimited_references(self):
+        resolver = VariableResolver({"VERSION": "3.2", "TAG": "RTL_${VERSION}_dft $VERSION_dft ${NOPE}"})
+        self.assertEqual(resolver.resolve("TAG"), "RTL_3.2_dft $VERSION_dft ${NOPE}")
+        self.assertEqual(resolver.get_undefined(), {"NOPE": ["TAG"], "VERSION_dft": ["TAG"]})
+
+    def test_087_sample_release_tags(self):
+        projects_dir_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "flows", "common",
+                                         "projects")
+        for project_name in ["sample_yaml", "sample_yaml_win"]:
+            project_file_path = os.path.join(projects_dir_path, project_name, "project.yaml")
+            with mock.patch.dict(os.environ, {"USER": "a"}):
+                project = Project(project_file_path, {})
+                project.resolve_vars()
+            tag = Release(project_file_path, "yaml").get_repo_sos("emerald").get_tag()
+            self.assertEqual(project.replace_variables(tag).split()[:2],
+                             ["fpga_release_3.2.5", "RTL_RELEASE_3.2.5_dft_noEMU"])
+
+    def test_090_module_and_tool_owners(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_path:
+            project_file_path = os.path.join(tmp_dir_path, "project.yaml")
+            with open(project_file_path, "w") as project_file:
+                project_file.write("project:\n"
+                                   "  name: test\n"
+                                   "  variables:\n"
+                                   "    ROOT: /root\n"
+                                   "  modules:\n"
+                                   "    - name: core\n"
+                                   "      type: rtl\n"
+                                   "      vars:\n"
+                                   "        TOP: $ROOT/top\n"
+                                   "        BAD: $NO_SUCH_VAR/bad\n")
+            project = Project(project_file_path, {})
+            project.resolve_vars()
+            with self.assertLogs("core.project", level="WARNING") as logs:
+                project.resolve_module_vars()
+                tools = Tools()
+                tools.add_tool(Tool("common", "sim", "xrun", path="$ROOT/sim", bin_path="$NO_SIM_ROOT/bin"))
+                tools.replace_pathes_vars(project)
+            self.assertEqual(project.get_module_vars_dict("rtl")["TOP"], "/root/top")
+            self.assertIn("$NO_SUCH_VAR (used by core.BAD)", logs.output[0])
+            self.assertIn("$NO_SIM_ROOT (used by common.sim.bin_path)", logs.output[1])
+            self.assertEqual(tools.get_tool("sim", "common").path, "/root/sim")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.server import WarmCache
+
+SAMPLE_PROJECT_DIR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "flows", "common",
+                                       "projects", "sample_yaml")
+
+
+class TestWarmCache(unittest.TestCase):
+    def test_000_reload_on_change(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_path:
+            project_dir_path = os.path.join(tmp_dir_path, "sample_yaml")
+            shutil.copytree(SAMPLE_PROJECT_DIR_PATH, project_dir_path)
+            project_file_path = os.path.join(project_dir_path, "project.yaml")
+            global_variables = {"PROJECT_FILE_PATH": project_file_path}
+
+            cache = WarmCache()
+            project = cache.get_project(global_variables)
+            release = cache.get_release(project_file_path, project.get_project_file_type())
+            self.assertIs(cache.get_project(global_variables), project)
+            self.assertIs(cache.get_release(project_file_path, project.get_project_file_type()), release)
+
+            stat = os.stat(project_file_path)
+            os.utime(project_file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+            self.assertIsNot(cache.get_project(global_variables), project)
+            self.assertIs(cache.get_release(project_file_path, project.get_project_file_type()), release)
+
+    def test_005_new_fragment(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_path:
+            project_file_path = os.path.join(tmp_dir_path, "project.yaml")
+            with open(project_file_path, "w") as project_file:
+                project_file.write("project:\n  name: test\n  variables: {}\n  include: [modules/*.yaml]\n")
+            os.makedirs(os.path.join(tmp_dir_path, "modules"))
+            global_variables = {"PROJECT_FILE_PATH": project_file_path}
+
+            cache = WarmCache()
+            project = cache.get_project(global_variables)
+            self.assertIs(cache.get_project(global_variables), project)
+            with open(os.path.join(tmp_dir_path, "modules", "cpu.yaml"), "w") as fragment_file:
+                fragment_file.write("type: rtl\n")
+            project = cache.get_project(global_variables)
+            self.assertEqual(project.get_module_names(), ["cpu"])
+            self.assertIs(cache.get_project(global_variables), project)
+
+    def test_010_tools(self):
+        cache = WarmCache()
+        self.assertEqual(cache.get_tools().groups, cache.get_tools().groups)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from core.project import Project
+from core.release import Release
+from core.snapshot import get_snapshot_file_path, load_snapshot, save_snapshot
+
+SAMPLE_PROJECT_DIR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "flows", "common",
+                                       "projects", "sample_yaml")
+
+
+class TestSnapshot(unittest.TestCase):
+    def test_000_invalidation(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_path, \
+                mock.patch.dict(os.environ, {"XDG_CACHE_HOME": os.path.join(tmp_dir_path, "cache"), "USER": "a"}):
+            project_dir_path = os.path.join(tmp_dir_path, "sample_yaml")
+            shutil.copytree(SAMPLE_PROJECT_DIR_PATH, project_dir_path)
+            project_file_path = os.path.join(project_dir_path, "project.yaml")
+
+            self.assertIsNone(load_snapshot(project_file_path, {}))
+            project = Project(project_file_path, {})
+            project.resolve_vars()
+            release = Release(project_file_path, project.get_project_file_type())
+            self.assertTrue(save_snapshot(project, release))
+            with open(get_snapshot_file_path(project_file_path), "rb") as snapshot_file:
+                file_names = [os.path.basename(path) for path in pickle.load(snapshot_file)["files"]]
+            self.assertTrue({"xml_loader.py", "config_io.py", "resolver.py"}.issubset(file_names))
+
+            snapshot = load_snapshot(project_file_path, {})
+            self.assertIsNotNone(snapshot)
+            self.assertEqual(snapshot[0].get_var("SOS_WORKSPACE"), "a")
+            self.assertEqual(snapshot[1]._version, "HEAD")
+
+            # Env var used by the project
+            with mock.patch.dict(os.environ, {"USER": "b"}):
+                self.assertIsNone(load_snapshot(project_file_path, {}))
+            # Env var not used by the project
+            with mock.patch.dict(os.environ, {"SOME_OTHER_VAR": "b"}):
+                self.assertIsNotNone(load_snapshot(project_file_path, {}))
+            # Project file
+            with open(project_file_path, "a") as project_file:
+                project_file.write("\n")
+            self.assertIsNone(load_snapshot(project_file_path, {}))
+
+    def test_010_new_fragment(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_path, \
+                mock.patch.dict(os.environ, {"XDG_CACHE_HOME": os.path.join(tmp_dir_path, "cache")}):
+            project_file_path = os.path.join(tmp_dir_path, "project.yaml")
+            with open(project_file_path, "w") as project_file:
+                project_file.write("project:\n  name: test\n  variables: {}\n  include: [modules/*.yaml]\n")
+            os.makedirs(os.path.join(tmp_dir_path, "modules"))
+            project = Project(project_file_path, {})
+            project.resolve_vars()
+            self.assertTrue(save_snapshot(project, None))
+            self.assertIsNotNone(load_snapshot(project_file_path, {}))
+
+            with open(os.path.join(tmp_dir_path, "modules", "cpu.yaml"), "w") as fragment_file:
+                fragment_file.write("type: rtl\n")
+            self.assertIsNone(load_snapshot(project_file_path, {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import stat
+import tempfile
+import unittest
+
+from core.tool_check import DirectoryCache, check_tool, check_tools, which
+from core.tools import Tool
+
+
+def make_executable(dir_path, name) -> str:
+    path = os.path.join(dir_path, name)
+    with open(path, "w") as executable_file:
+        executable_file.write("#!/bin/sh\n")
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+    return path
+
+
+class TestToolCheck(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.bin_a = os.path.join(self.tmp_dir.name, "a")
+        self.bin_b = os.path.join(self.tmp_dir.name, "b")
+        os.makedirs(self.bin_a)
+        os.makedirs(self.bin_b)
+        self.sim_path = make_executable(self.bin_b, "sim")
+        with open(os.path.join(self.bin_a, "sim"), "w") as not_executable_file:
+            not_executable_file.write("")
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_000_which(self):
+        cache = DirectoryCache()
+        path_list = os.pathsep.join([self.bin_a, "/no/such/dir", self.bin_b])
+        self.assertEqual(which("sim", path_list, cache), self.sim_path)
+        self.assertIsNone(which("gcc_unknown", path_list, cache))
+        self.assertEqual(which(self.sim_path, "", cache), self.sim_path)
+        self.assertEqual(list(cache.get_timings()).count(self.bin_a), 1)
+        self.assertIsNone(cache.list("/no/such/dir"))
+
+    def test_010_check_tools(self):
+        base_env = {"PATH": self.bin_a}
+        tools = [Tool("common", "sim", "sim", path=self.bin_b),
+                 Tool("common", "sim_bin", "sim", bin_path=self.bin_a),
+                 Tool("common", "missing", "sim"),
+                 Tool("asic", "editor", "editor_unknown", bin_path="None")]
+        results = check_tools(tools, max_workers=4, base_env=base_env)
+
+        self.assertEqual([result.name for result in results], ["sim", "sim_bin", "missing", "editor"])
+        self.assertEqual([result.available for result in results], [True, True, False, False])
+        self.assertEqual(results[0].path, self.sim_path)
+        self.assertGreaterEqual(results[0].latency, 0.0)
+        self.assertEqual(results[0].to_dict()["group"], "common")
+        self.assertTrue(check_tool(tools[0], base_env=base_env).available)
+        self.assertEqual(check_tools([]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,23 @@
+import os
+import tempfile
 import unittest
+from unittest import mock
 
+from core.tools import Tools, ToolsRegistry
 from flows import get_tools
 
+TOOLS_YAML = """tools:
+  common:
+    - name: gcc
+      executable: gcc
+      env: {CC: gcc}
+    - name: sim
+      executable: xrun
+  asic:
+    - name: sim
+      executable: vcs
+"""
+
 
 class TestTools(unittest.TestCase):
     def test_sanity_0(self):
@@ -16,6 +32,41 @@ class TestTools(unittest.TestCase):
         tools = get_tools()
         self.assertEqual(tools.groups[0], "common")
 
+    def test_sanity_3(self):
+        tools = get_tools()
+        self.assertIsNot(get_tools(), tools)
+        self.assertEqual(get_tools().groups, tools.groups)
+
+    def test_registry(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_path:
+            path = os.path.join(tmp_dir_path, "tools.yaml")
+            with open(path, "w") as tools_file:
+                tools_file.write(TOOLS_YAML)
+            registry = ToolsRegistry()
+            tools = registry.get_tools([path])
+            tools.get_tool("gcc").path = "/changed"
+            tools.get_tool("gcc").env["CC"] = "changed"
+            with mock.patch.object(Tools, "parse_yaml", side_effect=AssertionError("parsed again")):
+                cached = registry.get_tools([path])
+            self.assertIsNot(cached, tools)
+            self.assertNotEqual(cached.get_tool("gcc").path, "/changed")
+            self.assertEqual(cached.get_tool("gcc").env, {"CC": "gcc"})
+            self.assertEqual(tools.get_groups_list(), ["common", "asic"])
+            self.assertEqual(tools.get_tool("gcc").executable, "gcc")
+            self.assertEqual(tools.get_tool("sim", "asic").executable, "vcs")
+            self.assertEqual(tools.get_tool("gcc", "asic").executable, "gcc")
+            self.assertIsNone(tools.get_tool("unknown"))
+            self.assertEqual([tool.name for tool in tools.get_tools_from_group("common")], ["gcc", "sim"])
+            self.assertEqual(tools.get_tools_from_group("unknown"), [])
+
+            with open(path, "w") as tools_file:
+                tools_file.write(TOOLS_YAML.replace("vcs", "vcs_mx"))
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+            reloaded = registry.get_tools([path])
+            self.assertIsNot(reloaded, tools)
+            self.assertEqual(reloaded.get_tool("sim", "asic").executable, "vcs_mx")
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+
+from core.project import Project
+from core.release import Release
+from core.xml_benchmark import _describe, benchmark, generate_project_xml
+from core.xml_loader import iterparse_project_xml, iterparse_release_xml, parse_project_xml_tree, parse_release_xml_tree
+
+PROJECT_XML = """<project>
+  <name>sample</name>
+  <!-- comment -->
+  <variables>
+    <var><name>ROOT</name><value>/root</value></var>
+    <var><name>WORKDIR</name><value>none</value><auto>ODIN_WORKDIR_PATH</auto></var>
+  </variables>
+  <modules>
+    <module>
+      <name>core</name>
+      <type>rtl</type>
+      <variables><var><name>TOP</name><value>$ROOT/top</value></var></variables>
+      <filelists>
+        <filelist><name>rtl</name><file>a.sv</file><file>b.sv</file></filelist>
+        <filelist><name>tb</name><file>tb.sv</file></filelist>
+      </filelists>
+      <steps>
+        <step><name>compile</name><parameter>-c</parameter>
+          <tools><tool><name>xrun</name><parameter>-compile</parameter></tool></tools>
+        </step>
+      </steps>
+    </module>
+    <module><name>doc</name><type>doc</type></module>
+  </modules>
+</project>
+"""
+
+RELEASE_XML = """<release>
+  <version>1.0</version>
+  <dependencies>
+    <hardware>
+      <dep><name>core</name><vcs>sos</vcs><local_path>hw/core</local_path><tag>v1</tag></dep>
+    </hardware>
+    <shared>
+      <dep><name>storage</name></dep>
+    </shared>
+  </dependencies>
+</release>
+"""
+
+
+class TestXmlLoader(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.project_file_path = os.path.join(self.tmp_dir.name, "project.xml")
+        with open(self.project_file_path, "w") as project_file:
+            project_file.write(PROJECT_XML)
+        os.makedirs(os.path.join(self.tmp_dir.name, "releases"))
+        self.release_file_path = os.path.join(self.tmp_dir.name, "releases", "release.xml")
+        with open(self.release_file_path, "w") as release_file:
+            release_file.write(RELEASE_XML)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_000_project_loaders(self):
+        project_data = iterparse_project_xml(self.project_file_path)
+        self.assertEqual(_describe(project_data), _describe(parse_project_xml_tree(self.project_file_path)))
+        self.assertEqual(project_data["modules"][0]['filelists'], {"rtl": ["a.sv", "b.sv"], "tb": ["tb.sv"]})
+        self.assertEqual(project_data["modules"][0]['steps'][0].tools[0].parameter, "-compile")
+        self.assertEqual(project_data["modules"][1]['vars'], {})
+
+    def test_010_generated_project(self):
+        path = os.path.join(self.tmp_dir.name, "big.xml")
+        generate_project_xml(path, modules=20, files=50)
+        project_data = iterparse_project_xml(path)
+        self.assertEqual(len(project_data["modules"]), 20)
+        self.assertEqual(len(project_data["modules"][19]['filelists']["tb"]), 50)
+        self.assertEqual(_describe(project_data), _describe(parse_project_xml_tree(path)))
+
+    def test_020_release_loaders(self):
+        release_data = iterparse_release_xml(self.release_file_path)
+        self.assertEqual(release_data, parse_release_xml_tree(self.release_file_path))
+        self.assertEqual(release_data["version"], "1.0")
+        self.assertEqual([group for group, _ in release_data["dependencies"]], ["hardware", "shared"])
+
+    def test_030_project_and_release(self):
+        project = Project(self.project_file_path, {"ODIN_WORKDIR_PATH": "/work"})
+        project.resolve_vars()
+        self.assertEqual(project.get_var("WORKDIR"), "/work")
+        self.assertEqual(project.get_consulted_global_vars(), {"ODIN_WORKDIR_PATH": "/work"})
+        self.assertEqual(project.get_module_data("rtl")["name"], "core")
+
+        release = Release(self.project_file_path, project.get_project_file_type())
+        self.assertEqual(release._version, "1.0")
+        self.assertEqual([repo.get_name() for repo in release.repo_sos], ["core"])
+
+    def test_040_benchmark(self):
+        path = os.path.join(self.tmp_dir.name, "big.xml")
+        generate_project_xml(path, modules=5, files=5)
+        self.assertEqual(set(benchmark(path, repeat=1)), {"tree", "stream"})
+
+
+if __name__ == '__main__':
+    unittest.main()